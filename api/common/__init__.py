@@ -0,0 +1,8 @@
+"""
+两个服务（stock_api、stock_api_new）共用的基础模块：缓存、single-flight、预热、交易日历、
+条件请求、计时与指标、上游限流、本地日线存储、本地复权、上游录制 / 回放，以及基准工具（common.bench）。
+
+服务都在自己的目录下启动，导入各自的 app 包时把 api/ 加进 sys.path（见各服务的 app/__init__.py），
+之后直接 `from common.cache import TTLCache`。这里的模块不读服务的配置：
+需要的参数由调用方传入，只有几个两边同名的环境变量（TRADING_HOLIDAYS_FILE、SLOW_REQUEST_MS）在这里读取。
+"""
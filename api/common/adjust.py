@@ -0,0 +1,135 @@
+"""
+本地复权：只存一份不复权日线，再加每个 symbol 的复权因子，qfq / hfq 在读的时候一次向量化乘除得到。
+
+- 因子来自新浪（akshare.stock_zh_a_daily(adjust="qfq-factor" / "hfq-factor")），
+  每行是一次除权除息生效的日期和之后一直沿用的因子
+- 计算方式与 akshare 的 stock_zh_a_daily(adjust="qfq" / "hfq") 相同：
+  前复权 = 不复权价 / qfq_factor，后复权 = 不复权价 * hfq_factor，保留两位小数
+- 新的分红送转只改变因子：因子缓存到下一次开盘（除权在开盘生效），刷新时只重新拉因子，
+  不复权的历史日线不需要重新下载
+- 新浪明确答复没有因子的代码（fetch 抛 NoFactors）同样缓存到下一次开盘，期间直接返回空因子，
+  调用方退回向上游要复权日线；空表 / 解析不出因子则不缓存，下次再试
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from common.market import calendar
+from common.singleflight import SingleFlight
+
+ADJUSTS = ("qfq", "hfq")
+PRICE_COLUMNS = ("open", "high", "low", "close")
+
+# (symbol, adjust) -> 因子表（列：date, <adjust>_factor）
+FactorFetchFn = Callable[[str, str], pd.DataFrame]
+
+
+class NoFactors(Exception):
+    """
+    上游明确答复这个代码没有复权因子：是结果而不是故障，不重试、不计入熔断和限流
+    """
+
+
+def sina_symbol(stock_code: str) -> str:
+    """
+    新浪的代码带交易所前缀：沪市 6 / 9 开头，北交所 4 / 8 开头，其余深市
+    """
+    if stock_code[:1] in ("6", "9"):
+        return f"sh{stock_code}"
+    if stock_code[:1] in ("4", "8"):
+        return f"bj{stock_code}"
+    return f"sz{stock_code}"
+
+
+def parse_factors(df: pd.DataFrame | None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    因子表 -> (生效日期的天数, 因子)，按日期升序；无效行丢掉
+    """
+    if df is None or df.empty:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    factor_col = next((c for c in df.columns if str(c).endswith("_factor")), df.columns[-1])
+    days = pd.to_datetime(df["date"], errors="coerce").to_numpy().astype("datetime64[D]")
+    factors = pd.to_numeric(df[factor_col], errors="coerce").to_numpy(dtype=np.float64)
+    ok = ~np.isnat(days) & np.isfinite(factors) & (factors > 0)
+    days, factors = days[ok].astype(np.int64), factors[ok]
+    order = np.argsort(days, kind="stable")
+    return days[order], factors[order]
+
+
+def apply_factors(df: pd.DataFrame, days: np.ndarray, factors: np.ndarray, adjust: str) -> pd.DataFrame:
+    """
+    不复权日线（列：date, open, high, low, close, volume）-> 复权日线。
+    每根 K 线用不晚于它的最近一次因子；比第一次因子还早的用第一个因子。成交量不变。
+    没有因子时抛 ValueError：不能把不复权价当成复权价返回
+    """
+    if df.empty:
+        return df
+    if len(factors) == 0:
+        raise ValueError(f"no {adjust} factors")
+    bar_days = pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+    idx = np.clip(np.searchsorted(days, bar_days, side="right") - 1, 0, None)
+    f = factors[idx]
+    out = df.copy()
+    for c in PRICE_COLUMNS:
+        values = out[c].to_numpy(dtype=np.float64)
+        out[c] = np.round(values / f if adjust == "qfq" else values * f, 2)
+    return out
+
+
+class AdjustFactors:
+    """
+    每个 (symbol, adjust) 的复权因子，缓存到下一次开盘；并发的 miss 只拉一次
+    """
+
+    def __init__(self, fetch: FactorFetchFn):
+        self._fetch = fetch
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], tuple[np.ndarray, np.ndarray, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol: str, adjust: str) -> tuple[np.ndarray, np.ndarray]:
+        key = (symbol, adjust)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.time():
+                self.hits += 1
+                return entry[0], entry[1]
+            self.misses += 1
+        return self._flight.do(key, lambda: self._load(key))
+
+    def _load(self, key: tuple[str, str]) -> tuple[np.ndarray, np.ndarray]:
+        try:
+            table = self._fetch(*key)
+        except NoFactors:
+            # 没有因子：空因子缓存到下一次开盘，期间不再问上游
+            days, factors = parse_factors(None)
+            self._remember(key, days, factors)
+            return days, factors
+        days, factors = parse_factors(table)
+        if len(factors) == 0:
+            # 空表 / 解析不出因子：不缓存，调用方退回直接拉复权数据，下次再试
+            return days, factors
+        self._remember(key, days, factors)
+        return days, factors
+
+    def _remember(self, key: tuple[str, str], days: np.ndarray, factors: np.ndarray) -> None:
+        expires = calendar.next_open(datetime.now()).timestamp()
+        with self._lock:
+            self._entries[key] = (days, factors, expires)
+
+    def invalidate(self, symbol: str, adjust: str | None = None) -> None:
+        with self._lock:
+            for a in (adjust,) if adjust else ADJUSTS:
+                self._entries.pop((symbol, a), None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,64 @@
+"""
+对比两次基准结果（两个服务的 bench.bench_api、bench.bench_startup 写出的 JSON）
+
+    cd api && python -m common.bench.compare bench-old.json bench-new.json --threshold 0.10
+
+p95 变慢或吞吐下降超过 threshold 的项标记为 REGRESSION，有任何回退时退出码为 1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+# 冷启动 / 导入时间抖动大，小于这个绝对差值（毫秒）的变慢不算回退
+_MIN_DELTA_MS = {"startup": 5.0, "imports": 2.0}
+
+
+def _ratio(old: float, new: float) -> float:
+    return new / old if old else 1.0
+
+
+def compare(old: dict, new: dict, threshold: float) -> list[str]:
+    regressions = []
+    for section in ("endpoints", "micro", "startup", "imports"):
+        rows_old, rows_new = old.get(section, {}), new.get(section, {})
+        names = [n for n in rows_new if n in rows_old]
+        if not names:
+            continue
+        print(f"\n== {section}  ({old.get('git') or '?'} -> {new.get('git') or '?'})")
+        for name in names:
+            o, n = rows_old[name], rows_new[name]
+            p95 = _ratio(o["p95_ms"], n["p95_ms"])
+            line = f"{name:<32} p95 {o['p95_ms']:>9.3f} -> {n['p95_ms']:>9.3f} ms (x{p95:.2f})"
+            bad = p95 > 1 + threshold and n["p95_ms"] - o["p95_ms"] > _MIN_DELTA_MS.get(section, 0.0)
+            if "throughput_rps" in o:
+                rps = _ratio(o["throughput_rps"], n["throughput_rps"])
+                line += f"  rps {o['throughput_rps']:>8.1f} -> {n['throughput_rps']:>8.1f} (x{rps:.2f})"
+                bad = bad or rps < 1 - threshold
+            if bad:
+                line += "  REGRESSION"
+                regressions.append(f"{section}.{name}")
+            print(line)
+    return regressions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("old")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=0.10)
+    args = ap.parse_args()
+
+    old = json.loads(Path(args.old).read_text())
+    new = json.loads(Path(args.new).read_text())
+    regressions = compare(old, new, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+基准测试用的离线上游：替换 akshare.stock_zh_a_hist 和 stock_zh_a_daily（复权因子），
+按 symbol 生成确定性的日线和除权事件，可以配置延迟和失败率，整个基准不访问网络。
+
+    from common.bench.fake_upstream import FakeUpstream
+    upstream = FakeUpstream(latency_ms=20, failure_rate=0.01).install()
+"""
+from __future__ import annotations
+
+import random
+import sys
+import threading
+import time
+import types
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+class FakeUpstream:
+    """
+    与 akshare.stock_zh_a_hist 同样的签名和中文列名；同一个 symbol 每次返回相同的数据。
+    qfq / hfq 日线与 stock_zh_a_daily 返回的因子一致（前复权 = 不复权 / qfq_factor，后复权 = 不复权 * hfq_factor）
+    """
+
+    def __init__(self, latency_ms: float = 20.0, jitter_ms: float = 5.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def _delay(self) -> tuple[float, bool]:
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self._rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        return delay, fail
+
+    def stock_zh_a_hist(self, symbol: str, period: str = "daily", start_date: str = "", end_date: str = "", adjust: str = ""):
+        delay, fail = self._delay()
+        time.sleep(delay)
+        if fail:
+            raise ConnectionError("fake upstream failure")
+
+        # 每个交易日的价格只取决于 (symbol, 日期)：不同的请求区间切出来的是同一条序列，
+        # 且只生成请求的区间，假上游本身的开销可以忽略
+        days = pd.bdate_range(start_date or "1995-01-02", end_date or pd.Timestamp.today())
+        h = zlib.crc32(f"{symbol}:".encode()) % 1000
+        t = days.to_numpy().astype("datetime64[D]").astype(np.int64).astype(np.float64)
+        close = 10 + h / 100 + 3 * np.sin(t / (37 + h % 23)) + np.sin(t * 1.7 + h) * 0.2
+        if adjust in ("qfq", "hfq"):
+            ev_days, hfq = self._events(symbol)
+            f = hfq[np.clip(np.searchsorted(ev_days, t.astype(np.int64), side="right") - 1, 0, None)]
+            close = np.round(close * f if adjust == "hfq" else close / (hfq[-1] / f), 2)
+        return pd.DataFrame(
+            {
+                "日期": np.datetime_as_string(days.to_numpy().astype("datetime64[D]")),
+                "开盘": close * 0.995,
+                "收盘": close,
+                "最高": close * 1.01,
+                "最低": close * 0.99,
+                "成交量": (t * 7919 + h * 104729).astype(np.int64) % 990_000 + 10_000,
+                "成交额": close * 1e6,
+            }
+        )
+
+    @staticmethod
+    def _events(symbol: str) -> tuple[np.ndarray, np.ndarray]:
+        # 每年一次除权（日期按 symbol 错开），后复权因子从 1 开始逐次变大
+        h = zlib.crc32(symbol.encode())
+        dates = pd.to_datetime([f"{y}-06-{10 + h % 15:02d}" for y in range(1995, pd.Timestamp.today().year + 1)])
+        dates = dates[dates <= pd.Timestamp.today()]
+        ev_days = dates.to_numpy().astype("datetime64[D]").astype(np.int64)
+        hfq = np.cumprod(np.r_[1.0, np.full(len(ev_days) - 1, 1.0 + (h % 7) / 100)])
+        return ev_days, hfq
+
+    def stock_zh_a_daily(self, symbol: str, start_date: str = "", end_date: str = "", adjust: str = ""):
+        """
+        只实现复权因子（adjust="qfq-factor" / "hfq-factor"），symbol 带 sh / sz / bj 前缀
+        """
+        delay, fail = self._delay()
+        time.sleep(delay)
+        if fail:
+            raise ConnectionError("fake upstream failure")
+        kind = adjust.removesuffix("-factor")
+        if kind not in ("qfq", "hfq"):
+            raise ValueError(f"fake upstream only serves adjustment factors, got adjust={adjust!r}")
+        ev_days, hfq = self._events(symbol[2:])
+        factor = hfq if kind == "hfq" else hfq[-1] / hfq
+        # 与新浪一样按日期倒序
+        return pd.DataFrame(
+            {"date": pd.to_datetime(ev_days[::-1].astype("datetime64[D]")), f"{kind}_factor": factor[::-1]}
+        )
+
+    def stats(self) -> dict[str, int]:
+        return {"calls": self.calls, "failures": self.failures}
+
+    def install(self) -> "FakeUpstream":
+        try:
+            import akshare
+        except ImportError:  # 基准环境不需要安装 akshare
+            akshare = sys.modules.setdefault("akshare", types.ModuleType("akshare"))
+        akshare.stock_zh_a_hist = self.stock_zh_a_hist
+        akshare.stock_zh_a_daily = self.stock_zh_a_daily
+        return self
@@ -0,0 +1,114 @@
+"""
+基准测试的公共部分：并发压测、分位数统计、结果文件（JSON，便于在不同提交之间对比，见 common.bench.compare）
+"""
+from __future__ import annotations
+
+import json
+import platform
+import subprocess
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+
+def latency_summary(samples_ms: list[float]) -> dict[str, float]:
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    if arr.size == 0:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0}
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(arr.mean()), 3),
+    }
+
+
+def run_load(
+    make_client: Callable[[], Any],
+    request: Callable[[Any, int], Any],
+    *,
+    requests: int,
+    concurrency: int,
+) -> dict[str, Any]:
+    """
+    concurrency 个线程共发出 requests 个请求，每个线程一个 client；
+    request(client, i) 发出第 i 个请求并返回 response（用 status_code 统计状态码）
+    """
+    local = threading.local()
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+    lock = threading.Lock()
+
+    def one(i: int) -> None:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = make_client()
+        t0 = time.perf_counter()
+        resp = request(client, i)
+        ms = (time.perf_counter() - t0) * 1000
+        with lock:
+            latencies.append(ms)
+            statuses[resp.status_code] += 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t0
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": round(requests / wall, 1) if wall else 0.0,
+        **latency_summary(latencies),
+        "status": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def time_call(fn: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """
+    微基准：先跑一次预热，再跑 repeat 次，返回每次的分位数耗时
+    """
+    fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"repeat": repeat, **latency_summary(samples)}
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip()
+    except Exception:
+        return ""
+
+
+def write_result(path: str | None, service: str, config: dict[str, Any], sections: dict[str, Any]) -> dict[str, Any]:
+    result = {
+        "service": service,
+        "git": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": config,
+        **sections,
+    }
+    if path:
+        Path(path).write_text(json.dumps(result, ensure_ascii=False, indent=2))
+    return result
+
+
+def print_table(title: str, rows: dict[str, dict[str, Any]]) -> None:
+    print(f"\n== {title}")
+    for name, r in rows.items():
+        rps = f"{r['throughput_rps']:>9.1f} rps" if "throughput_rps" in r else " " * 13
+        print(f"{name:<32} {rps}  p50 {r['p50_ms']:>8.3f}  p95 {r['p95_ms']:>8.3f}  p99 {r['p99_ms']:>8.3f} ms")
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, is_dataclass
+from typing import Any, Hashable
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+# 大列表只抽样估算，避免每次 set 都遍历整个响应
+_SIZE_SAMPLE = 32
+
+
+def approx_size(obj: Any) -> int:
+    """
+    粗略估算对象占用的字节数（用于缓存容量控制，不追求精确）
+    """
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return len(obj)
+    if isinstance(obj, str):
+        return sys.getsizeof(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, BaseModel) or is_dataclass(obj):
+        return approx_size(obj.__dict__)
+    if isinstance(obj, dict):
+        items = list(obj.items())
+        base = sys.getsizeof(obj)
+        if not items:
+            return base
+        sample = items[:_SIZE_SAMPLE]
+        per = sum(approx_size(k) + approx_size(v) for k, v in sample) / len(sample)
+        return base + int(per * len(items))
+    if isinstance(obj, (list, tuple)):
+        base = sys.getsizeof(obj)
+        if not obj:
+            return base
+        sample = obj[:_SIZE_SAMPLE]
+        per = sum(approx_size(v) for v in sample) / len(sample)
+        return base + int(per * len(obj))
+    return sys.getsizeof(obj)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expire_at: float
+    size: int
+
+
+class TTLCache:
+    """
+    线程安全的 LRU + TTL 缓存，同时限制条目数和估算字节数。
+
+    - get 命中会把条目移到 LRU 尾部；超出 max_entries / max_bytes 时从头部淘汰
+    - 过期条目除了在读到时删除，还会周期性地整体清扫（sweep_interval 秒一次）
+    - stale_seconds > 0 时，过期后的条目再保留这么久：get 视为未命中，
+      get_or_stale 仍然返回旧值（stale-while-revalidate，由调用方负责后台刷新）
+    - stats() 返回命中 / 未命中 / 陈旧命中 / 淘汰 / 过期 / 当前大小
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        max_entries: int = 10_000,
+        max_bytes: int = 256 * 1024 * 1024,
+        sweep_interval: float = 30.0,
+        stale_seconds: float = 0.0,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = max(0.0, stale_seconds)
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.sweep_interval = sweep_interval
+
+        self._data: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self._next_sweep = time.monotonic() + sweep_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable):
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_sweep(now)
+            ent = self._data.get(key)
+            if ent is None:
+                self.misses += 1
+                return None
+            if now >= ent.expire_at:
+                self._expire_if_dead(key, ent, now)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return ent.value
+
+    def get_or_stale(self, key: Hashable) -> tuple[Any, bool]:
+        """
+        返回 (value, stale)：未过期为 (value, False)；
+        过期但仍在 stale_seconds 宽限期内为 (旧值, True)；否则 (None, False)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_sweep(now)
+            ent = self._data.get(key)
+            if ent is None:
+                self.misses += 1
+                return None, False
+            if now < ent.expire_at:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return ent.value, False
+            if self._expire_if_dead(key, ent, now):
+                self.misses += 1
+                return None, False
+            self._data.move_to_end(key)
+            self.stale_hits += 1
+            return ent.value, True
+
+    def ttl_remaining(self, key: Hashable) -> float | None:
+        """
+        距离过期还有多少秒（陈旧条目为负数）；不存在或已超出宽限期返回 None
+        """
+        now = time.monotonic()
+        with self._lock:
+            ent = self._data.get(key)
+            if ent is None or now >= ent.expire_at + self.stale_seconds:
+                return None
+            return ent.expire_at - now
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """
+        ttl 为 None 时用默认的 ttl_seconds；math.inf 表示不过期（只会被 LRU 淘汰）
+        """
+        ttl = self.ttl_seconds if ttl is None else ttl
+        size = approx_size(value)
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_sweep(now)
+            if key in self._data:
+                self._remove(key)
+            # 单个值就超过容量上限：不缓存
+            if size > self.max_bytes:
+                return
+            self._data[key] = _Entry(value=value, expire_at=now + ttl, size=size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def peek(self, key: Hashable, allow_stale: bool = False):
+        """
+        读取但不计入命中统计、不改变 LRU 顺序；allow_stale=True 时宽限期内的旧值也返回
+        """
+        with self._lock:
+            ent = self._data.get(key)
+            if ent is None:
+                return None
+            deadline = ent.expire_at + (self.stale_seconds if allow_stale else 0.0)
+            if time.monotonic() >= deadline:
+                return None
+            return ent.value
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def sweep(self) -> int:
+        """
+        删除所有已过期条目，返回删除数量
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, ent in self._data.items() if now >= ent.expire_at + self.stale_seconds]
+            for k in expired:
+                self._remove(k)
+            self.expirations += len(expired)
+            self._next_sweep = now + self.sweep_interval
+            return len(expired)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stale_hits": self.stale_hits,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remove(self, key: Hashable) -> None:
+        ent = self._data.pop(key)
+        self._bytes -= ent.size
+
+    def _expire_if_dead(self, key: Hashable, ent: _Entry, now: float) -> bool:
+        # 超出宽限期才真正删除，宽限期内留给 get_or_stale
+        if now >= ent.expire_at + self.stale_seconds:
+            self._remove(key)
+            self.expirations += 1
+            return True
+        return False
+
+    def _maybe_sweep(self, now: float) -> None:
+        if now >= self._next_sweep:
+            self.sweep()
@@ -0,0 +1,328 @@
+"""
+跨 worker 共享的缓存后端。多个 uvicorn worker 各自的进程内 TTLCache 会重复拉取同一个 symbol，
+这里的后端让同一台机器（SqliteCache）或同一个 Redis（RedisCache）上的 worker 共用一份缓存。
+
+- 值用 common.codec 编码成紧凑的二进制，不 pickle
+- 过期时间用墙上时钟（time.time），各进程一致；语义与 TTLCache 相同（ttl / stale_seconds / math.inf）
+- 后端出错（库被锁、Redis 不可达）按未命中处理并计数，不影响请求
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import sqlite3
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Hashable
+
+from common import codec
+from common.cache import TTLCache
+
+
+class SharedCache:
+    """
+    共享后端的公共部分：key 编码、过期 / 陈旧判断、统计；子类只负责按字符串 key 读写字节
+    """
+
+    backend = "shared"
+
+    def __init__(self, ttl_seconds: float, stale_seconds: float = 0.0, namespace: str = "stock_api"):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = max(0.0, stale_seconds)
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.errors = 0
+
+    # ---------- 子类实现 ----------
+
+    def _read(self, key: str) -> tuple[bytes, float] | None:
+        raise NotImplementedError
+
+    def _write(self, key: str, blob: bytes, expire_at: float) -> None:
+        raise NotImplementedError
+
+    def _delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def _clear(self) -> None:
+        raise NotImplementedError
+
+    def _backend_stats(self) -> dict[str, Any]:
+        return {}
+
+    # ---------- 与 TTLCache 相同的接口 ----------
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.namespace}:" + json.dumps(key, default=str, separators=(",", ":"))
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _load(self, key: Hashable) -> tuple[Any, float] | None:
+        try:
+            row = self._read(self._key(key))
+            if row is None:
+                return None
+            blob, expire_at = row
+            if time.time() >= expire_at + self.stale_seconds:
+                return None
+            return codec.decode(blob), expire_at
+        except Exception:
+            self._count("errors")
+            return None
+
+    def get_or_stale(self, key: Hashable) -> tuple[Any, bool]:
+        found = self._load(key)
+        if found is None:
+            self._count("misses")
+            return None, False
+        value, expire_at = found
+        if time.time() < expire_at:
+            self._count("hits")
+            return value, False
+        self._count("stale_hits")
+        return value, True
+
+    def get(self, key: Hashable):
+        found = self._load(key)
+        if found is None or time.time() >= found[1]:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return found[0]
+
+    def peek(self, key: Hashable, allow_stale: bool = False):
+        found = self._load(key)
+        if found is None:
+            return None
+        value, expire_at = found
+        if not allow_stale and time.time() >= expire_at:
+            return None
+        return value
+
+    def ttl_remaining(self, key: Hashable) -> float | None:
+        try:
+            row = self._read(self._key(key))
+        except Exception:
+            self._count("errors")
+            return None
+        if row is None or time.time() >= row[1] + self.stale_seconds:
+            return None
+        return row[1] - time.time()
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        ttl = self.ttl_seconds if ttl is None else ttl
+        try:
+            self._write(self._key(key), codec.encode(value), time.time() + ttl)
+        except Exception:
+            self._count("errors")
+
+    def delete(self, key: Hashable) -> None:
+        try:
+            self._delete(self._key(key))
+        except Exception:
+            self._count("errors")
+
+    def clear(self) -> None:
+        self._clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            out = {
+                "backend": self.backend,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stale_hits": self.stale_hits,
+                "errors": self.errors,
+            }
+        try:
+            out.update(self._backend_stats())
+        except Exception:
+            pass
+        return out
+
+
+class SqliteCache(SharedCache):
+    """
+    同一台机器上所有 worker 共用的 SQLite 缓存（WAL 模式，读写互不阻塞）。
+    超出 max_bytes / max_entries 时按最近访问时间淘汰（访问时间最多每 ACCESS_GRANULARITY 秒更新一次）。
+    """
+
+    backend = "sqlite"
+    ACCESS_GRANULARITY = 30.0
+    EVICT_EVERY = 64
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        ttl_seconds: float,
+        stale_seconds: float = 0.0,
+        max_entries: int = 10_000,
+        max_bytes: int = 256 * 1024 * 1024,
+        namespace: str = "stock_api",
+    ):
+        super().__init__(ttl_seconds, stale_seconds, namespace)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self._local = threading.local()
+        self._writes = 0
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " expire_at REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 每个线程一个连接；autocommit，单条语句即事务
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _read(self, key: str) -> tuple[bytes, float] | None:
+        conn = self._conn()
+        row = conn.execute("SELECT value, expire_at, accessed FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expire_at, accessed = row
+        now = time.time()
+        if now - accessed >= self.ACCESS_GRANULARITY:
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return value, expire_at
+
+    def _write(self, key: str, blob: bytes, expire_at: float) -> None:
+        if len(blob) > self.max_bytes:
+            return
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, expire_at, size, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, blob, expire_at if math.isfinite(expire_at) else 1e308, len(blob), time.time()),
+        )
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.EVICT_EVERY == 0
+        if due:
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        now = time.time()
+        conn.execute("DELETE FROM entries WHERE expire_at + ? <= ?", (self.stale_seconds, now))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # 按平均大小估算要删多少条，从最久未访问的开始删
+        avg = total / count if count else 1
+        over = max(count - self.max_entries, math.ceil((total - self.max_bytes) / avg) if total > self.max_bytes else 0)
+        conn.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+            (over,),
+        )
+
+    def _delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def _clear(self) -> None:
+        self._conn().execute("DELETE FROM entries")
+
+    def _backend_stats(self) -> dict[str, Any]:
+        count, total = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": count, "bytes": total, "max_entries": self.max_entries, "max_bytes": self.max_bytes}
+
+
+class RedisCache(SharedCache):
+    """
+    Redis 协议后端：client 只需要 get / set(px=) / delete / scan_iter（redis-py 兼容），
+    测试里可以换成本地的替身。值的前 8 字节是过期时间，Redis 自身的过期时间再加上 stale_seconds。
+    """
+
+    backend = "redis"
+    _HEADER = struct.Struct("<d")
+
+    def __init__(self, client: Any, ttl_seconds: float, stale_seconds: float = 0.0, namespace: str = "stock_api"):
+        super().__init__(ttl_seconds, stale_seconds, namespace)
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisCache":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from None
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def _read(self, key: str) -> tuple[bytes, float] | None:
+        raw = self.client.get(key)
+        if raw is None:
+            return None
+        (expire_at,) = self._HEADER.unpack_from(raw)
+        return raw[self._HEADER.size:], expire_at
+
+    def _write(self, key: str, blob: bytes, expire_at: float) -> None:
+        payload = self._HEADER.pack(expire_at) + blob
+        if math.isfinite(expire_at):
+            px = max(1, int((expire_at + self.stale_seconds - time.time()) * 1000))
+            self.client.set(key, payload, px=px)
+        else:
+            self.client.set(key, payload)
+
+    def _delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def _clear(self) -> None:
+        for key in self.client.scan_iter(match=f"{self.namespace}:*"):
+            self.client.delete(key)
+
+
+def make_cache(
+    backend: str,
+    *,
+    ttl_seconds: float,
+    stale_seconds: float = 0.0,
+    max_entries: int = 10_000,
+    max_bytes: int = 256 * 1024 * 1024,
+    sqlite_path: str = ".data/cache.sqlite3",
+    redis_url: str = "redis://localhost:6379/0",
+    namespace: str = "stock_api",
+):
+    """
+    memory（默认，进程内 TTLCache）| sqlite（同机多 worker 共享）| redis
+    """
+    if backend == "sqlite":
+        return SqliteCache(
+            sqlite_path,
+            ttl_seconds=ttl_seconds,
+            stale_seconds=stale_seconds,
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            namespace=namespace,
+        )
+    if backend == "redis":
+        return RedisCache.from_url(redis_url, ttl_seconds=ttl_seconds, stale_seconds=stale_seconds, namespace=namespace)
+    if backend != "memory":
+        raise ValueError(f"unknown cache backend: {backend}")
+    return TTLCache(
+        ttl_seconds=ttl_seconds,
+        max_entries=max_entries,
+        max_bytes=max_bytes,
+        stale_seconds=stale_seconds,
+    )
@@ -0,0 +1,76 @@
+"""
+缓存值的二进制编码（跨进程共享的缓存后端使用，不用 pickle）。
+
+格式：1 字节标记 + 负载
+- 0x00 bytes：原样
+- 0x01 注册过的类型：1 字节名字长度 + 名字 + 该类型自己的编码
+- 0x02 JSON 可表示的值：zlib(JSON)
+"""
+from __future__ import annotations
+
+import json
+import zlib
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+_RAW = 0x00
+_TYPED = 0x01
+_JSON = 0x02
+
+_encoders: dict[type, tuple[str, Callable[[Any], bytes]]] = {}
+_decoders: dict[str, Callable[[bytes], Any]] = {}
+
+
+def register(cls: type, name: str, encode: Callable[[Any], bytes], decode: Callable[[bytes], Any]) -> None:
+    """
+    注册一个类型的编解码函数；name 写进编码结果，各进程必须一致
+    """
+    if len(name.encode()) > 255:
+        raise ValueError("codec name too long")
+    _encoders[cls] = (name, encode)
+    _decoders[name] = decode
+
+
+def register_model(cls: type[BaseModel], name: str | None = None) -> None:
+    """
+    pydantic 模型：zlib 压缩的 JSON（model_dump_json / model_validate_json）
+    """
+    register(
+        cls,
+        name or cls.__name__,
+        lambda v: zlib.compress(v.model_dump_json().encode("utf-8"), 1),
+        lambda b: cls.model_validate_json(zlib.decompress(b)),
+    )
+
+
+def encode(value: Any) -> bytes:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes([_RAW]) + bytes(value)
+    entry = _encoders.get(type(value))
+    if entry is not None:
+        name, enc = entry
+        raw_name = name.encode()
+        return bytes([_TYPED, len(raw_name)]) + raw_name + enc(value)
+    try:
+        body = json.dumps(value, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+    except (TypeError, ValueError):
+        raise TypeError(f"no cache codec registered for {type(value).__name__}") from None
+    return bytes([_JSON]) + zlib.compress(body.encode("utf-8"), 1)
+
+
+def decode(data: bytes) -> Any:
+    tag = data[0]
+    if tag == _RAW:
+        return data[1:]
+    if tag == _TYPED:
+        n = data[1]
+        name = data[2: 2 + n].decode()
+        try:
+            dec = _decoders[name]
+        except KeyError:
+            raise ValueError(f"unknown cache codec: {name}") from None
+        return dec(data[2 + n:])
+    if tag == _JSON:
+        return json.loads(zlib.decompress(data[1:]))
+    raise ValueError(f"bad cache payload tag: {tag}")
@@ -0,0 +1,137 @@
+"""
+条件请求（ETag / Last-Modified → 304）和响应压缩（gzip / br）。
+
+轮询的客户端带着 If-None-Match 回来时，只要 ETag 没变就直接 304，不再序列化；
+需要返回内容时，按 Accept-Encoding 选压缩方式，编码 / 压缩后的 bytes 按 (ETag, 编码) 缓存，
+同一份数据再被请求时不再重复编码和压缩。
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable
+
+from fastapi import Request, Response
+
+from common import timing
+from common.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # brotli 可选，没有就只协商 gzip
+    brotli = None
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def make_etag(last_day: str, *parts: object) -> str:
+    """
+    弱 ETag：最后一根 K 线的日期 + 数据版本和请求参数的摘要。
+    弱比较，同一份数据的 gzip / br / 原文共用一个 ETag。
+    """
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode("utf-8"), digest_size=8).hexdigest()
+    return f'W/"{last_day}-{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(request: Request, etag: str, last_modified: float | None) -> bool:
+    """
+    有 If-None-Match 时只看 ETag（RFC 9110），否则再看 If-Modified-Since
+    """
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        return etag_matches(inm, etag)
+    ims = request.headers.get("if-modified-since")
+    if not ims or not last_modified:
+        return False
+    try:
+        return int(last_modified) <= parsedate_to_datetime(ims).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def negotiate(accept_encoding: str | None) -> str:
+    """
+    按 Accept-Encoding 的 q 值选一个我们支持的编码；都不接受时返回 identity
+    """
+    if not accept_encoding:
+        return "identity"
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = "identity", 0.0
+    for enc in ENCODINGS:
+        q = weights.get(enc, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    return body
+
+
+def conditional_response(
+    request: Request,
+    *,
+    etag: str,
+    last_modified: float | None,
+    render: Callable[[], bytes],
+    bodies: TTLCache | None = None,
+    min_compress_bytes: int = 1024,
+    media_type: str = "application/json",
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """
+    304 / 200 + 压缩。render 只在缓存里没有这份数据的编码结果时才会被调用。
+    """
+    headers = {
+        **(headers or {}),
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if last_modified:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    body = bodies.get((etag, encoding)) if bodies is not None else None
+    if body is None:
+        raw = bodies.get((etag, "identity")) if bodies is not None and encoding != "identity" else None
+        if raw is None:
+            with timing.stage("serialize"):
+                raw = render()
+        if len(raw) < min_compress_bytes:
+            encoding = "identity"
+        with timing.stage("compress"):
+            body = compress(raw, encoding)
+        if bodies is not None:
+            bodies.set((etag, "identity"), raw)
+            if encoding != "identity":
+                bodies.set((etag, encoding), body)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
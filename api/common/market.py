@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import math
+import os
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Iterable
+
+# A 股连续竞价 9:30 开盘，15:00 收盘；收盘后留一点余量给上游数据落地
+SESSION_OPEN = time(9, 30)
+SESSION_SETTLED_AT = (15, 30)
+
+
+class TradingCalendar:
+    """
+    A 股交易日历：周一到周五，去掉配置的节假日（TRADING_HOLIDAYS_FILE，每行一个 YYYY-MM-DD）。
+    没有配置节假日时，节假日会被当成交易日：只是多刷新几次，不会返回错误数据。
+    """
+
+    def __init__(self, holidays: Iterable[date] = ()):
+        self.holidays = frozenset(holidays)
+
+    @classmethod
+    def from_file(cls, path: str | None) -> "TradingCalendar":
+        if not path:
+            return cls()
+        try:
+            lines = Path(path).read_text().splitlines()
+        except OSError:
+            return cls()
+        return cls(date.fromisoformat(s.strip()) for s in lines if s.strip() and not s.startswith("#"))
+
+    def is_trading_day(self, d: date) -> bool:
+        return d.weekday() < 5 and d not in self.holidays
+
+    def in_live_window(self, now: datetime) -> bool:
+        """
+        当天的 K 线还在变化：交易日开盘到收盘落地之间
+        """
+        return (
+            self.is_trading_day(now.date())
+            and now.time() >= SESSION_OPEN
+            and (now.hour, now.minute) < SESSION_SETTLED_AT
+        )
+
+    def settled_through(self, now: datetime | None = None) -> date:
+        """
+        最后一个"数据不会再变"的日期：收盘之后是今天，否则是昨天。
+        非交易日没有交易，当天也视为已定。
+        """
+        now = now or datetime.now()
+        today = now.date()
+        if not self.is_trading_day(today) or (now.hour, now.minute) >= SESSION_SETTLED_AT:
+            return today
+        return today - timedelta(days=1)
+
+    def next_open(self, now: datetime) -> datetime:
+        d = now.date()
+        while True:
+            opening = datetime.combine(d, SESSION_OPEN)
+            if self.is_trading_day(d) and opening > now:
+                return opening
+            d += timedelta(days=1)
+
+    def ttl_for(self, last_day: date, *, live_ttl: float, adjust: str = "", now: datetime | None = None) -> float:
+        """
+        数据截止到 last_day 的缓存项应该保留多少秒：
+
+        - 包含未收盘交易日：盘中用 live_ttl，盘外保留到下一次开盘
+        - 只包含已收盘交易日：不过期（容量由 LRU 控制）；
+          前复权（qfq）除权时会整体改写历史，保留到下一次开盘
+        """
+        now = now or datetime.now()
+        until_open = max(1.0, (self.next_open(now) - now).total_seconds())
+        if last_day > self.settled_through(now):
+            return live_ttl if self.in_live_window(now) else until_open
+        if adjust == "qfq":
+            return until_open
+        return math.inf
+
+
+calendar = TradingCalendar.from_file(os.getenv("TRADING_HOLIDAYS_FILE", ""))
+
+
+def settled_through(now: datetime | None = None) -> date:
+    return calendar.settled_through(now)
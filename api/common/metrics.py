@@ -0,0 +1,182 @@
+"""
+Prometheus 文本格式（0.0.4）的指标：计数器、仪表、直方图，外加服务统计里的数值（/metrics 导出）。
+
+不依赖 prometheus_client：只需要进程内聚合 + 文本输出。多 worker 部署时每个 worker 各自导出，
+由 Prometheus 按实例汇总。
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Iterable
+
+# 秒；覆盖从缓存命中（亚毫秒）到上游超时（数秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIX = "stock_api"
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_:]")
+
+
+def _name(*parts: str) -> str:
+    return _NAME_RE.sub("_", "_".join(p for p in parts if p))
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if isinstance(v, float) and v.is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(v)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = _name(PREFIX, name)
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # 每组 label：[各桶计数（非累计）..., +Inf 桶], 总和
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][i] += 1
+            series[1][0] += value
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s[0])) for k, (c, s) in self._series.items())
+        out = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), counts):
+                cumulative += n
+                le = f'le="{_fmt(float(bound))}"'
+                out.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.label_names, key)} {_fmt(total)}")
+            out.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return out
+
+
+_registry: list[_Metric] = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def counter(name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+    return _register(Counter(name, help, labels))
+
+
+def gauge(name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+    return _register(Gauge(name, help, labels))
+
+
+def histogram(name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labels, buckets))
+
+
+def _flatten(prefix: str, value: Any, out: dict[str, float]) -> None:
+    if isinstance(value, bool):
+        out[prefix] = float(value)
+    elif isinstance(value, (int, float)) and math.isfinite(value):
+        out[prefix] = float(value)
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(f"{prefix}_{k}", v, out)
+
+
+def _stats_lines(stats: Callable[[], dict[str, Any]]) -> list[str]:
+    """
+    stats() 里的数值（缓存命中率、上游错误 / 重试次数、熔断状态……）导出为 gauge；
+    非数值（如熔断状态字符串）跳过
+    """
+    values: dict[str, float] = {}
+    for source, snap in stats().items():
+        _flatten(source, snap, values)
+    lines = []
+    for key, v in sorted(values.items()):
+        name = _name(PREFIX, key)
+        lines += [f"# TYPE {name} gauge", f"{name} {_fmt(v)}"]
+    return lines
+
+
+def render(stats: Callable[[], dict[str, Any]] | None = None) -> str:
+    """
+    所有注册的指标；stats 是服务的统计函数（/stats 的内容），其中的数值一起导出
+    """
+    lines: list[str] = []
+    for metric in _registry:
+        lines += metric.render()
+    if stats is not None:
+        lines += _stats_lines(stats)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from common.market import settled_through
+
+# 每个 (symbol, adjust) 一个分区：bars.npy（结构化数组，可 mmap）+ meta.json（已覆盖的日期区间）
+BAR_DTYPE = np.dtype(
+    [
+        ("date", "<i4"),      # days since 1970-01-01
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("volume", "<i8"),
+    ]
+)
+
+COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+
+FetchFn = Callable[[str, date, date, str], pd.DataFrame]
+
+
+def _to_days(d: date) -> int:
+    return (d - date(1970, 1, 1)).days
+
+
+def _from_days(n: int) -> date:
+    return date(1970, 1, 1) + timedelta(days=int(n))
+
+
+def frame_to_bars(df: pd.DataFrame) -> np.ndarray:
+    if df is None or df.empty:
+        return np.empty(0, dtype=BAR_DTYPE)
+    bars = np.empty(len(df), dtype=BAR_DTYPE)
+    bars["date"] = pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+    for c in ("open", "high", "low", "close"):
+        bars[c] = df[c].to_numpy(dtype=np.float64)
+    bars["volume"] = df["volume"].to_numpy(dtype=np.int64)
+    return bars
+
+
+def bars_to_frame(bars: np.ndarray) -> pd.DataFrame:
+    df = pd.DataFrame({c: np.asarray(bars[c]) for c in COLUMNS[1:]})
+    df.insert(0, "date", np.asarray(bars["date"], dtype=np.int64).astype("datetime64[D]").astype(object))
+    return df
+
+
+def _merge(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    # 按日期去重，新数据覆盖旧数据
+    if len(old) == 0:
+        merged = new
+    elif len(new) == 0:
+        merged = old
+    else:
+        merged = np.concatenate([old, new])
+    if len(merged) == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    order = np.argsort(merged["date"], kind="stable")
+    merged = merged[order]
+    keep = np.ones(len(merged), dtype=bool)
+    keep[:-1] = merged["date"][1:] != merged["date"][:-1]
+    return merged[keep]
+
+
+class OhlcvStore:
+    """
+    本地日线存储：已收盘的日线不会再变，落盘后只增量拉取缺失的日期。
+
+    - 每个 (symbol, adjust) 一个分区目录，进程重启后仍然可用
+    - 读取用 np.load(mmap_mode='r')，不把整个分区读进内存
+    - 写入先写临时文件再 os.replace，读者永远看到完整文件
+    - 未收盘（今天）的数据只透传，不落盘
+    """
+
+    def __init__(self, root: str | os.PathLike, fetch: FetchFn):
+        self.root = Path(root)
+        self._fetch = fetch
+        self._locks: dict[tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    # ---------- 分区读写 ----------
+
+    def _dir(self, symbol: str, adjust: str) -> Path:
+        return self.root / (adjust or "raw") / symbol
+
+    def _lock(self, symbol: str, adjust: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((symbol, adjust), threading.Lock())
+
+    def _load(self, symbol: str, adjust: str) -> tuple[np.ndarray, tuple[int, int] | None]:
+        d = self._dir(symbol, adjust)
+        try:
+            meta = json.loads((d / "meta.json").read_text())
+            bars = np.load(d / "bars.npy", mmap_mode="r")
+        except (FileNotFoundError, ValueError, OSError):
+            return np.empty(0, dtype=BAR_DTYPE), None
+        if bars.dtype != BAR_DTYPE:
+            return np.empty(0, dtype=BAR_DTYPE), None
+        return bars, (int(meta["start"]), int(meta["end"]))
+
+    def _save(self, symbol: str, adjust: str, bars: np.ndarray, coverage: tuple[int, int]) -> None:
+        d = self._dir(symbol, adjust)
+        d.mkdir(parents=True, exist_ok=True)
+
+        tmp = d / f"bars.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+        np.save(tmp, np.ascontiguousarray(bars, dtype=BAR_DTYPE))
+        os.replace(tmp, d / "bars.npy")
+
+        tmp = d / f"meta.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_text(json.dumps({"start": coverage[0], "end": coverage[1]}))
+        os.replace(tmp, d / "meta.json")
+
+    def invalidate(self, symbol: str, adjust: str) -> None:
+        d = self._dir(symbol, adjust)
+        for name in ("meta.json", "bars.npy"):
+            try:
+                (d / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    # ---------- 对外接口 ----------
+
+    def get(self, symbol: str, start: date, end: date, adjust: str = "") -> pd.DataFrame:
+        """
+        返回 [start, end] 的日线（列：date, open, high, low, close, volume），
+        本地已有的部分直接读盘，只向上游请求缺的那一段。
+        """
+        settled = _to_days(settled_through())
+        lo, hi = _to_days(start), _to_days(end)
+
+        with self._lock(symbol, adjust):
+            bars = self._sync(symbol, adjust, lo, min(hi, settled))
+
+        sel = bars[(bars["date"] >= lo) & (bars["date"] <= hi)]
+        out = bars_to_frame(sel)
+
+        # 未收盘的部分每次都问上游，不落盘
+        if hi > settled:
+            live = self._fetch(symbol, _from_days(max(lo, settled + 1)), end, adjust)
+            if live is not None and not live.empty:
+                out = pd.concat([out, live[COLUMNS]], ignore_index=True)
+
+        return out
+
+    def _sync(self, symbol: str, adjust: str, lo: int, hi: int) -> np.ndarray:
+        bars, coverage = self._load(symbol, adjust)
+        if lo > hi:
+            return np.asarray(bars)
+
+        if coverage is None:
+            fetched = frame_to_bars(self._fetch(symbol, _from_days(lo), _from_days(hi), adjust))
+            # 空结果不记覆盖：可能是上游出错 / 被限流 / 返回格式不对，下次请求再问上游
+            if len(fetched):
+                self._save(symbol, adjust, fetched, (lo, hi))
+            return fetched
+
+        cov_lo, cov_hi = coverage
+        if cov_lo <= lo and hi <= cov_hi:
+            return bars
+
+        # 只有拿到数据的一侧才扩展覆盖区间：正常的尾部回复至少包含重叠的那一根，
+        # 空的头部 / 尾部不当作「这段日期没有 K 线」落盘（上市前的区间因此每次都会再问一次）
+        parts = []
+        new_lo, new_hi = cov_lo, cov_hi
+
+        if lo < cov_lo:
+            head = frame_to_bars(self._fetch(symbol, _from_days(lo), _from_days(cov_lo - 1), adjust))
+            if len(head):
+                parts.append(head)
+                new_lo = lo
+
+        if hi > cov_hi:
+            # 从最后一根已存的 K 线开始拉，用重叠的那一根校验历史是否被复权改写
+            tail_lo = int(bars["date"][-1]) if len(bars) else cov_hi + 1
+            tail = frame_to_bars(self._fetch(symbol, _from_days(tail_lo), _from_days(hi), adjust))
+            if len(bars) and not self._overlap_consistent(bars[-1], tail):
+                full_lo, full_hi = min(lo, cov_lo), max(hi, cov_hi)
+                fetched = frame_to_bars(self._fetch(symbol, _from_days(full_lo), _from_days(full_hi), adjust))
+                if not len(fetched):
+                    return np.asarray(bars)
+                self._save(symbol, adjust, fetched, (full_lo, full_hi))
+                return fetched
+            if len(tail):
+                parts.append(tail)
+                new_hi = hi
+
+        if not parts:
+            return np.asarray(bars)
+        merged = _merge(np.asarray(bars), np.concatenate(parts))
+        self._save(symbol, adjust, merged, (new_lo, new_hi))
+        return merged
+
+    @staticmethod
+    def _overlap_consistent(last: np.void, tail: np.ndarray) -> bool:
+        same_day = tail[tail["date"] == last["date"]]
+        if len(same_day) == 0:
+            return True
+        return bool(np.isclose(same_day["close"][0], last["close"], rtol=0, atol=1e-6))
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+from common import ratelimit
+
+
+class Revalidator:
+    """
+    后台刷新：同一个 key 同时最多一个刷新任务，异常只计数不外抛（旧值继续可用）。
+    刷新以 BACKGROUND 优先级访问上游，排在交互请求后面
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cache-revalidate")
+        self._lock = threading.Lock()
+        self._pending: set[Hashable] = set()
+
+        self.submitted = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def submit(self, key: Hashable, fn: Callable[[], Any]) -> bool:
+        with self._lock:
+            if key in self._pending:
+                self.skipped += 1
+                return False
+            self._pending.add(key)
+            self.submitted += 1
+
+        def _run():
+            try:
+                with ratelimit.priority(ratelimit.BACKGROUND):
+                    fn()
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+        self._pool.submit(_run)
+        return True
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "skipped": self.skipped,
+                "failed": self.failed,
+                "pending": len(self._pending),
+            }
+
+
+class TokenBucket:
+    """
+    每分钟最多 per_minute 个令牌，允许瞬时用完整分钟的额度
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(0.0, float(per_minute))
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class Prewarmer:
+    """
+    统计被请求最多的 key（按半衰期指数衰减的访问计数），
+    后台线程定期检查其中前 top_n 个：缓存还剩不到 lead_seconds 就过期（或已陈旧）时提前刷新。
+    每次刷新消耗一个上游预算令牌，预算用完本轮就停止。
+
+    - remaining(key)：缓存剩余秒数，不在缓存里返回 None（不知道要刷新的范围，跳过）
+    - refresh(key)：重新拉取并写回缓存，通过 Revalidator 执行，与陈旧命中触发的刷新去重
+    - autostart=True 时第一次 touch 才启动后台线程，否则由调用方执行 run_once
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[Hashable], Any],
+        remaining: Callable[[Hashable], float | None],
+        *,
+        revalidator: Revalidator,
+        top_n: int = 50,
+        interval_seconds: float = 5.0,
+        lead_seconds: float = 15.0,
+        budget_per_minute: float = 60.0,
+        half_life_seconds: float = 300.0,
+        max_tracked: int = 10_000,
+        enabled: bool = True,
+        autostart: bool = True,
+    ):
+        self._refresh = refresh
+        self._remaining = remaining
+        self._revalidator = revalidator
+        self.top_n = top_n
+        self.interval_seconds = interval_seconds
+        self.lead_seconds = lead_seconds
+        self.half_life_seconds = half_life_seconds
+        self.max_tracked = max_tracked
+        self.enabled = enabled
+        self.autostart = autostart
+        self._budget = TokenBucket(budget_per_minute)
+
+        self._lock = threading.Lock()
+        self._scores: dict[Hashable, float] = {}
+        self._decayed_at = time.monotonic()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+        self.runs = 0
+        self.refreshed = 0
+        self.over_budget = 0
+
+    def touch(self, key: Hashable) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._scores[key] = self._scores.get(key, 0.0) + 1.0
+            if self.autostart and self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="cache-prewarm", daemon=True)
+                self._thread.start()
+
+    def hot(self) -> list[Hashable]:
+        with self._lock:
+            return heapq.nlargest(self.top_n, self._scores, key=self._scores.__getitem__)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception:
+                pass
+
+    def _decay(self) -> None:
+        now = time.monotonic()
+        factor = 0.5 ** ((now - self._decayed_at) / self.half_life_seconds)
+        self._decayed_at = now
+        self._scores = {k: v * factor for k, v in self._scores.items() if v * factor >= 0.05}
+        if len(self._scores) > self.max_tracked:
+            keep = heapq.nlargest(self.max_tracked // 2, self._scores.items(), key=lambda kv: kv[1])
+            self._scores = dict(keep)
+
+    def run_once(self) -> int:
+        """
+        执行一轮检查，返回提交的刷新数
+        """
+        with self._lock:
+            self._decay()
+            self.runs += 1
+        submitted = 0
+        for key in self.hot():
+            left = self._remaining(key)
+            if left is None or left > self.lead_seconds:
+                continue
+            if not self._budget.take():
+                with self._lock:
+                    self.over_budget += 1
+                break
+            if self._revalidator.submit(key, lambda k=key: self._refresh(k)):
+                submitted += 1
+        with self._lock:
+            self.refreshed += submitted
+        return submitted
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "tracked": len(self._scores),
+                "runs": self.runs,
+                "refreshed": self.refreshed,
+                "over_budget": self.over_budget,
+            }
@@ -0,0 +1,188 @@
+"""
+上游（akshare）限流：令牌桶 + 并发上限 + 优先级队列，速率按上游的错误 / 超时自适应（AIMD）。
+
+- 每次上游调用前 acquire，调用结束（包括超时后仍在跑的调用真正结束时）release
+- 排队按优先级：交互请求 > 批量接口 > 后台刷新 / 预热；同优先级先到先得
+- 成功一次速率加 max_rate * increase，失败（错误 / 超时）速率乘 decrease，
+  冷却期内只降一次，避免一串同时失败的请求把速率直接压到最低
+- 优先级通过 contextvar 传递：`with ratelimit.priority(ratelimit.BATCH): ...`
+"""
+from __future__ import annotations
+
+import contextvars
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from common import metrics
+
+INTERACTIVE = 0
+BATCH = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BACKGROUND: "background"}
+
+WAIT_SECONDS = metrics.histogram("upstream_limiter_wait_seconds", "Time spent waiting for an upstream slot", ["priority"])
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class RateLimitTimeout(Exception):
+    """
+    在 timeout 内没拿到上游配额
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"upstream rate limited, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        *,
+        rate: float,
+        burst: float,
+        max_concurrency: int,
+        min_rate: float = 1.0,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        cooldown_seconds: float = 1.0,
+    ):
+        self.max_rate = max(float(rate), 1e-3)
+        self.min_rate = min(max(float(min_rate), 1e-3), self.max_rate)
+        self.rate = self.max_rate
+        self.burst = max(float(burst), 1.0)
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown_seconds = cooldown_seconds
+
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._last_decrease = 0.0
+        self._active = 0
+        self._queue: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+
+        self._queued = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._acquired = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._timeouts = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._wait_seconds = dict.fromkeys(PRIORITY_NAMES, 0.0)
+        self.increases = 0
+        self.decreases = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, timeout: float | None = None, priority: int | None = None) -> float:
+        """
+        排队直到轮到自己、有令牌且并发未满；返回等待的秒数。
+        timeout 内没拿到时抛 RateLimitTimeout。
+        """
+        level = _priority.get() if priority is None else priority
+        t0 = time.monotonic()
+        deadline = None if timeout is None else t0 + timeout
+        entry = (level, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            self._queued[level] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self._queue[0] == entry and self._active < self.max_concurrency:
+                        self._refill(now)
+                        if self._tokens >= 1.0:
+                            break
+                        wait = (1.0 - self._tokens) / self.rate
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._timeouts[level] += 1
+                            raise RateLimitTimeout(self._retry_after())
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._queued[level] -= 1
+                if self._queue[0] == entry:
+                    heapq.heappop(self._queue)
+                else:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                # 队首变了，让下一个等待者重新检查
+                self._cond.notify_all()
+
+            self._tokens -= 1.0
+            self._active += 1
+            waited = time.monotonic() - t0
+            self._acquired[level] += 1
+            self._wait_seconds[level] += waited
+        WAIT_SECONDS.observe(waited, priority=PRIORITY_NAMES.get(level, str(level)))
+        return waited
+
+    def release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def record(self, ok: bool) -> None:
+        """
+        一次上游调用的结果（错误 / 超时算失败），用来调整速率
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if ok:
+                if self.rate < self.max_rate:
+                    self.rate = min(self.max_rate, self.rate + self.max_rate * self.increase)
+                    self.increases += 1
+            elif now - self._last_decrease >= self.cooldown_seconds:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+                self.decreases += 1
+            self._cond.notify_all()
+
+    def _retry_after(self) -> float:
+        # 排在前面的请求按当前速率全部放行大约需要多久
+        return max(1.0, math.ceil(len(self._queue) / self.rate))
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "rate": round(self.rate, 3),
+                "max_rate": self.max_rate,
+                "tokens": round(self._tokens, 3),
+                "active": self._active,
+                "max_concurrency": self.max_concurrency,
+                "queued": len(self._queue),
+                "increases": self.increases,
+                "decreases": self.decreases,
+                **{
+                    name: {
+                        "queued": self._queued[level],
+                        "acquired": self._acquired[level],
+                        "timeouts": self._timeouts[level],
+                        "avg_wait_ms": round(self._wait_seconds[level] / self._acquired[level] * 1000, 3)
+                        if self._acquired[level]
+                        else 0.0,
+                    }
+                    for level, name in PRIORITY_NAMES.items()
+                },
+            }
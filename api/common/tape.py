@@ -0,0 +1,365 @@
+"""
+上游录制 / 回放：离线压测时代替 akshare，不访问网络、不被限流。
+
+    cd api
+    # 录制：直接拉一批 symbol 的不复权日线 + qfq / hfq 因子（与本地复权的取数一致）
+    python -m common.tape record --symbols-file universe.txt --start 2015-01-01 \
+        --tape-dir stock_api_new/.data/upstream_tape
+    # 也可以 UPSTREAM_MODE=record 正常跑服务，经过的上游调用都会录下来
+    # 回放：服务照常运行（两个服务都可以），上游调用从磁带里取
+    cd stock_api_new
+    UPSTREAM_MODE=replay REPLAY_LATENCY=heavy_tail REPLAY_FAILURE_RATE=0.01 uvicorn app.main:app
+
+- 替换的是 akshare 这一层（stock_zh_a_hist / stock_zh_a_daily），限流、超时重试、熔断、
+  本地存储和缓存都照常经过，压测看到的是它们在真实上游耗时下的表现
+- 磁带目录：index.jsonl（每次调用一行：函数、symbol、adjust、区间、耗时）+ 每次调用一个
+  .npz（按列压缩存原始 DataFrame）；两个服务用的都是这个模块，磁带可以互相回放
+- 日线按 (symbol, adjust) 回放：取起点覆盖请求的录制里最新的一份，再按日期截出请求的区间；
+  磁带里没有的调用默认抛 TapeMiss（服务里是 502）：当成无数据的话，缺一份因子录制就会被当成
+  “没有复权因子”，缺日线会让压测在漏录的 symbol 上悄悄返回 404；
+  REPLAY_MISS=empty 时回放为空表（与 akshare 对未知代码的行为一致）
+- 延迟：constant（固定 REPLAY_LATENCY_MS）、recorded（录制时的实际耗时）、
+  heavy_tail（中位数 REPLAY_LATENCY_MS 的对数正态，sigma=REPLAY_LATENCY_SIGMA）；
+  REPLAY_FAILURE_RATE 的概率在延迟之后抛 ConnectionError
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from common.adjust import ADJUSTS, sina_symbol
+
+LATENCY_PROFILES = ("constant", "recorded", "heavy_tail")
+MISS_POLICIES = ("empty", "error")
+
+_HIST = "stock_zh_a_hist"
+_DAILY = "stock_zh_a_daily"
+_HIST_DATE = "日期"
+
+
+class TapeMiss(LookupError):
+    pass
+
+
+def _save_frame(path: Path, df: pd.DataFrame) -> None:
+    # 数值 / 日期列按原 dtype，其余列转成定长字符串：np.load 不需要 allow_pickle
+    arrays = {"__columns__": np.array([str(c) for c in df.columns])}
+    for i, c in enumerate(df.columns):
+        values = df[c].to_numpy()
+        arrays[f"c{i}"] = values if values.dtype.kind in "biufM" else values.astype(str)
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp.npz")
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def _load_frame(path: Path) -> pd.DataFrame:
+    with np.load(path) as npz:
+        columns = npz["__columns__"].tolist()
+        return pd.DataFrame({c: npz[f"c{i}"] for i, c in enumerate(columns)}, columns=columns)
+
+
+class Tape:
+    """
+    一个磁带目录：追加写的索引 + 每次调用一个 .npz，读过的表在内存里留 max_frames 份
+    """
+
+    def __init__(self, root: str | os.PathLike, *, max_frames: int = 1024):
+        self.root = Path(root)
+        self.max_frames = max(1, max_frames)
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str, str], list[dict[str, Any]]] = {}
+        self._frames: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        index = self.root / "index.jsonl"
+        if index.is_file():
+            for line in index.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    self._add(json.loads(line))
+
+    def _add(self, entry: dict[str, Any]) -> None:
+        self._entries.setdefault((entry["fn"], entry["symbol"], entry["adjust"]), []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._entries.values())
+
+    def symbols(self) -> list[str]:
+        return sorted({symbol for fn, symbol, _ in self._entries if fn == _HIST})
+
+    def record(
+        self, fn: str, symbol: str, adjust: str, start: str, end: str, df: pd.DataFrame, latency_ms: float
+    ) -> None:
+        key = f"{fn}\x1f{symbol}\x1f{adjust}\x1f{start}\x1f{end}\x1f{time.time_ns()}"
+        name = f"{fn}/{symbol}/{hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()}.npz"
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _save_frame(path, df if df is not None else pd.DataFrame())
+        entry = {
+            "fn": fn,
+            "symbol": symbol,
+            "adjust": adjust,
+            "start": start,
+            "end": end,
+            "file": name,
+            "rows": 0 if df is None else len(df),
+            "latency_ms": round(latency_ms, 3),
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            with open(self.root / "index.jsonl", "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._add(entry)
+
+    def find(self, fn: str, symbol: str, adjust: str, start: str = "", end: str = "") -> dict[str, Any]:
+        entries = self._entries.get((fn, symbol, adjust))
+        if not entries:
+            raise TapeMiss(f"no recording for {fn}({symbol!r}, adjust={adjust!r})")
+        if fn != _HIST:
+            return entries[-1]
+        # 起点覆盖请求的录制优先，其中区间最新的；录制到的日期之后的部分回放为空
+        return max(entries, key=lambda e: (not start or e["start"] <= start, e["end"], e["recorded_at"]))
+
+    def frame(self, entry: dict[str, Any]) -> pd.DataFrame:
+        name = entry["file"]
+        with self._lock:
+            df = self._frames.get(name)
+            if df is not None:
+                self._frames.move_to_end(name)
+                return df
+        df = _load_frame(self.root / name)
+        with self._lock:
+            self._frames[name] = df
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+        return df
+
+
+def _slice(df: pd.DataFrame, start: str, end: str) -> pd.DataFrame:
+    if df.empty or _HIST_DATE not in df.columns:
+        return df.copy()
+    days = pd.to_datetime(df[_HIST_DATE]).dt.strftime("%Y%m%d")
+    mask = np.ones(len(df), dtype=bool)
+    if start:
+        mask &= (days >= start).to_numpy()
+    if end:
+        mask &= (days <= end).to_numpy()
+    return df[mask].reset_index(drop=True)
+
+
+class Recorder:
+    """
+    和 akshare 模块同样的两个函数：调用真实上游，把结果和耗时写进磁带再原样返回
+    """
+
+    def __init__(self, tape: Tape, upstream: Any):
+        self.tape = tape
+        self._upstream = upstream
+
+    def _timed(self, fn: Callable[[], pd.DataFrame]) -> tuple[pd.DataFrame, float]:
+        t0 = time.perf_counter()
+        df = fn()
+        return df, (time.perf_counter() - t0) * 1000
+
+    def stock_zh_a_hist(
+        self, symbol: str, period: str = "daily", start_date: str = "", end_date: str = "", adjust: str = ""
+    ) -> pd.DataFrame:
+        df, ms = self._timed(
+            lambda: self._upstream.stock_zh_a_hist(
+                symbol=symbol, period=period, start_date=start_date, end_date=end_date, adjust=adjust
+            )
+        )
+        self.tape.record(_HIST, symbol, adjust, start_date, end_date, df, ms)
+        return df
+
+    def stock_zh_a_daily(self, symbol: str, start_date: str = "", end_date: str = "", adjust: str = "") -> pd.DataFrame:
+        kwargs = {"symbol": symbol, "adjust": adjust}
+        if start_date:
+            kwargs["start_date"] = start_date
+        if end_date:
+            kwargs["end_date"] = end_date
+        df, ms = self._timed(lambda: self._upstream.stock_zh_a_daily(**kwargs))
+        self.tape.record(_DAILY, symbol, adjust, start_date, end_date, df, ms)
+        return df
+
+    def stats(self) -> dict[str, Any]:
+        return {"mode": "record", "recordings": len(self.tape)}
+
+
+class Replayer:
+    """
+    和 akshare 模块同样的两个函数：从磁带回放，按延迟配置 sleep，按概率注入失败
+    """
+
+    def __init__(
+        self,
+        tape: Tape,
+        *,
+        latency: str = "recorded",
+        latency_ms: float = 50.0,
+        sigma: float = 1.0,
+        failure_rate: float = 0.0,
+        miss: str = "error",
+        seed: int = 0,
+    ):
+        if latency not in LATENCY_PROFILES:
+            raise ValueError(f"latency must be one of {LATENCY_PROFILES}, got {latency!r}")
+        if miss not in MISS_POLICIES:
+            raise ValueError(f"miss must be one of {MISS_POLICIES}, got {miss!r}")
+        self.tape = tape
+        self.miss = miss
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.misses = 0
+        self.failures = 0
+
+    def _delay(self, entry: dict[str, Any]) -> tuple[float, bool]:
+        with self._lock:
+            self.calls += 1
+            if self.latency == "constant":
+                ms = self.latency_ms
+            elif self.latency == "recorded":
+                ms = entry["latency_ms"]
+            else:
+                ms = self._rng.lognormvariate(np.log(max(self.latency_ms, 1e-3)), self.sigma)
+            fail = self._rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        return ms / 1000, fail
+
+    def _replay(self, fn: str, symbol: str, adjust: str, start: str = "", end: str = "") -> pd.DataFrame:
+        try:
+            entry = self.tape.find(fn, symbol, adjust, start, end)
+        except TapeMiss:
+            with self._lock:
+                self.calls += 1
+                self.misses += 1
+            if self.miss == "error":
+                raise
+            return pd.DataFrame()
+        seconds, fail = self._delay(entry)
+        time.sleep(seconds)
+        if fail:
+            raise ConnectionError("injected upstream failure")
+        df = self.tape.frame(entry)
+        return _slice(df, start, end) if fn == _HIST else df.copy()
+
+    def stock_zh_a_hist(
+        self, symbol: str, period: str = "daily", start_date: str = "", end_date: str = "", adjust: str = ""
+    ) -> pd.DataFrame:
+        return self._replay(_HIST, symbol, adjust, start_date, end_date)
+
+    def stock_zh_a_daily(self, symbol: str, start_date: str = "", end_date: str = "", adjust: str = "") -> pd.DataFrame:
+        return self._replay(_DAILY, symbol, adjust)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": "replay",
+                "latency": self.latency,
+                "recordings": len(self.tape),
+                "calls": self.calls,
+                "misses": self.misses,
+                "injected_failures": self.failures,
+            }
+
+
+def open_upstream(
+    mode: str,
+    tape_dir: str | os.PathLike,
+    *,
+    latency: str = "recorded",
+    latency_ms: float = 50.0,
+    sigma: float = 1.0,
+    failure_rate: float = 0.0,
+    miss: str = "error",
+    seed: int = 0,
+) -> Any:
+    """
+    live -> akshare 模块；record -> 包着 akshare 的 Recorder；replay -> Replayer（不导入 akshare）
+    """
+    if mode == "live":
+        return importlib.import_module("akshare")
+    if mode == "record":
+        return Recorder(Tape(tape_dir), importlib.import_module("akshare"))
+    if mode == "replay":
+        return Replayer(
+            Tape(tape_dir),
+            latency=latency,
+            latency_ms=latency_ms,
+            sigma=sigma,
+            failure_rate=failure_rate,
+            miss=miss,
+            seed=seed,
+        )
+    raise ValueError(f"unknown upstream mode: {mode!r} (live | record | replay)")
+
+
+# ---------- 命令行 ----------
+
+def _record_symbol(recorder: Recorder, symbol: str, start: date, end: date) -> str:
+    try:
+        recorder.stock_zh_a_hist(
+            symbol=symbol, period="daily", start_date=start.strftime("%Y%m%d"), end_date=end.strftime("%Y%m%d")
+        )
+        for adjust in ADJUSTS:
+            recorder.stock_zh_a_daily(symbol=sina_symbol(symbol), adjust=f"{adjust}-factor")
+    except Exception as e:
+        return f"{symbol}: {type(e).__name__}: {e}"
+    return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="从 akshare 录制一批 symbol")
+    rec.add_argument("--symbols", help="逗号分隔的股票代码")
+    rec.add_argument("--symbols-file", help="每行一个股票代码")
+    rec.add_argument("--start", type=date.fromisoformat, default=date(2015, 1, 1))
+    rec.add_argument("--end", type=date.fromisoformat, default=None, help="默认今天")
+    rec.add_argument("--tape-dir", default=os.getenv("UPSTREAM_TAPE_DIR", ".data/upstream_tape"))
+    rec.add_argument("--workers", type=int, default=2, help="并发录制的 symbol 数（别让 akshare 限流）")
+    info = sub.add_parser("info", help="磁带里有什么")
+    info.add_argument("--tape-dir", default=os.getenv("UPSTREAM_TAPE_DIR", ".data/upstream_tape"))
+    args = parser.parse_args()
+
+    if args.command == "info":
+        tape = Tape(args.tape_dir)
+        print(f"{args.tape_dir}: {len(tape)} recordings, {len(tape.symbols())} symbols")
+        return
+
+    symbols = [s.strip() for s in (args.symbols or "").split(",") if s.strip()]
+    if args.symbols_file:
+        symbols += [line.strip() for line in Path(args.symbols_file).read_text().splitlines() if line.strip()]
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        parser.error("needs --symbols or --symbols-file")
+
+    recorder = Recorder(Tape(args.tape_dir), importlib.import_module("akshare"))
+    end = args.end or date.today()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        errors = [e for e in pool.map(lambda s: _record_symbol(recorder, s, args.start, end), symbols) if e]
+    for e in errors:
+        print(e)
+    print(f"recorded {len(symbols) - len(errors)}/{len(symbols)} symbols to {args.tape_dir} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
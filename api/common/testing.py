@@ -0,0 +1,32 @@
+"""
+测试替身：两个服务和 common 自己的测试共用
+"""
+from __future__ import annotations
+
+import fnmatch
+import time
+
+
+class LocalRedis:
+    """
+    测试用的 Redis 替身：只实现 RedisCache 用到的命令
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expire_at = self.data.get(key, (None, None))
+        if expire_at is not None and time.time() >= expire_at:
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, px=None):
+        self.data[key] = (bytes(value), time.time() + px / 1000 if px else None)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, match="*"):
+        return [k for k in list(self.data) if fnmatch.fnmatch(k, match)]
@@ -0,0 +1,86 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from common.adjust import AdjustFactors, NoFactors, apply_factors, parse_factors, sina_symbol
+
+
+def _raw() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "date": [date(2024, 1, 2), date(2024, 6, 3), date(2024, 6, 4)],
+            "open": [10.0, 10.0, 5.0],
+            "high": [10.0, 10.0, 5.0],
+            "low": [10.0, 10.0, 5.0],
+            "close": [10.0, 10.0, 5.0],
+            "volume": [100, 100, 200],
+        }
+    )
+
+
+def test_factors_apply_from_their_effective_date():
+    # 2024-06-04 十送十：新浪的表按日期倒序
+    hfq = pd.DataFrame({"date": ["2024-06-04", "2023-01-01"], "hfq_factor": ["2.0", "1.0"]})
+    qfq = pd.DataFrame({"date": ["2024-06-04", "1900-01-01"], "qfq_factor": [1.0, 2.0]})
+
+    out = apply_factors(_raw(), *parse_factors(hfq), "hfq")
+    assert out["close"].tolist() == [10.0, 10.0, 10.0]
+    out = apply_factors(_raw(), *parse_factors(qfq), "qfq")
+    assert out["close"].tolist() == [5.0, 5.0, 5.0]
+    assert out["volume"].tolist() == [100, 100, 200]
+
+
+def test_no_factors_is_an_error_not_unadjusted_prices():
+    with pytest.raises(ValueError):
+        apply_factors(_raw(), *parse_factors(pd.DataFrame()), "qfq")
+
+
+def test_empty_factor_tables_are_not_cached():
+    calls = []
+
+    def fetch(symbol, adjust):
+        calls.append((symbol, adjust))
+        return pd.DataFrame()
+
+    factors = AdjustFactors(fetch)
+    assert len(factors.get("600519", "qfq")[1]) == 0
+    factors.get("600519", "qfq")
+    assert len(calls) == 2
+
+
+def test_codes_without_factors_are_cached_until_the_next_open():
+    calls = []
+
+    def fetch(symbol, adjust):
+        calls.append((symbol, adjust))
+        raise NoFactors(f"no {adjust} factors for {symbol}")
+
+    factors = AdjustFactors(fetch)
+    for _ in range(3):
+        assert len(factors.get("830799", "qfq")[1]) == 0
+    assert calls == [("830799", "qfq")]
+
+
+def test_factors_are_cached_per_symbol_and_adjust():
+    calls = []
+
+    def fetch(symbol, adjust):
+        calls.append((symbol, adjust))
+        return pd.DataFrame({"date": ["2024-06-04"], f"{adjust}_factor": [2.0]})
+
+    factors = AdjustFactors(fetch)
+    for _ in range(3):
+        factors.get("600519", "qfq")
+    factors.get("600519", "hfq")
+    assert calls == [("600519", "qfq"), ("600519", "hfq")]
+
+    factors.invalidate("600519")
+    factors.get("600519", "qfq")
+    assert len(calls) == 3
+
+
+def test_sina_symbol_prefix():
+    assert sina_symbol("600519") == "sh600519"
+    assert sina_symbol("000001") == "sz000001"
+    assert sina_symbol("830799") == "bj830799"
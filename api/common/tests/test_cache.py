@@ -0,0 +1,57 @@
+import time
+
+from common.cache import TTLCache
+
+
+def test_lru_eviction_by_entry_count():
+    cache = TTLCache(ttl_seconds=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" 变成最近使用
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget_bounds_cache():
+    cache = TTLCache(ttl_seconds=60, max_bytes=10_000)
+    for i in range(100):
+        cache.set(i, b"x" * 1_000)
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 10_000
+    assert stats["entries"] == 10
+
+    cache.set("huge", b"x" * 20_000)
+    assert cache.get("huge") is None
+
+
+def test_sweep_removes_expired_entries_without_reads():
+    cache = TTLCache(ttl_seconds=1, sweep_interval=0)
+    cache.set("a", 1)
+    cache.ttl_seconds = 0
+    cache.set("b", 2)
+    time.sleep(0.01)
+
+    # b 立即过期；下一次写入时被清扫掉，不需要有人读 "b"
+    cache.ttl_seconds = 60
+    cache.set("c", 3)
+    assert "b" not in cache._data
+    assert cache.stats()["expirations"] >= 1
+
+
+def test_stale_entry_served_within_grace_period():
+    cache = TTLCache(ttl_seconds=60, stale_seconds=30)
+    cache.set("a", 1)
+    cache._data["a"].expire_at = time.monotonic() - 1  # 一秒前过期
+
+    assert cache.get("a") is None
+    assert cache.get_or_stale("a") == (1, True)
+    assert cache.ttl_remaining("a") < 0
+
+    cache._data["a"].expire_at = time.monotonic() - 31  # 超出宽限期
+    assert cache.get_or_stale("a") == (None, False)
+    assert cache.stats()["stale_hits"] == 1
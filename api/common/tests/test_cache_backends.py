@@ -0,0 +1,52 @@
+import time
+from datetime import date
+
+import pytest
+from pydantic import BaseModel
+
+from common import codec
+from common.cache_backends import RedisCache, SqliteCache
+from common.testing import LocalRedis
+
+
+class Meta(BaseModel):
+    stock_code: str
+    start: date
+    end: date
+    rows: int
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_backend(request, tmp_path):
+    redis = LocalRedis()
+
+    def make(**kwargs):
+        if request.param == "sqlite":
+            return SqliteCache(tmp_path / "cache.sqlite3", **kwargs)
+        return RedisCache(redis, **kwargs)
+
+    return make
+
+
+def test_expiry_and_stale_semantics_match_ttl_cache(make_backend):
+    codec.register_model(Meta)
+    cache = make_backend(ttl_seconds=0.05, stale_seconds=60)
+    meta = Meta(stock_code="600519", start=date(2024, 1, 1), end=date(2024, 1, 31), rows=3)
+    cache.set("forever", {"a": [1, 2, 3]}, ttl=float("inf"))
+    cache.set("meta", meta)
+    time.sleep(0.06)
+
+    assert cache.get("forever") == {"a": [1, 2, 3]}
+    assert cache.get("meta") is None
+    assert cache.get_or_stale("meta") == (meta, True)
+    assert cache.ttl_remaining("meta") < 0
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_sqlite_evicts_least_recently_used(tmp_path):
+    cache = SqliteCache(tmp_path / "cache.sqlite3", ttl_seconds=60, max_entries=10)
+    cache.EVICT_EVERY = 1
+    for i in range(30):
+        cache.set(i, b"x" * 100)
+    assert cache.stats()["entries"] <= 10
+    assert cache.get(29) == b"x" * 100
@@ -0,0 +1,49 @@
+import gzip
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from common.cache import TTLCache
+from common.http_cache import conditional_response, etag_matches, make_etag, negotiate
+
+
+def test_negotiate_prefers_highest_q_supported_encoding():
+    assert negotiate(None) == "identity"
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0, identity") == "identity"
+    assert negotiate("*;q=0.5") in ("br", "gzip")
+
+
+def test_etag_weak_comparison():
+    etag = make_etag("20240628", "v1", "600519")
+    assert etag.startswith('W/"20240628-')
+    assert etag_matches(f'"other", {etag.removeprefix("W/")}', etag)
+    assert not etag_matches('W/"20240628-0000"', etag)
+    assert etag != make_etag("20240628", "v2", "600519")
+
+
+def test_not_modified_and_compressed_bodies_are_cached():
+    renders = []
+    bodies = TTLCache(ttl_seconds=60)
+    app = FastAPI()
+
+    @app.get("/x")
+    def x(request: Request):
+        def render():
+            renders.append(1)
+            return b'{"data":"' + b"a" * 4096 + b'"}'
+
+        return conditional_response(request, etag=make_etag("20240628", "v1"), last_modified=1_700_000_000, render=render, bodies=bodies)
+
+    client = TestClient(app)
+    first = client.get("/x", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["vary"] == "Accept-Encoding"
+    assert first.json()["data"] == "a" * 4096
+
+    assert client.get("/x", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    assert client.get("/x", headers={"If-Modified-Since": first.headers["last-modified"]}).status_code == 304
+    plain = client.get("/x", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert len(renders) == 1
+    assert gzip.decompress(bodies.get((first.headers["etag"], "gzip"))) == plain.content
@@ -0,0 +1,31 @@
+import math
+from datetime import date, datetime
+
+from common.market import TradingCalendar
+
+# 2024-10-01 ~ 10-07 国庆休市
+CAL = TradingCalendar(date(2024, 10, d) for d in range(1, 8))
+
+
+def test_closed_sessions_never_expire_except_qfq():
+    now = datetime(2024, 9, 27, 10, 0)  # 周五盘中
+    assert CAL.ttl_for(date(2024, 9, 26), live_ttl=60, now=now) == math.inf
+    # 前复权历史可能在下个交易日除权时被改写：保留到下一次开盘（周一）
+    ttl = CAL.ttl_for(date(2024, 9, 26), live_ttl=60, adjust="qfq", now=now)
+    assert ttl == (datetime(2024, 9, 30, 9, 30) - now).total_seconds()
+
+
+def test_live_bar_short_ttl_only_during_session():
+    today = date(2024, 9, 27)
+    assert CAL.ttl_for(today, live_ttl=60, now=datetime(2024, 9, 27, 10, 0)) == 60
+    # 开盘前：保留到 9:30
+    assert CAL.ttl_for(today, live_ttl=60, now=datetime(2024, 9, 27, 9, 0)) == 1800
+    # 收盘落地之后今天的 K 线也已定
+    assert CAL.ttl_for(today, live_ttl=60, now=datetime(2024, 9, 27, 16, 0)) == math.inf
+
+
+def test_holidays_are_settled_and_skip_to_next_open():
+    now = datetime(2024, 10, 3, 11, 0)
+    assert not CAL.in_live_window(now)
+    assert CAL.settled_through(now) == date(2024, 10, 3)
+    assert CAL.next_open(now) == datetime(2024, 10, 8, 9, 30)
@@ -0,0 +1,44 @@
+import time
+
+from common import metrics, timing
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = metrics.Histogram("test_seconds", "test", ["stage"], buckets=(0.01, 0.1))
+    h.observe(0.005, stage="a")
+    h.observe(0.05, stage="a")
+    h.observe(5.0, stage="a")
+    lines = h.render()
+    assert 'stock_api_test_seconds_bucket{stage="a",le="0.01"} 1' in lines
+    assert 'stock_api_test_seconds_bucket{stage="a",le="0.1"} 2' in lines
+    assert 'stock_api_test_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'stock_api_test_seconds_count{stage="a"} 3' in lines
+
+
+def test_stage_accumulates_into_current_request():
+    t = timing.Timings("abc")
+    token = timing._current.set(t)
+    try:
+        for _ in range(2):
+            with timing.stage("clean"):
+                time.sleep(0.001)
+    finally:
+        timing._current.reset(token)
+    assert t.stages["clean"] >= 0.002
+    assert t.header(0.01).startswith("clean;dur=")
+    assert t.header(0.01).endswith("total;dur=10.00")
+
+
+def test_render_exports_numeric_stats():
+    text = metrics.render(lambda: {"slow_requests": timing.slow_requests()})
+    assert "# TYPE stock_api_stage_duration_seconds histogram" in text
+    # 统计里的数值拍平成 gauge；列表（最近的慢请求）不导出
+    assert "stock_api_slow_requests_threshold_ms " in text
+    assert "slow_requests_recent" not in text
+
+
+def test_render_flattens_numeric_stats():
+    text = metrics.render(lambda: {"cache": {"hits": 3, "hit_ratio": 0.5}, "breaker": {"state": "closed"}})
+    assert "stock_api_cache_hits 3\n" in text
+    assert "stock_api_cache_hit_ratio 0.5\n" in text
+    assert "breaker" not in text
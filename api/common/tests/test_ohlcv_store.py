@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+from common import ohlcv_store
+from common.ohlcv_store import OhlcvStore
+
+
+def _fake_fetch(calls):
+    def fetch(symbol, start, end, adjust):
+        calls.append((start, end))
+        days = pd.bdate_range(start, end)
+        return pd.DataFrame(
+            {
+                "date": [d.date() for d in days],
+                "open": 10.0,
+                "high": 11.0,
+                "low": 9.0,
+                "close": [10.0 + d.day / 100 for d in days],
+                "volume": 1000,
+            }
+        )
+
+    return fetch
+
+
+def test_store_fetches_only_missing_dates(tmp_path, monkeypatch):
+    monkeypatch.setattr(ohlcv_store, "settled_through", lambda now=None: date(2024, 6, 28))
+    calls = []
+    store = OhlcvStore(tmp_path, fetch=_fake_fetch(calls))
+
+    df = store.get("600519", date(2024, 1, 1), date(2024, 3, 31), adjust="qfq")
+    assert len(calls) == 1
+    assert df["date"].iloc[0] == date(2024, 1, 1)
+
+    # 再读：不访问上游，换一个实例（进程重启）也一样
+    store = OhlcvStore(tmp_path, fetch=_fake_fetch(calls))
+    sub = store.get("600519", date(2024, 2, 1), date(2024, 2, 29), adjust="qfq")
+    assert len(calls) == 1
+    assert sub["date"].min() >= date(2024, 2, 1)
+    assert sub["date"].max() <= date(2024, 2, 29)
+
+    # 区间往后延：只拉尾部，从最后一根已存的 K 线开始
+    store.get("600519", date(2024, 1, 1), date(2024, 4, 30), adjust="qfq")
+    assert calls[-1] == (date(2024, 3, 29), date(2024, 4, 30))
+
+    full = store.get("600519", date(2024, 1, 1), date(2024, 4, 30), adjust="qfq")
+    assert len(calls) == 2
+    assert full["date"].is_unique
+
+
+def test_store_does_not_persist_unsettled_bars(tmp_path, monkeypatch):
+    settled = date(2024, 6, 27)
+    monkeypatch.setattr(ohlcv_store, "settled_through", lambda now=None: settled)
+    calls = []
+    store = OhlcvStore(tmp_path, fetch=_fake_fetch(calls))
+
+    store.get("000001", settled - timedelta(days=10), settled + timedelta(days=1))
+    store.get("000001", settled - timedelta(days=10), settled + timedelta(days=1))
+
+    # 已收盘的部分只拉一次，当天的每次都拉
+    assert calls.count((settled + timedelta(days=1), settled + timedelta(days=1))) == 2
+    assert len(calls) == 3
+
+
+def test_empty_replies_never_become_coverage(tmp_path, monkeypatch):
+    monkeypatch.setattr(ohlcv_store, "settled_through", lambda now=None: date(2024, 6, 28))
+    calls = []
+    good = _fake_fetch(calls)
+    reply = {"empty": True}
+
+    def fetch(symbol, start, end, adjust):
+        # 上游出错 / 被限流，表现为空表
+        return pd.DataFrame(columns=ohlcv_store.COLUMNS) if reply["empty"] else good(symbol, start, end, adjust)
+
+    store = OhlcvStore(tmp_path, fetch=fetch)
+    assert store.get("600519", date(2024, 1, 1), date(2024, 3, 31)).empty
+    reply["empty"] = False
+    assert not store.get("600519", date(2024, 1, 1), date(2024, 3, 31)).empty
+    assert len(calls) == 1
+
+    # 空的尾部不扩展覆盖区间，覆盖停在数据结束的地方
+    reply["empty"] = True
+    store.get("600519", date(2024, 1, 1), date(2024, 4, 30))
+    reply["empty"] = False
+    df = store.get("600519", date(2024, 1, 1), date(2024, 4, 30))
+    assert calls[-1] == (date(2024, 3, 29), date(2024, 4, 30))
+    assert df["date"].max() == date(2024, 4, 30)
@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+from common.ratelimit import BACKGROUND, INTERACTIVE, AdaptiveLimiter, RateLimitTimeout
+
+
+def test_interactive_requests_jump_ahead_of_background_work():
+    limiter = AdaptiveLimiter(rate=1000, burst=10, max_concurrency=1)
+    limiter.acquire()
+    order = []
+
+    def worker(level, name):
+        limiter.acquire(timeout=2, priority=level)
+        order.append(name)
+        limiter.release()
+
+    background = threading.Thread(target=worker, args=(BACKGROUND, "background"))
+    background.start()
+    while limiter.stats()["queued"] < 1:
+        time.sleep(0.001)
+    interactive = threading.Thread(target=worker, args=(INTERACTIVE, "interactive"))
+    interactive.start()
+    while limiter.stats()["queued"] < 2:
+        time.sleep(0.001)
+
+    limiter.release()
+    background.join()
+    interactive.join()
+    assert order == ["interactive", "background"]
+
+
+def test_acquire_times_out_when_no_tokens_left():
+    limiter = AdaptiveLimiter(rate=0.5, burst=1, max_concurrency=5)
+    limiter.acquire()
+    with pytest.raises(RateLimitTimeout) as exc:
+        limiter.acquire(timeout=0.05)
+    assert exc.value.retry_after >= 1
+    assert limiter.stats()["interactive"]["timeouts"] == 1
+
+
+def test_rate_backs_off_on_failures_and_recovers_on_success():
+    limiter = AdaptiveLimiter(rate=10, min_rate=1, burst=10, max_concurrency=5, cooldown_seconds=60)
+    limiter.record(False)
+    limiter.record(False)  # within the cooldown: only one decrease
+    assert limiter.rate == 5
+    for _ in range(20):
+        limiter.record(True)
+    assert limiter.rate == 10
@@ -0,0 +1,38 @@
+import threading
+import time
+
+import pytest
+
+from common.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "df"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["df"] * 8
+    assert flight.stats() == {"leaders": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_errors_propagate_and_key_is_released():
+    flight = SingleFlight()
+
+    def boom():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", boom)
+    assert flight.do("k", lambda: 1) == 1
@@ -0,0 +1,65 @@
+import time
+
+import pandas as pd
+import pytest
+
+from common.tape import Recorder, Replayer, Tape, TapeMiss
+
+
+class _Upstream:
+    @staticmethod
+    def stock_zh_a_hist(symbol, period="daily", start_date="", end_date="", adjust=""):
+        days = pd.bdate_range(start_date, end_date)
+        return pd.DataFrame(
+            {"日期": days.strftime("%Y-%m-%d"), "收盘": [10.0 + i for i in range(len(days))], "成交量": range(len(days))}
+        )
+
+    @staticmethod
+    def stock_zh_a_daily(symbol, start_date="", end_date="", adjust=""):
+        return pd.DataFrame({"date": pd.to_datetime(["2020-01-01", "2024-05-06"]), "qfq_factor": [1.25, 1.0]})
+
+
+def _record(tmp_path):
+    recorder = Recorder(Tape(tmp_path), _Upstream())
+    hist = recorder.stock_zh_a_hist(symbol="600519", start_date="20240101", end_date="20240630", adjust="")
+    factors = recorder.stock_zh_a_daily(symbol="sh600519", adjust="qfq-factor")
+    return hist, factors
+
+
+def test_replay_returns_recorded_frames_and_slices_ranges(tmp_path):
+    hist, factors = _record(tmp_path)
+    replayer = Replayer(Tape(tmp_path), latency="constant", latency_ms=0)
+
+    full = replayer.stock_zh_a_hist(symbol="600519", start_date="20240101", end_date="20240630", adjust="")
+    pd.testing.assert_frame_equal(full, hist, check_dtype=False)
+
+    part = replayer.stock_zh_a_hist(symbol="600519", start_date="20240301", end_date="20240331", adjust="")
+    days = pd.to_datetime(part["日期"])
+    assert len(part) > 0 and days.min() >= pd.Timestamp("2024-03-01") and days.max() <= pd.Timestamp("2024-03-31")
+
+    replayed = replayer.stock_zh_a_daily(symbol="sh600519", adjust="qfq-factor")
+    assert len(replayed) == len(factors)
+    pd.testing.assert_frame_equal(replayed, factors, check_dtype=False)
+
+    # 没录过的调用：默认当作上游出错，miss="empty" 时当作无数据
+    with pytest.raises(TapeMiss):
+        replayer.stock_zh_a_hist(symbol="000001", start_date="20240101", end_date="20240630", adjust="")
+    lenient = Replayer(Tape(tmp_path), latency="constant", latency_ms=0, miss="empty")
+    assert lenient.stock_zh_a_hist(symbol="000001", start_date="20240101", end_date="20240630", adjust="").empty
+    assert replayer.stats()["misses"] == 1 and lenient.stats()["misses"] == 1
+
+
+def test_replay_injects_failures_and_delays(tmp_path):
+    _record(tmp_path)
+    failing = Replayer(Tape(tmp_path), latency="constant", latency_ms=0, failure_rate=1.0)
+    with pytest.raises(ConnectionError):
+        failing.stock_zh_a_daily(symbol="sh600519", adjust="qfq-factor")
+    assert failing.stats()["injected_failures"] == 1
+
+    slow = Replayer(Tape(tmp_path), latency="heavy_tail", latency_ms=20, sigma=0.0)
+    t0 = time.perf_counter()
+    slow.stock_zh_a_daily(symbol="sh600519", adjust="qfq-factor")
+    assert time.perf_counter() - t0 >= 0.015
+
+    with pytest.raises(ValueError):
+        Replayer(Tape(tmp_path), latency="uniform")
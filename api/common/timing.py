@@ -0,0 +1,120 @@
+"""
+请求内各阶段耗时：上游调用、重试等待、清洗、缓存、序列化……
+
+- 代码里用 `with timing.stage("upstream"):` 包住一个阶段；同一请求内同名阶段累加
+- TimingMiddleware 为每个请求建一份记录，按 trace id 对应（请求的 X-Trace-Id 头，没有就生成一个，
+  写回响应），响应时写入 Server-Timing 头，并把各阶段 / 整个请求的耗时计入 /metrics 的直方图
+- 超过 SLOW_REQUEST_MS 的请求连同 trace id 和各阶段耗时留在 slow_requests() 里（/stats 导出）
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from common import metrics
+
+TRACE_HEADER = "X-Trace-Id"
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+STAGE_SECONDS = metrics.histogram("stage_duration_seconds", "Time spent in each request stage", ["stage"])
+REQUEST_SECONDS = metrics.histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route"])
+REQUESTS = metrics.counter("http_requests_total", "HTTP requests", ["method", "route", "status"])
+IN_FLIGHT = metrics.gauge("http_requests_in_flight", "HTTP requests being served")
+
+
+class Timings:
+    """
+    一个请求的阶段耗时（秒）；批量接口的线程池里也会写入，所以加锁
+    """
+
+    def __init__(self, trace_id: str | None = None):
+        self.trace_id = trace_id
+        self.stages: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def header(self, total: float | None = None) -> str:
+        with self._lock:
+            parts = [f"{name};dur={sec * 1000:.2f}" for name, sec in self.stages.items()]
+        if total is not None:
+            parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current: contextvars.ContextVar[Timings | None] = contextvars.ContextVar("timings", default=None)
+
+
+def current() -> Timings | None:
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        STAGE_SECONDS.observe(seconds, stage=name)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(name, seconds)
+
+
+_slow: deque[dict] = deque(maxlen=50)
+
+
+def slow_requests() -> dict:
+    return {"threshold_ms": SLOW_REQUEST_MS, "recent": list(_slow)}
+
+
+class TimingMiddleware(BaseHTTPMiddleware):
+    """
+    外面有设置 request.state.trace_id 的中间件（如 stock_api_new 的 TraceIdMiddleware）时沿用它的 trace id
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        trace_id = getattr(request.state, "trace_id", None) or request.headers.get(TRACE_HEADER) or secrets.token_hex(8)
+        timings = Timings(trace_id)
+        token = _current.set(timings)
+        IN_FLIGHT.inc()
+        t0 = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            total = time.perf_counter() - t0
+            IN_FLIGHT.dec()
+            _current.reset(token)
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(total, method=request.method, route=route)
+            REQUESTS.inc(method=request.method, route=route, status=str(status))
+
+        response.headers["Server-Timing"] = timings.header(total)
+        response.headers[TRACE_HEADER] = timings.trace_id
+        if total * 1000 >= SLOW_REQUEST_MS:
+            _slow.append(
+                {
+                    "trace_id": timings.trace_id,
+                    "method": request.method,
+                    "path": request.url.path,
+                    "status": status,
+                    "total_ms": round(total * 1000, 2),
+                    "stages_ms": {k: round(v * 1000, 2) for k, v in timings.stages.items()},
+                }
+            )
+        return response
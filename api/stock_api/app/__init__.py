@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# The infrastructure modules shared with stock_api_new live in api/common; the
+# service runs from its own directory, so put api/ on the path to import them
+_API_DIR = str(Path(__file__).resolve().parents[2])
+if _API_DIR not in sys.path:
+    sys.path.append(_API_DIR)
@@ -1,19 +1,43 @@
+import os
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi import Response
 from dotenv import load_dotenv
 
 from app.routers.health import router as health_router
 from app.routers.stocks import router as stocks_router
+from app.routers.stats import router as stats_router
+from app.routers.metrics import router as metrics_router
+from app.services import akshare_client
+from common.timing import TimingMiddleware
 
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # akshare is imported lazily; load it in the background so the first request
+    # doesn't pay for it, without holding up startup (/health answers right away)
+    if os.getenv("UPSTREAM_WARM_UP", "1") == "1":
+        threading.Thread(target=akshare_client.warm_up, name="upstream-warm-up", daemon=True).start()
+    yield
+
+
 app = FastAPI(
     title="China Stock Data API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.include_router(health_router)
 app.include_router(stocks_router)
+app.include_router(stats_router)
+app.include_router(metrics_router)
+
+# Server-Timing header, X-Trace-Id and the request histograms behind /metrics
+app.add_middleware(TimingMiddleware)
 
 @app.get("/favicon.ico", include_in_schema=False)
 def favicon():
@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+
+from app.services.stock_service import get_service_stats
+
+router = APIRouter(tags=["stats"])
+
+@router.get("/stats")
+def stats():
+    return get_service_stats()
@@ -1,30 +1,74 @@
-from fastapi import APIRouter, Query
+import os
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
 
 from app.schemas.stock import StockRequest, StockResponse
 
 from app.services.stock_service import (
     get_stock_data_with_features,
     get_stock_data_with_features_by_dates,
+    render_response,
+    response_bodies,
+    response_stamp,
+    stream_stock_range,
 )
+from app.services.streaming import stream_format
+from common.http_cache import conditional_response
 
 router = APIRouter(prefix="/stocks", tags=["stocks"])
 
+# Bodies smaller than this are sent uncompressed
+_COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+
+
+def _respond(request: Request, resp: StockResponse):
+    """
+    Cached responses carry an ETag: answer 304 or send the (compressed) body
+    from the body cache. Ad-hoc error responses go through FastAPI as before.
+    """
+    stamp = response_stamp(resp)
+    if stamp is None:
+        return resp
+    etag, modified = stamp
+    return conditional_response(
+        request,
+        etag=etag,
+        last_modified=modified,
+        render=lambda: render_response(resp),
+        bodies=response_bodies,
+        min_compress_bytes=_COMPRESS_MIN_BYTES,
+    )
+
+
 @router.get("/{stock_code}", response_model=StockResponse)
 def get_stock(
+    request: Request,
     stock_code: str,
     interval: str = Query("365d", description="e.g. 30d / 6m / 1y / 365"),
 ):
-    return get_stock_data_with_features(stock_code=stock_code, interval=interval)
+    return _respond(request, get_stock_data_with_features(stock_code=stock_code, interval=interval))
 
 @router.get("/{stock_code}/range", response_model=StockResponse)
 def get_stock_range(
+    request: Request,
     stock_code: str,
     start_date: str = Query(..., description="YYYY-MM-DD"),
     end_date: str = Query(..., description="YYYY-MM-DD"),
 ):
-    return get_stock_data_with_features_by_dates(
+    # Accept: application/x-ndjson (or an Arrow stream) streams the records batch by batch
+    media_type = stream_format(request.headers.get("accept"))
+    if media_type is not None:
+        out = stream_stock_range(stock_code, start_date, end_date, media_type)
+        if isinstance(out, StockResponse):
+            return out
+        chunks, meta = out
+        return StreamingResponse(chunks, media_type=media_type, headers={"X-Rows": str(meta.rows)})
+
+    resp = get_stock_data_with_features_by_dates(
         stock_code=stock_code, start_date=start_date, end_date=end_date
     )
+    return _respond(request, resp)
 
 
 @router.post("", response_model=StockResponse)
@@ -1,6 +1,6 @@
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from app.schemas.common import Meta
 
@@ -14,3 +14,7 @@ class StockResponse(BaseModel):
     meta: Meta
     data: List[Dict[str, Any]] = Field(default_factory=list)
     warnings: List[str] = Field(default_factory=list)
+
+    # Set by the service when the response is cached; not part of the JSON body
+    _etag: Optional[str] = PrivateAttr(default=None)
+    _modified: float = PrivateAttr(default=0.0)
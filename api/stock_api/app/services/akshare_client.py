@@ -1,11 +1,56 @@
 from __future__ import annotations
 
+import os
+import threading
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional
+
 import pandas as pd
 
-try:
-    import akshare as ak
-except ImportError as e:
-    raise ImportError(f"Missing dependency: {e}. Please install akshare.")
+from common.adjust import AdjustFactors, NoFactors, apply_factors, sina_symbol
+from common.ohlcv_store import COLUMNS, OhlcvStore
+from common.tape import open_upstream
+from common import timing
+from common.ratelimit import AdaptiveLimiter, RateLimitTimeout
+
+# akshare takes a few hundred ms to import (it pulls in its whole scraper tree),
+# so it is loaded on the first upstream call or by warm_up() after startup.
+# UPSTREAM_MODE=record / replay swaps in the tape recorder / replayer
+# (common.tape), which has the same interface
+_ak_module: Any = None
+_ak_lock = threading.Lock()
+
+
+def _ak() -> Any:
+    global _ak_module
+    if _ak_module is None:
+        with _ak_lock:
+            if _ak_module is None:
+                try:
+                    with timing.stage("import"):
+                        _ak_module = open_upstream(
+                            os.getenv("UPSTREAM_MODE", "live"),
+                            os.getenv("UPSTREAM_TAPE_DIR", ".data/upstream_tape"),
+                            latency=os.getenv("REPLAY_LATENCY", "recorded"),
+                            latency_ms=float(os.getenv("REPLAY_LATENCY_MS", "50")),
+                            sigma=float(os.getenv("REPLAY_LATENCY_SIGMA", "1.0")),
+                            failure_rate=float(os.getenv("REPLAY_FAILURE_RATE", "0")),
+                            miss=os.getenv("REPLAY_MISS", "error"),
+                            seed=int(os.getenv("REPLAY_SEED", "0")),
+                        )
+                except ImportError as e:
+                    raise ImportError(f"Missing dependency: {e}. Please install akshare.")
+    return _ak_module
+
+
+def warm_up() -> None:
+    """
+    Import akshare ahead of the first request. Safe to call from a background thread.
+    """
+    try:
+        _ak()
+    except Exception as e:
+        print(f"[AkShare Warm-up] err={e}")
 
 
 def normalize_symbol(stock_code: str) -> str:
@@ -17,61 +62,222 @@ def normalize_symbol(stock_code: str) -> str:
     return str(stock_code).strip().split(".")[0].strip()
 
 
-def fetch_zh_a_daily(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+# Process-wide limiter in front of every AkShare call: interactive requests go
+# ahead of background refreshes, and the rate backs off when AkShare errors
+_limiter = AdaptiveLimiter(
+    rate=float(os.getenv("UPSTREAM_RATE_PER_SECOND", "10")),
+    min_rate=float(os.getenv("UPSTREAM_RATE_MIN_PER_SECOND", "1")),
+    burst=float(os.getenv("UPSTREAM_BURST", "10")),
+    max_concurrency=int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "8")),
+)
+_LIMIT_WAIT_SECONDS = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT_SECONDS", "10"))
+
+# Adjustment factors come from Sina, a different upstream: a separate limiter,
+# so Sina errors never slow down bar requests
+_factor_limiter = AdaptiveLimiter(
+    rate=float(os.getenv("UPSTREAM_RATE_PER_SECOND", "10")),
+    min_rate=float(os.getenv("UPSTREAM_RATE_MIN_PER_SECOND", "1")),
+    burst=float(os.getenv("UPSTREAM_BURST", "10")),
+    max_concurrency=int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "8")),
+)
+
+_counters: Dict[str, int] = {"calls": 0, "errors": 0, "throttled": 0, "adjust_fallbacks": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def upstream_stats() -> Dict[str, Any]:
+    with _counters_lock:
+        counters = dict(_counters)
+    out = {
+        **counters,
+        "limiter": _limiter.stats(),
+        "factor_limiter": _factor_limiter.stats(),
+        "adjust_factors": _factors.stats(),
+    }
+    # Recording / replaying: add the tape's counters (calls, misses, injected failures)
+    tape_stats = getattr(_ak_module, "stats", None)
+    if callable(tape_stats):
+        out["tape"] = tape_stats()
+    return out
+
+
+def _call_upstream(fn: Callable[[], Any], limiter: AdaptiveLimiter = _limiter) -> Any:
     """
-    Fetch A-share daily hist data via AkShare, return standardized OHLCV dataframe
-    indexed by Date with columns: Open, High, Low, Close, Volume.
-    start_date/end_date: YYYY-MM-DD
+    One AkShare call through the limiter. Raises on upstream errors (and
+    RateLimitTimeout).
     """
-    if not symbol:
-        return pd.DataFrame()
+    with timing.stage("rate_limit"):
+        limiter.acquire(timeout=_LIMIT_WAIT_SECONDS)
+    _count("calls")
+    try:
+        with timing.stage("upstream"):
+            result = fn()
+    except Exception:
+        limiter.record(False)
+        raise
+    else:
+        limiter.record(True)
+        return result
+    finally:
+        limiter.release()
 
-    start_date_clean = start_date.replace("-", "")
-    end_date_clean = end_date.replace("-", "")
 
-    try:
-        df = ak.stock_zh_a_hist(
+def _fetch_upstream(symbol: str, start: date, end: date, adjust: str) -> pd.DataFrame:
+    """
+    Raw AkShare call, cleaned to lowercase columns: date, open, high, low, close, volume.
+    Raises on upstream errors so the store never records a failed span as covered.
+    """
+    ak = _ak()
+    df = _call_upstream(
+        lambda: ak.stock_zh_a_hist(
             symbol=symbol,
             period="daily",
-            start_date=start_date_clean,
-            end_date=end_date_clean,
-            adjust="qfq",
+            start_date=start.strftime("%Y%m%d"),
+            end_date=end.strftime("%Y%m%d"),
+            adjust=adjust,
         )
-    except Exception as e:
-        # Never raise to API layer
-        print(f"[AkShare Error] symbol={symbol} start={start_date} end={end_date} err={e}")
-        return pd.DataFrame()
+    )
 
     if df is None or df.empty:
-        return pd.DataFrame()
+        return pd.DataFrame(columns=COLUMNS)
+
+    with timing.stage("clean"):
+        return _clean(df)
 
+
+def _clean(df: pd.DataFrame) -> pd.DataFrame:
     rename_map = {
-        "日期": "Date",
-        "开盘": "Open",
-        "最高": "High",
-        "最低": "Low",
-        "收盘": "Close",
-        "成交量": "Volume",
+        "日期": "date",
+        "开盘": "open",
+        "最高": "high",
+        "最低": "low",
+        "收盘": "close",
+        "成交量": "volume",
     }
 
+    # Raise rather than return an empty frame: the store would record the span as
+    # covered with no bars. fetch_zh_a_daily turns the error into an empty response
     existing = [c for c in rename_map.keys() if c in df.columns]
     if not existing:
-        print(f"[Column Error] AkShare returned columns={list(df.columns)}")
-        return pd.DataFrame()
+        raise ValueError(f"unexpected AkShare columns={list(df.columns)}")
 
     df = df[existing].rename(columns=rename_map)
 
-    required = {"Date", "Open", "High", "Low", "Close", "Volume"}
-    if not required.issubset(df.columns):
-        print(f"[Column Error] missing required cols, got={list(df.columns)}")
-        return pd.DataFrame()
+    if not set(COLUMNS).issubset(df.columns):
+        raise ValueError(f"AkShare reply is missing required columns, got={list(df.columns)}")
 
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-    df = df.dropna(subset=["Date"]).set_index("Date").sort_index()
+    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.date
 
     # Ensure numeric
-    for col in ["Open", "High", "Low", "Close", "Volume"]:
+    for col in ["open", "high", "low", "close"]:
         df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["volume"] = pd.to_numeric(df["volume"], errors="coerce").fillna(0).astype("int64")
+
+    return df.dropna(subset=["date", "close"])
+
+
+def _store_from_env() -> Optional[OhlcvStore]:
+    if os.getenv("OHLCV_STORE_ENABLED", "1") != "1":
+        return None
+    return OhlcvStore(os.getenv("OHLCV_STORE_DIR", ".data/ohlcv"), fetch=_fetch_upstream)
+
+
+_store = _store_from_env()
+
+
+def _fetch_factors(symbol: str, adjust: str) -> pd.DataFrame:
+    ak = _ak()
+
+    def fetch() -> Optional[pd.DataFrame]:
+        try:
+            return ak.stock_zh_a_daily(symbol=sina_symbol(symbol), adjust=f"{adjust}-factor")
+        except ValueError as e:
+            # AkShare raises ValueError("sina hfq factor not available") for codes
+            # without factors: a normal answer, not an upstream failure
+            if "factor not available" not in str(e):
+                raise
+            return None
+
+    df = _call_upstream(fetch, limiter=_factor_limiter)
+    if df is None:
+        raise NoFactors(f"no {adjust} factors for {symbol}")
+    return df
+
+
+# qfq prices are derived from the stored unadjusted series and the qfq factors,
+# so an ex-dividend date only refreshes the factors, not the whole history.
+# Off by default: Sina's factors applied to Eastmoney's raw bars have not yet been
+# checked against Eastmoney's own qfq series, so enabling it may change served prices
+_factors = AdjustFactors(_fetch_factors)
+_ADJUST_LOCALLY = os.getenv("ADJUST_LOCALLY", "0") == "1"
+
+
+def _read(symbol: str, start: date, end: date, adjust: str) -> pd.DataFrame:
+    if _store is not None:
+        return _store.get(symbol, start, end, adjust=adjust)
+    return _fetch_upstream(symbol, start, end, adjust)
+
+
+def _read_qfq(symbol: str, start: date, end: date) -> pd.DataFrame:
+    if not _ADJUST_LOCALLY:
+        return _read(symbol, start, end, "qfq")
+    raw = _read(symbol, start, end, "")
+    if raw is None or raw.empty:
+        return raw
+    try:
+        days, factors = _factors.get(symbol, "qfq")
+    except Exception as e:
+        # No factors from Sina (endpoint down, factor limiter busy): ask AkShare for qfq bars directly
+        print(f"[Adjust Fallback] symbol={symbol} err={e}")
+        _count("adjust_fallbacks")
+        return _read(symbol, start, end, "qfq")
+    if len(factors) == 0:
+        # Sina returned an empty / unparseable factor table: same fallback
+        print(f"[Adjust Fallback] symbol={symbol} err=no qfq factors")
+        _count("adjust_fallbacks")
+        return _read(symbol, start, end, "qfq")
+    with timing.stage("adjust"):
+        return apply_factors(raw, days, factors, "qfq")
+
+
+def fetch_zh_a_daily(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Fetch A-share daily hist data via AkShare, return standardized OHLCV dataframe
+    indexed by Date with columns: Open, High, Low, Close, Volume.
+    start_date/end_date: YYYY-MM-DD
+
+    Settled bars are served from the local OhlcvStore; only missing dates hit AkShare.
+    Prices are AkShare's qfq bars, or with ADJUST_LOCALLY=1 derived locally from
+    the unadjusted bars and the qfq factors.
+    """
+    if not symbol:
+        return pd.DataFrame()
+
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        df = _read_qfq(symbol, start, end)
+    except RateLimitTimeout as e:
+        _count("throttled")
+        print(f"[AkShare Throttled] symbol={symbol} start={start_date} end={end_date} err={e}")
+        return pd.DataFrame()
+    except Exception as e:
+        # Never raise to API layer
+        _count("errors")
+        print(f"[AkShare Error] symbol={symbol} start={start_date} end={end_date} err={e}")
+        return pd.DataFrame()
+
+    if df is None or df.empty:
+        return pd.DataFrame()
+
+    with timing.stage("clean"):
+        df = df.rename(columns={c: c.capitalize() for c in COLUMNS})
+        df["Date"] = pd.to_datetime(df["Date"])
+        df = df.set_index("Date").sort_index()
 
-    df = df.dropna(subset=["Close"])
     return df
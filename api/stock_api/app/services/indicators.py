@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.features import add_technical_indicators
+
+_NAN = float("nan")
+
+
+class RollingWindow:
+    """
+    Fixed-size sliding window over floats (NaN is ignored, like pandas rolling
+    with min_periods=1). Sum and sum of squares are updated in O(1) per push
+    and re-derived from the buffer once per full window to bound float drift.
+    """
+
+    __slots__ = ("size", "buf", "n", "total", "total_sq", "nonzero", "_since_resync")
+
+    def __init__(self, size: int, values: Any = ()):
+        self.size = size
+        self.buf: Deque[float] = deque()
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.nonzero = 0
+        self._since_resync = 0
+        for v in list(values)[-size:]:
+            self.buf.append(float(v))
+        self._resync()
+
+    def push(self, x: float) -> None:
+        if len(self.buf) == self.size:
+            old = self.buf.popleft()
+            if old == old:
+                self.n -= 1
+                self.total -= old
+                self.total_sq -= old * old
+                self.nonzero -= old != 0.0
+        self.buf.append(x)
+        if x == x:
+            self.n += 1
+            self.total += x
+            self.total_sq += x * x
+            self.nonzero += x != 0.0
+
+        self._since_resync += 1
+        if self._since_resync >= self.size:
+            self._resync()
+
+    def _resync(self) -> None:
+        vals = [v for v in self.buf if v == v]
+        self.n = len(vals)
+        self.total = math.fsum(vals)
+        self.total_sq = math.fsum(v * v for v in vals)
+        self.nonzero = sum(v != 0.0 for v in vals)
+        self._since_resync = 0
+
+    def mean(self) -> float:
+        if self.n == 0:
+            return _NAN
+        if self.nonzero == 0:
+            return 0.0
+        return self.total / self.n
+
+    def std(self) -> float:
+        if self.n < 2:
+            return _NAN
+        if self.nonzero == 0:
+            return 0.0
+        var = (self.total_sq - self.total * self.total / self.n) / (self.n - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class SymbolIndicatorState:
+    """
+    Rolling state behind add_technical_indicators for one (symbol, first bar):
+    close windows for MA_10 / MA_50, return window for Volatility_20d,
+    gain/loss windows for RSI and the last close.
+    """
+
+    def __init__(self, df: pd.DataFrame, frame: pd.DataFrame):
+        close = df["Close"].to_numpy(dtype=np.float64)
+        returns = np.full(len(close), np.nan)
+        delta = np.full(len(close), np.nan)
+        if len(close) > 1:
+            returns[1:] = close[1:] / close[:-1] - 1
+            delta[1:] = close[1:] - close[:-1]
+
+        self.ma10 = RollingWindow(10, close)
+        self.ma50 = RollingWindow(50, close)
+        self.returns = RollingWindow(20, returns)
+        self.gains = RollingWindow(14, np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None)))
+        self.losses = RollingWindow(14, np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None)))
+
+        self.last_close = float(close[-1])
+        self.frame = frame
+        self.lock = threading.Lock()
+
+    def step(self, close: float) -> Tuple[float, float, float, float, float]:
+        """
+        Consume one new close, return (MA_10, MA_50, Daily_Return, Volatility_20d, RSI).
+        """
+        prev = self.last_close
+        ret = close / prev - 1
+        delta = close - prev
+        self.last_close = close
+
+        self.ma10.push(close)
+        self.ma50.push(close)
+        self.returns.push(ret)
+        self.gains.push(max(delta, 0.0))
+        self.losses.push(max(-delta, 0.0))
+
+        avg_gain = self.gains.mean()
+        avg_loss = self.losses.mean()
+        if avg_loss == 0.0 or avg_loss != avg_loss:
+            rsi = _NAN
+        else:
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        return self.ma10.mean(), self.ma50.mean(), ret, self.returns.std(), rsi
+
+
+class IndicatorEngine:
+    """
+    Incremental version of add_technical_indicators.
+
+    Indicator values depend on the first bar of the window (rolling uses
+    min_periods=1), so state is kept per (symbol, first bar date). When a
+    request covers the same start and only appends new bars, just those bars
+    are pushed through the rolling state (O(1) per bar). Anything else (new
+    window start, rewritten history) falls back to the batch computation and
+    re-seeds the state from its tail.
+
+    Returned frames are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, max_states: int = 4096):
+        self.max_states = max_states
+        self._states: "OrderedDict[Hashable, SymbolIndicatorState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.full = 0
+        self.incremental = 0
+        self.unchanged = 0
+
+    def compute(self, symbol: str, df: pd.DataFrame) -> pd.DataFrame:
+        if df is None or df.empty:
+            return pd.DataFrame()
+
+        key = (symbol, df.index[0])
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+
+        if state is not None:
+            with state.lock:
+                if self._prefix_matches(state, df):
+                    return self._extend(state, df)
+
+        frame = add_technical_indicators(df)
+        state = SymbolIndicatorState(df, frame)
+        with self._lock:
+            self.full += 1
+            self._states[key] = state
+            while len(self._states) > self.max_states:
+                self._states.popitem(last=False)
+        return frame
+
+    def _prefix_matches(self, state: SymbolIndicatorState, df: pd.DataFrame) -> bool:
+        n = min(len(df), len(state.frame))
+        if not state.frame.index[:n].equals(df.index[:n]):
+            return False
+        # A rewritten history (e.g. qfq after a dividend) shows up in the overlapping close
+        return bool(np.round(df["Close"].iat[n - 1], 4) == state.frame["Close"].iat[n - 1])
+
+    def _extend(self, state: SymbolIndicatorState, df: pd.DataFrame) -> pd.DataFrame:
+        if len(df) <= len(state.frame):
+            # Indicators are causal: an earlier end is just a prefix of the stored frame
+            with self._lock:
+                self.unchanged += 1
+            return state.frame.iloc[: len(df)]
+
+        new = df.iloc[len(state.frame):]
+        rows: List[Tuple[float, float, float, float, float]] = [
+            state.step(float(c)) for c in new["Close"].to_numpy(dtype=np.float64)
+        ]
+        added = new.copy()
+        added[["MA_10", "MA_50", "Daily_Return", "Volatility_20d", "RSI"]] = rows
+
+        float_cols = added.select_dtypes(include=["float64", "float32"]).columns
+        added[float_cols] = added[float_cols].round(4)
+
+        state.frame = pd.concat([state.frame, added])
+        with self._lock:
+            self.incremental += 1
+        return state.frame
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "states": len(self._states),
+                "full": self.full,
+                "incremental": self.incremental,
+                "unchanged": self.unchanged,
+            }
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import json
 import math
-from typing import Any
+from typing import Any, Dict, List, Optional
 
 import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
 
 def sanitize_for_json(obj: Any) -> Any:
     """
@@ -25,3 +29,66 @@ def sanitize_for_json(obj: Any) -> Any:
         return [sanitize_for_json(v) for v in obj]
 
     return obj
+
+
+def _column_values(col: pd.Series) -> List[Any]:
+    """
+    One column as JSON-ready Python values, converted per column rather than
+    per cell where the dtype allows it.
+    """
+    dtype = col.dtype
+    if isinstance(dtype, np.dtype):
+        values = col.to_numpy()
+        if dtype.kind == "f":
+            out = values.tolist()
+            for i in np.flatnonzero(~np.isfinite(values)):
+                out[i] = None
+            return out
+        if dtype.kind in "iub":
+            return values.tolist()
+        if dtype.kind == "M" and not np.isnat(values).any():
+            seconds = values.astype("datetime64[s]")
+            # Naive whole-second timestamps: the text pydantic would produce
+            if (values == seconds).all():
+                return np.datetime_as_string(seconds, unit="s").tolist()
+    # Anything else goes cell by cell through the same conversion as before
+    return [to_jsonable_python(sanitize_for_json(v)) for v in col.tolist()]
+
+
+def frame_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Records of df (index included) with the values
+    sanitize_for_json(df.reset_index().to_dict(orient="records")) has once
+    rendered as JSON: NaN/Inf masked to None per column, datetimes formatted
+    once per column as ISO strings. The result needs no further validation
+    or conversion before json.dumps.
+    """
+    df = df.reset_index()
+    keys = [str(c) for c in df.columns]
+    columns = [_column_values(df.iloc[:, i]) for i in range(df.shape[1])]
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Plain JSON values to the bytes FastAPI's JSONResponse would send.
+    """
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def render_json(model: BaseModel, raw: Optional[Dict[str, bytes]] = None) -> bytes:
+    """
+    Serialize a response model to the exact bytes FastAPI's JSONResponse
+    would send for it (compact, non-ASCII kept, NaN rejected).
+
+    raw maps field names to already encoded JSON, spliced in as is; those
+    fields skip model_dump.
+    """
+    if not raw:
+        return dumps(model.model_dump(mode="json"))
+    dumped = model.model_dump(mode="json", exclude=set(raw))
+    parts = [
+        dumps(name) + b":" + (raw[name] if name in raw else dumps(dumped[name]))
+        for name in type(model).model_fields
+    ]
+    return b"{" + b",".join(parts) + b"}"
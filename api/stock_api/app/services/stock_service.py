@@ -1,30 +1,205 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Union
+import hashlib
+import math
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
 
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
 
 from app.schemas.common import Meta
 from app.schemas.stock import StockResponse
-from app.services.akshare_client import fetch_zh_a_daily, normalize_symbol
-from app.services.features import add_technical_indicators
-from app.services.serializer import sanitize_for_json
+from app.services.akshare_client import fetch_zh_a_daily, normalize_symbol, upstream_stats
+from app.services.indicators import IndicatorEngine
+from app.services.serializer import dumps, frame_records, render_json
+from app.services.streaming import ARROW_STREAM, NDJSON, arrow_from_frame, ndjson_from_frame, ndjson_from_records
 from app.utils.interval import calc_date_range
+from common.market import calendar
 
 # Optional cache
-from app.utils.cache import TTLCache, cache_ttl_from_env
+from app.utils.cache import cache_from_env
+from common import codec
+from common.cache import TTLCache
+from common.http_cache import make_etag
+from common.prewarm import Prewarmer, Revalidator
+from common.singleflight import SingleFlight
+from common import timing
 
-_cache = TTLCache(ttl_seconds=cache_ttl_from_env(60))
+_cache = cache_from_env(60)
+
+# Encoded / compressed bodies keyed by (ETag, encoding). Equal ETags mean equal
+# content, so entries never expire; the byte budget bounds the cache.
+response_bodies = TTLCache(
+    ttl_seconds=math.inf,
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+
+# Last (ETag, Last-Modified) per cache key. Kept after the response itself
+# expires, so a rebuilt but unchanged response keeps its Last-Modified
+_stamps = TTLCache(ttl_seconds=math.inf, max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")))
+
+# Concurrent misses for the same (symbol, start, end, adjust) share one upstream fetch
+_flight = SingleFlight()
+
+# Stale entries are served immediately and refreshed here in the background
+_revalidator = Revalidator()
+
+# Per-symbol rolling indicator state: appended bars are updated in O(1) each
+_indicators = IndicatorEngine()
 
 
 IntervalType = Union[str, int, None]
 
 
+# Expire by trading calendar: settled history is kept, only responses that
+# include today's live bar get the short CACHE_TTL_SECONDS
+_CALENDAR_AWARE = os.getenv("CACHE_CALENDAR_AWARE", "1") == "1"
+
+
 def _make_cache_key(symbol: str, interval_norm: str) -> str:
     return f"{symbol}:{interval_norm}"
 
 
+def _stamp(resp: StockResponse, body: Optional[bytes] = None, prev: Optional[Tuple[str, float]] = None) -> bytes:
+    """
+    Give a response its ETag (date of the last bar + digest of the body) and
+    Last-Modified. If the ETag equals prev's (ETag, Last-Modified), that
+    Last-Modified is kept so clients revalidating with If-Modified-Since
+    still get a 304.
+    """
+    if body is None:
+        with timing.stage("serialize"):
+            body = render_response(resp)
+    last = resp.data[-1].get("Date") if resp.data else None
+    last_day = str(last or resp.meta.end_date)[:10].replace("-", "")
+    resp._etag = make_etag(last_day, hashlib.blake2b(body, digest_size=16).hexdigest())
+    if prev is not None and prev[0] == resp._etag and prev[1]:
+        resp._modified = prev[1]
+    elif not resp._modified:
+        resp._modified = time.time()
+    return body
+
+
+def _remember(ck: str, resp: StockResponse, prev: Optional[StockResponse] = None) -> None:
+    # Without a cached predecessor (the miss path), fall back to the stamp
+    # remembered for this key when the previous response expired
+    stamp = response_stamp(prev) if prev is not None else None
+    body = _stamp(resp, prev=stamp or _stamps.get(ck))
+    response_bodies.set((resp._etag, "identity"), body)
+    _stamps.set(ck, (resp._etag, resp._modified))
+    _cache.set(ck, resp, ttl=_response_ttl(resp))
+
+
+def render_response(resp: StockResponse) -> bytes:
+    """
+    JSON body of a StockResponse. Records built here (frame_records) or read
+    back from a shared cache are plain JSON values, so data is encoded with
+    json.dumps directly instead of going through model_dump.
+    """
+    return render_json(resp, {"data": dumps(resp.data)})
+
+
+def response_stamp(resp: StockResponse) -> Optional[Tuple[str, float]]:
+    """
+    (ETag, Last-Modified) of a cached response; None for ad-hoc error responses.
+    """
+    if resp._etag is None:
+        return None
+    return resp._etag, resp._modified
+
+
+_MODIFIED = struct.Struct("<d")
+
+
+def _encode_response(resp: StockResponse) -> bytes:
+    # Shared backends store Last-Modified + the rendered body, so the ETag can
+    # be recomputed on read without serializing again
+    return _MODIFIED.pack(resp._modified) + zlib.compress(render_response(resp), 1)
+
+
+def _decode_response(data: bytes) -> StockResponse:
+    (modified,) = _MODIFIED.unpack_from(data)
+    body = zlib.decompress(data[_MODIFIED.size:])
+    resp = StockResponse.model_validate_json(body)
+    resp._modified = modified
+    _stamp(resp, body)
+    return resp
+
+
+codec.register(StockResponse, "StockResponse", _encode_response, _decode_response)
+
+
+def _response_ttl(resp: StockResponse) -> Optional[float]:
+    if not resp.success:
+        # "No data" is usually a transient upstream error or throttle (fetch_zh_a_daily
+        # never raises): keep it only for the short TTL, never until the next open
+        return _cache.ttl_seconds
+    if not _CALENDAR_AWARE:
+        return None
+    # Data is always qfq here, so even settled history only lives until the next open
+    return calendar.ttl_for(date.fromisoformat(resp.meta.end_date), live_ttl=_cache.ttl_seconds, adjust="qfq")
+
+
+def _fetch_shared(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    return _flight.do(
+        (symbol, start_date, end_date, "qfq"),
+        lambda: fetch_zh_a_daily(symbol=symbol, start_date=start_date, end_date=end_date),
+    )
+
+
+def _refresh_interval(key: Tuple[str, str]) -> None:
+    """
+    Rebuild a cached interval response in the background. The stock_code
+    echoed in meta is taken from the cached response. A failed refresh
+    (no data) keeps the old response.
+    """
+    symbol, interval_norm = key
+    ck = _make_cache_key(symbol, interval_norm)
+    old = _cache.peek(ck, allow_stale=True)
+    if old is None:
+        return
+    resp = _build_interval_response(old.meta.stock_code, symbol, interval_norm)
+    if resp.success or not old.success:
+        _remember(ck, resp, prev=old)
+
+
+def _float_from_env(name: str, default: str) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except Exception:
+        return float(default)
+
+
+# The most requested (symbol, interval) pairs are refreshed before they expire
+_prewarmer = Prewarmer(
+    refresh=_refresh_interval,
+    remaining=lambda key: _cache.ttl_remaining(_make_cache_key(*key)),
+    revalidator=_revalidator,
+    top_n=int(_float_from_env("PREWARM_TOP_N", "50")),
+    interval_seconds=_float_from_env("PREWARM_INTERVAL_SECONDS", "5"),
+    lead_seconds=_float_from_env("PREWARM_LEAD_SECONDS", "15"),
+    budget_per_minute=_float_from_env("PREWARM_BUDGET_PER_MINUTE", "60"),
+    enabled=os.getenv("PREWARM_ENABLED", "1") == "1",
+)
+
+
+def get_service_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        "cache": _cache.stats(),
+        "response_bodies": response_bodies.stats(),
+        "singleflight": _flight.stats(),
+        "indicators": _indicators.stats(),
+        "revalidate": _revalidator.stats(),
+        "prewarm": _prewarmer.stats(),
+        "upstream": upstream_stats(),
+        "slow_requests": timing.slow_requests(),
+    }
+
+
 def get_stock_data_with_features(stock_code: str, interval: IntervalType = "365d") -> StockResponse:
     start_date, end_date, interval_norm = calc_date_range(interval)
     symbol = normalize_symbol(stock_code)
@@ -38,47 +213,56 @@ def get_stock_data_with_features(stock_code: str, interval: IntervalType = "365d
             warnings=["empty_stock_code"],
         )
 
-    # Cache hit
+    # Cache hit (a stale one is returned as-is and refreshed in the background)
+    key = (symbol, interval_norm)
+    _prewarmer.touch(key)
     ck = _make_cache_key(symbol, interval_norm)
-    cached = _cache.get(ck)
+    cached, stale = _cache.get_or_stale(ck)
     if cached is not None:
+        if stale:
+            _revalidator.submit(key, lambda: _refresh_interval(key))
         return cached
 
-    df: pd.DataFrame = fetch_zh_a_daily(symbol=symbol, start_date=start_date, end_date=end_date)
+    resp = _build_interval_response(stock_code, symbol, interval_norm)
+    _remember(ck, resp)
+    return resp
+
+
+def _build_interval_response(stock_code: str, symbol: str, interval: str) -> StockResponse:
+    start_date, end_date, interval_norm = calc_date_range(interval)
+    df: pd.DataFrame = _fetch_shared(symbol, start_date, end_date)
 
     if df.empty:
-        resp = StockResponse(
+        return StockResponse(
             success=False,
             message=f"No data found for stock {symbol}.",
             meta=Meta(stock_code=stock_code, symbol=symbol, start_date=start_date, end_date=end_date, interval=interval_norm, rows=0),
             data=[],
             warnings=["no_data"],
         )
-        _cache.set(ck, resp)
-        return resp
-
-    df = add_technical_indicators(df)
-
-    records: List[Dict[str, Any]] = df.reset_index().to_dict(orient="records")
-    records = sanitize_for_json(records)
-
-    resp = StockResponse(
-        success=True,
-        message=f"Successfully retrieved stock data for {symbol}",
-        meta=Meta(
-            stock_code=stock_code,
-            symbol=symbol,
-            start_date=start_date,
-            end_date=end_date,
-            interval=interval_norm,
-            rows=len(records),
-        ),
-        data=records,
-        warnings=[],
-    )
 
-    _cache.set(ck, resp)
-    return resp
+    with timing.stage("indicators"):
+        df = _indicators.compute(symbol, df)
+
+    with timing.stage("records"):
+        records = frame_records(df)
+
+    # Our own records: skip validating every cell again
+    with timing.stage("pydantic"):
+        return StockResponse.model_construct(
+            success=True,
+            message=f"Successfully retrieved stock data for {symbol}",
+            meta=Meta(
+                stock_code=stock_code,
+                symbol=symbol,
+                start_date=start_date,
+                end_date=end_date,
+                interval=interval_norm,
+                rows=len(records),
+            ),
+            data=records,
+            warnings=[],
+        )
 
 # ---------------------------------------------
 
@@ -90,9 +274,10 @@ def _is_valid_date(s: str) -> bool:
         return False
 
 
-def get_stock_data_with_features_by_dates(stock_code: str, start_date: str, end_date: str) -> StockResponse:
-    symbol = normalize_symbol(stock_code)
-
+def _check_range(stock_code: str, symbol: str, start_date: str, end_date: str) -> Optional[StockResponse]:
+    """
+    Error response for an invalid range request, None if it is valid.
+    """
     if not symbol:
         return StockResponse(
             success=False,
@@ -120,7 +305,27 @@ def get_stock_data_with_features_by_dates(stock_code: str, start_date: str, end_
             warnings=["invalid_date_range"],
         )
 
-    df = fetch_zh_a_daily(symbol=symbol, start_date=start_date, end_date=end_date)
+    return None
+
+
+def get_stock_data_with_features_by_dates(stock_code: str, start_date: str, end_date: str) -> StockResponse:
+    symbol = normalize_symbol(stock_code)
+    invalid = _check_range(stock_code, symbol, start_date, end_date)
+    if invalid is not None:
+        return invalid
+
+    ck = f"{symbol}:{start_date}:{end_date}"
+    cached = _cache.get(ck)
+    if cached is not None:
+        return cached
+
+    resp = _build_range_response(stock_code, symbol, start_date, end_date)
+    _remember(ck, resp)
+    return resp
+
+
+def _build_range_response(stock_code: str, symbol: str, start_date: str, end_date: str) -> StockResponse:
+    df = _fetch_shared(symbol, start_date, end_date)
 
     if df.empty:
         return StockResponse(
@@ -131,15 +336,53 @@ def get_stock_data_with_features_by_dates(stock_code: str, start_date: str, end_
             warnings=["no_data"],
         )
 
-    df = add_technical_indicators(df)
+    with timing.stage("indicators"):
+        df = _indicators.compute(symbol, df)
 
-    records = df.reset_index().to_dict(orient="records")
-    records = sanitize_for_json(records)
+    with timing.stage("records"):
+        records = frame_records(df)
 
-    return StockResponse(
-        success=True,
-        message=f"Successfully retrieved stock data for {symbol}",
-        meta=Meta(stock_code=stock_code, symbol=symbol, start_date=start_date, end_date=end_date, interval="", rows=len(records)),
-        data=records,
-        warnings=[],
-    )
+    with timing.stage("pydantic"):
+        return StockResponse.model_construct(
+            success=True,
+            message=f"Successfully retrieved stock data for {symbol}",
+            meta=Meta(stock_code=stock_code, symbol=symbol, start_date=start_date, end_date=end_date, interval="", rows=len(records)),
+            data=records,
+            warnings=[],
+        )
+
+
+def stream_stock_range(
+    stock_code: str, start_date: str, end_date: str, media_type: str
+) -> Union[StockResponse, Tuple[Iterator[bytes], Meta]]:
+    """
+    Streaming variant of get_stock_data_with_features_by_dates: returns
+    (chunks, meta) with the records encoded batch by batch, or an error
+    StockResponse. A cached response is streamed from its records; otherwise
+    the range is fetched and encoded straight from the DataFrame and, being
+    potentially huge, not cached.
+    """
+    symbol = normalize_symbol(stock_code)
+    invalid = _check_range(stock_code, symbol, start_date, end_date)
+    if invalid is not None:
+        return invalid
+
+    cached = _cache.get(f"{symbol}:{start_date}:{end_date}")
+    if cached is not None and cached.success and media_type == NDJSON:
+        return ndjson_from_records(cached.data), cached.meta
+
+    df = _fetch_shared(symbol, start_date, end_date)
+    if df.empty:
+        return StockResponse(
+            success=False,
+            message=f"No data found for stock {symbol} in the given date range.",
+            meta=Meta(stock_code=stock_code, symbol=symbol, start_date=start_date, end_date=end_date, interval="", rows=0),
+            data=[],
+            warnings=["no_data"],
+        )
+
+    with timing.stage("indicators"):
+        df = _indicators.compute(symbol, df)
+    meta = Meta(stock_code=stock_code, symbol=symbol, start_date=start_date, end_date=end_date, interval="", rows=len(df))
+    chunks = arrow_from_frame(df) if media_type == ARROW_STREAM else ndjson_from_frame(df)
+    return chunks, meta
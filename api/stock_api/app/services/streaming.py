@@ -0,0 +1,100 @@
+"""
+Streaming output for large ranges: NDJSON (one record per line) or an Arrow
+IPC stream.
+
+Records are encoded and sent batch_rows at a time instead of building the
+whole list of dicts, sanitizing it and validating it through StockResponse
+first. Memory stays bounded by one batch, and clients can start consuming
+as soon as the first batch is out.
+"""
+from __future__ import annotations
+
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.serializer import frame_records
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional; without it only NDJSON is offered
+    pa = None
+
+NDJSON = "application/x-ndjson"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+BATCH_ROWS = 5000
+
+
+def stream_format(accept: Optional[str]) -> Optional[str]:
+    """
+    Media type to stream when Accept asks for NDJSON or an Arrow stream
+    (Arrow only when pyarrow is installed); None means a regular JSON response.
+    """
+    if not accept:
+        return None
+    types = {part.split(";")[0].strip().lower() for part in accept.split(",")}
+    if ARROW_STREAM in types and pa is not None:
+        return ARROW_STREAM
+    if NDJSON in types:
+        return NDJSON
+    return None
+
+
+def _json_default(obj: Any) -> Any:
+    # Same text as the JSON response: datetimes in ISO format
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (np.integer, np.floating)):
+        return obj.item()
+    raise TypeError(f"not JSON serializable: {type(obj).__name__}")
+
+
+def _ndjson(records: Iterable[Dict[str, Any]]) -> bytes:
+    return b"".join(
+        json.dumps(r, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+        + b"\n"
+        for r in records
+    )
+
+
+def ndjson_from_records(records: List[Dict[str, Any]], batch_rows: int = BATCH_ROWS) -> Iterator[bytes]:
+    """
+    Stream records that are already JSON-safe (e.g. from a cached response).
+    """
+    for i in range(0, len(records), batch_rows):
+        yield _ndjson(records[i: i + batch_rows])
+
+
+def ndjson_from_frame(df: pd.DataFrame, batch_rows: int = BATCH_ROWS) -> Iterator[bytes]:
+    for i in range(0, len(df), batch_rows):
+        yield _ndjson(frame_records(df.iloc[i: i + batch_rows]))
+
+
+def arrow_from_frame(df: pd.DataFrame, batch_rows: int = BATCH_ROWS) -> Iterator[bytes]:
+    """
+    Arrow IPC stream: the schema first, then one RecordBatch per batch, then the end marker.
+    """
+    if pa is None:
+        raise RuntimeError("Arrow output requires the 'pyarrow' package")
+    df = df.reset_index()
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    for i in range(0, len(df), batch_rows):
+        part = df.iloc[i: i + batch_rows]
+        writer.write_batch(pa.RecordBatch.from_pandas(part, schema=schema, preserve_index=False))
+        yield drain()
+    writer.close()
+    yield drain()
@@ -1,31 +1,36 @@
-from __future__ import annotations
-
+"""
+Response cache configured from the environment. The cache classes themselves
+(TTLCache, SqliteCache, RedisCache) live in api/common and are shared with
+stock_api_new.
+"""
 import os
-import time
-from typing import Any, Dict, Optional, Tuple
-
-
-class TTLCache:
-    def __init__(self, ttl_seconds: int = 60):
-        self.ttl = max(1, ttl_seconds)
-        self._store: Dict[str, Tuple[float, Any]] = {}
 
-    def get(self, key: str) -> Optional[Any]:
-        item = self._store.get(key)
-        if not item:
-            return None
-        ts, value = item
-        if time.time() - ts > self.ttl:
-            self._store.pop(key, None)
-            return None
-        return value
+from common.cache_backends import make_cache
 
-    def set(self, key: str, value: Any) -> None:
-        self._store[key] = (time.time(), value)
 
-
-def cache_ttl_from_env(default: int = 60) -> int:
+def _int_from_env(name: str, default: int) -> int:
     try:
-        return int(os.getenv("CACHE_TTL_SECONDS", str(default)))
+        return int(os.getenv(name, str(default)))
     except Exception:
         return default
+
+
+def cache_ttl_from_env(default: int = 60) -> int:
+    return max(1, _int_from_env("CACHE_TTL_SECONDS", default))
+
+
+def cache_from_env(default_ttl: int = 60):
+    """
+    CACHE_BACKEND selects the store: memory (default, per-process TTLCache),
+    sqlite (shared by all workers on this machine) or redis.
+    """
+    return make_cache(
+        os.getenv("CACHE_BACKEND", "memory").strip().lower(),
+        ttl_seconds=cache_ttl_from_env(default_ttl),
+        stale_seconds=_int_from_env("CACHE_STALE_SECONDS", 300),
+        max_entries=_int_from_env("CACHE_MAX_ENTRIES", 10_000),
+        max_bytes=_int_from_env("CACHE_MAX_BYTES", 256 * 1024 * 1024),
+        sqlite_path=os.getenv("CACHE_SQLITE_PATH", ".data/cache.sqlite3"),
+        redis_url=os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"),
+        namespace="stock_api",
+    )
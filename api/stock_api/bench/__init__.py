@@ -0,0 +1,2 @@
+# Importing app puts api/ on sys.path (see app/__init__.py) so common.bench can be imported
+import app  # noqa: F401
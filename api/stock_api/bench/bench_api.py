@@ -0,0 +1,161 @@
+"""
+Offline benchmark for the legacy endpoints. AkShare is replaced by
+common.bench.fake_upstream (configurable latency / failures), nothing touches
+the network.
+
+    cd api/stock_api
+    python -m bench.bench_api --requests 300 --concurrency 8 --latency-ms 20 --out bench-legacy.json
+    # compare with a run from another commit
+    cd .. && python -m common.bench.compare stock_api/bench-old.json stock_api/bench-legacy.json
+
+    # replay recorded upstream data and timings (common.tape) instead
+    # of the fake upstream, optionally with heavy-tail latency and injected failures
+    python -m bench.bench_api --replay .data/upstream_tape --replay-latency heavy_tail --latency-ms 80 --failure-rate 0.02
+
+Scenarios: cache miss / hit / 304 revalidation / gzip / range / NDJSON range,
+plus micro-benchmarks for add_technical_indicators, sanitize_for_json, frame_records and
+response serialization. Latencies go through the in-process TestClient, so
+compare runs with each other rather than with production numbers. When
+replaying, symbols come from the tape and the miss scenario cycles through
+them (with fewer symbols than requests, later requests hit the cache).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from typing import Dict, List, Optional
+
+# Must be set before app is imported: no disk store, no prewarming,
+# in-process cache, so every run starts from the same state
+os.environ.setdefault("OHLCV_STORE_ENABLED", "0")
+os.environ.setdefault("PREWARM_ENABLED", "0")
+os.environ.setdefault("CACHE_BACKEND", "memory")
+# The fake upstream needs no protection: lift the limiter so the service itself
+# is measured (override UPSTREAM_RATE_PER_SECOND etc. to look at the limiter)
+os.environ.setdefault("UPSTREAM_RATE_PER_SECOND", "100000")
+os.environ.setdefault("UPSTREAM_BURST", "100000")
+os.environ.setdefault("UPSTREAM_MAX_CONCURRENCY", "64")
+
+from common.bench.fake_upstream import FakeUpstream  # noqa: E402
+from common.bench.harness import print_table, run_load, time_call, write_result  # noqa: E402
+
+
+def endpoint_scenarios(args: argparse.Namespace, codes: Optional[List[str]] = None) -> Dict[str, dict]:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    def client() -> TestClient:
+        return TestClient(app)
+
+    n, c = args.requests, args.concurrency
+    hot = codes[0] if codes else "600519"
+    miss = (lambda i: codes[(i + 1) % len(codes)]) if codes else (lambda i: f"{300000 + i:06d}")
+    span = {"start_date": "2020-01-01", "end_date": "2024-12-31"}
+    warm = client()
+    etag = warm.get(f"/stocks/{hot}", params={"interval": "1y"}).headers["etag"]
+    warm.get(f"/stocks/{hot}/range", params=span)
+
+    scenarios = {
+        # A new symbol per request: always goes upstream
+        "interval_miss": lambda cl, i: cl.get(f"/stocks/{miss(i)}", params={"interval": "1y"}),
+        "interval_hit": lambda cl, i: cl.get(f"/stocks/{hot}", params={"interval": "1y"}),
+        "interval_hit_gzip": lambda cl, i: cl.get(
+            f"/stocks/{hot}", params={"interval": "1y"}, headers={"Accept-Encoding": "gzip"}
+        ),
+        "interval_304": lambda cl, i: cl.get(f"/stocks/{hot}", params={"interval": "1y"}, headers={"If-None-Match": etag}),
+        "range_hit_5y": lambda cl, i: cl.get(f"/stocks/{hot}/range", params=span),
+        "range_ndjson_5y": lambda cl, i: cl.get(
+            f"/stocks/{hot}/range", params=span, headers={"Accept": "application/x-ndjson"}
+        ),
+    }
+    return {name: run_load(client, fn, requests=n, concurrency=c) for name, fn in scenarios.items()}
+
+
+def micro_benchmarks(args: argparse.Namespace) -> Dict[str, dict]:
+    import pandas as pd
+
+    from app.services.akshare_client import fetch_zh_a_daily
+    from app.services.features import add_technical_indicators
+    from app.services.serializer import frame_records, render_json, sanitize_for_json
+    from app.services.stock_service import get_stock_data_with_features_by_dates, render_response
+
+    start = "2000-01-03"
+    end = pd.bdate_range(start, periods=args.rows)[-1].strftime("%Y-%m-%d")
+    df = fetch_zh_a_daily("600000", start, end)
+    frame = add_technical_indicators(df)
+    records = frame.reset_index().to_dict(orient="records")
+    resp = get_stock_data_with_features_by_dates("600000", start, end)
+    rows = len(df)
+    return {
+        f"add_technical_indicators_{rows}": time_call(lambda: add_technical_indicators(df), args.repeat),
+        f"sanitize_for_json_{rows}": time_call(lambda: sanitize_for_json(records), args.repeat),
+        f"frame_records_{rows}": time_call(lambda: frame_records(frame), args.repeat),
+        f"render_json_{rows}": time_call(lambda: render_json(resp), args.repeat),
+        f"render_response_{rows}": time_call(lambda: render_response(resp), args.repeat),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=300)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="mean latency of the fake upstream")
+    ap.add_argument("--jitter-ms", type=float, default=5.0)
+    ap.add_argument("--failure-rate", type=float, default=0.0, help="probability that an upstream call fails")
+    ap.add_argument("--replay", metavar="TAPE_DIR", help="replay the upstream from a recorded tape (no fake upstream, no micro-benchmarks)")
+    ap.add_argument(
+        "--replay-latency", choices=("constant", "recorded", "heavy_tail"), default="recorded",
+        help="replay latency: fixed --latency-ms / as recorded / heavy tail with median --latency-ms",
+    )
+    ap.add_argument("--latency-sigma", type=float, default=1.0, help="log-normal sigma for heavy_tail")
+    ap.add_argument("--rows", type=int, default=2000, help="bars used by the micro-benchmarks")
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="JSON file to write the results to")
+    ap.add_argument("--skip-micro", action="store_true")
+    args = ap.parse_args()
+
+    codes = None
+    if args.replay:
+        # Read on the first upstream call, but set before app is imported anyway
+        os.environ.update(
+            UPSTREAM_MODE="replay",
+            UPSTREAM_TAPE_DIR=args.replay,
+            REPLAY_LATENCY=args.replay_latency,
+            REPLAY_LATENCY_MS=str(args.latency_ms),
+            REPLAY_LATENCY_SIGMA=str(args.latency_sigma),
+            REPLAY_FAILURE_RATE=str(args.failure_rate),
+            REPLAY_SEED=str(args.seed),
+        )
+        from common.tape import Tape
+
+        codes = Tape(args.replay).symbols()
+        if not codes:
+            ap.error(f"no recordings in {args.replay}")
+        args.skip_micro = True
+    else:
+        upstream = FakeUpstream(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, failure_rate=args.failure_rate, seed=args.seed
+        ).install()
+
+    endpoints = endpoint_scenarios(args, codes)
+    micro = {} if args.skip_micro else micro_benchmarks(args)
+    if args.replay:
+        from app.services.akshare_client import upstream_stats
+
+        upstream_summary = upstream_stats().get("tape", {})
+    else:
+        upstream_summary = upstream.stats()
+    config = {k: v for k, v in vars(args).items() if k not in ("out", "skip_micro")}
+    write_result(args.out, "stock_api", config, {"endpoints": endpoints, "micro": micro, "upstream": upstream_summary})
+
+    print_table("endpoints", endpoints)
+    if micro:
+        print_table("micro", micro)
+    if args.out:
+        print(f"\nwrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
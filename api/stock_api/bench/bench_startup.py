@@ -0,0 +1,149 @@
+"""
+Cold-start benchmark: each run starts a fresh Python process and measures the
+time to import app.main and to the first responses, and uses -X importtime to
+list the cumulative import time of each app.* / common.* module and a few heavy
+third-party packages.
+
+    cd api/stock_api
+    python -m bench.bench_startup --runs 5 --out startup-legacy.json
+    # compare with a run from another commit (the startup section is compared by p95)
+    cd .. && python -m common.bench.compare stock_api/startup-old.json stock_api/startup-legacy.json
+
+- import_app_ms: import app.main (interpreter startup excluded)
+- first_health_ms: lifespan startup + the first GET /health, after the app is imported
+- process_to_first_health_ms: from spawning the child process to the first health response
+- upstream_ready_ms: swapping in common.bench.fake_upstream (mostly the akshare import;
+  close to 0 once the warm-up thread has loaded it)
+- first_candles_ms: the first bars request (fake upstream, no latency)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+from common.bench.harness import latency_summary, print_table, write_result
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Same as bench.bench_api: no disk store, no prewarming, in-process cache
+_ENV = {
+    "OHLCV_STORE_ENABLED": "0",
+    "PREWARM_ENABLED": "0",
+    "CACHE_BACKEND": "memory",
+    "UPSTREAM_RATE_PER_SECOND": "100000",
+    "UPSTREAM_BURST": "100000",
+}
+
+# Third-party packages listed next to the app.* modules
+_HEAVY = ("akshare", "pandas", "numpy", "fastapi", "pydantic", "starlette")
+
+_CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+from app.main import app
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    t2 = time.perf_counter()
+    status = client.get("/health").status_code
+    t3 = time.perf_counter()
+    wall = time.time()
+    from common.bench.fake_upstream import FakeUpstream
+    FakeUpstream(latency_ms=0, jitter_ms=0).install()
+    t4 = time.perf_counter()
+    candles = client.get("/stocks/600519", params={"interval": "1y"}).status_code
+    t5 = time.perf_counter()
+print(json.dumps({
+    "import_app_ms": (t1 - t0) * 1000,
+    "first_health_ms": (t3 - t1) * 1000,
+    "upstream_ready_ms": (t4 - t3) * 1000,
+    "first_candles_ms": (t5 - t4) * 1000,
+    "health_wall": wall,
+    "status": [status, candles],
+}))
+"""
+
+
+def _env(warm_up: bool) -> Dict[str, str]:
+    env = {**os.environ, **_ENV, "UPSTREAM_WARM_UP": "1" if warm_up else "0"}
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(ROOT), env.get("PYTHONPATH")) if p)
+    return env
+
+
+def run_once(warm_up: bool) -> Dict[str, float]:
+    started = time.time()
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD], cwd=ROOT, env=_env(warm_up), capture_output=True, text=True, check=True
+    )
+    sample = json.loads(out.stdout.strip().splitlines()[-1])
+    if sample.pop("status") != [200, 200]:
+        raise RuntimeError(f"unexpected status in startup run: {out.stdout}")
+    sample["process_to_first_health_ms"] = (sample.pop("health_wall") - started) * 1000
+    return sample
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """
+    -X importtime output ("import time: self [us] | cumulative | imported package")
+    -> module -> cumulative ms, for app.*, common.* and the top-level packages in _HEAVY
+    """
+    out = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        name = parts[2]
+        if name.split(".")[0] in ("app", "common") or name in _HEAVY:
+            out[name] = int(parts[1]) / 1000
+    return out
+
+
+def import_profile(warm_up: bool) -> Dict[str, float]:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=_env(warm_up), capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(out.stderr)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5, help="cold starts (a new process each)")
+    ap.add_argument("--no-warm-up", action="store_true", help="UPSTREAM_WARM_UP=0: akshare is imported on the first upstream call")
+    ap.add_argument("--top", type=int, default=15, help="print this many of the slowest imports")
+    ap.add_argument("--out", help="JSON file for the results")
+    args = ap.parse_args()
+    warm_up = not args.no_warm_up
+
+    samples: Dict[str, List[float]] = defaultdict(list)
+    modules: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(args.runs):
+        for name, ms in run_once(warm_up).items():
+            samples[name].append(ms)
+        for name, ms in import_profile(warm_up).items():
+            modules[name].append(ms)
+
+    startup = {name: {"runs": len(v), **latency_summary(v)} for name, v in samples.items()}
+    imports = {name: {"runs": len(v), **latency_summary(v)} for name, v in modules.items()}
+    top = dict(sorted(imports.items(), key=lambda kv: -kv[1]["p50_ms"])[: args.top])
+
+    config = {"runs": args.runs, "warm_up": warm_up}
+    write_result(args.out, "stock_api", config, {"startup": startup, "imports": imports})
+
+    print_table("startup", startup)
+    print_table("imports (cumulative, -X importtime)", top)
+    if args.out:
+        print(f"\nwrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
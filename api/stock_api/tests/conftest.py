@@ -0,0 +1,2 @@
+# Importing app puts api/ on sys.path (see app/__init__.py) so tests can import common
+import app  # noqa: F401
@@ -0,0 +1,51 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from common.adjust import AdjustFactors, NoFactors
+
+
+def _raw() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "date": [date(2024, 1, 2), date(2024, 6, 3), date(2024, 6, 4)],
+            "open": [10.0, 10.0, 5.0],
+            "high": [10.0, 10.0, 5.0],
+            "low": [10.0, 10.0, 5.0],
+            "close": [10.0, 10.0, 5.0],
+            "volume": [100, 100, 200],
+        }
+    )
+
+
+def test_client_falls_back_to_qfq_bars_without_factors(monkeypatch):
+    from app.services import akshare_client
+
+    reads = []
+
+    def read(symbol, start, end, adjust):
+        reads.append(adjust)
+        return _raw()
+
+    monkeypatch.setattr(akshare_client, "_ADJUST_LOCALLY", True)
+    monkeypatch.setattr(akshare_client, "_read", read)
+    monkeypatch.setattr(akshare_client, "_factors", AdjustFactors(lambda symbol, adjust: pd.DataFrame()))
+    akshare_client._read_qfq("600519", date(2024, 1, 1), date(2024, 6, 30))
+    # No factors: the unadjusted read is followed by a direct qfq read
+    assert reads == ["", "qfq"]
+
+
+def test_missing_sina_factors_do_not_slow_the_bar_limiter(monkeypatch):
+    from app.services import akshare_client
+
+    class _Ak:
+        def stock_zh_a_daily(self, symbol, adjust):
+            raise ValueError("sina hfq factor not available")
+
+    monkeypatch.setattr(akshare_client, "_ak_module", _Ak())
+    rate, factor_rate = akshare_client._limiter.rate, akshare_client._factor_limiter.rate
+    with pytest.raises(NoFactors):
+        akshare_client._fetch_factors("830799", "qfq")
+    assert akshare_client._limiter.rate == rate
+    assert akshare_client._factor_limiter.rate == factor_rate
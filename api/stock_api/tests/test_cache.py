@@ -0,0 +1,24 @@
+import time
+
+
+def test_sqlite_backend_shares_responses_between_workers(tmp_path, monkeypatch):
+    from app.schemas.common import Meta
+    from app.schemas.stock import StockResponse
+    from app.services.stock_service import response_stamp  # importing registers the StockResponse codec
+    from app.utils.cache import cache_from_env
+
+    monkeypatch.setenv("CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("CACHE_SQLITE_PATH", str(tmp_path / "cache.sqlite3"))
+    worker_a, worker_b = cache_from_env(60), cache_from_env(60)
+
+    resp = StockResponse(success=True, message="ok", meta=Meta(symbol="600519", rows=1), data=[{"close": 1.5}])
+    worker_a.set("600519:30d", resp)
+    shared = worker_b.get("600519:30d")
+    assert shared.model_dump() == resp.model_dump()
+    assert response_stamp(shared) is not None  # ETag survives the round trip
+
+    worker_a.set("600519:live", resp, ttl=0.05)
+    time.sleep(0.06)
+    assert worker_b.get("600519:live") is None
+    value, stale = worker_b.get_or_stale("600519:live")
+    assert stale and value.model_dump() == resp.model_dump()
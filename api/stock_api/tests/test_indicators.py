@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from app.services.features import add_technical_indicators
+from app.services.indicators import IndicatorEngine
+
+
+def _ohlcv(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 20 + rng.standard_normal(rows).cumsum() * 0.3
+    close[40:45] = close[39]  # flat stretch: zero gains/losses and returns
+    return pd.DataFrame(
+        {
+            "Open": close + 0.1,
+            "High": close + 0.3,
+            "Low": close - 0.3,
+            "Close": close,
+            "Volume": rng.integers(1_000, 100_000, rows),
+        },
+        index=pd.bdate_range("2020-01-01", periods=rows, name="Date"),
+    )
+
+
+def test_incremental_matches_batch():
+    full = _ohlcv(400)
+    engine = IndicatorEngine()
+
+    engine.compute("600519", full.iloc[:120])
+    for end in range(121, 401, 7):
+        out = engine.compute("600519", full.iloc[:end])
+        pd.testing.assert_frame_equal(out, add_technical_indicators(full.iloc[:end]), atol=1e-4)
+
+    stats = engine.stats()
+    assert stats["full"] == 1
+    assert stats["incremental"] > 30
+
+
+def test_new_start_or_rewritten_history_recomputes():
+    full = _ohlcv(200)
+    engine = IndicatorEngine()
+    engine.compute("600519", full.iloc[:150])
+
+    rewritten = full.copy()
+    rewritten["Close"] *= 0.9
+    out = engine.compute("600519", rewritten)
+    pd.testing.assert_frame_equal(out, add_technical_indicators(rewritten))
+
+    engine.compute("600519", full.iloc[10:])
+    assert engine.stats()["full"] == 3
@@ -7,3 +7,51 @@ def test_sanitize_for_json():
     assert out["a"] is None
     assert out["b"] is None
     assert out["c"][1] is None
+
+
+def test_ndjson_from_frame_matches_json_records():
+    import json
+
+    import pandas as pd
+
+    from app.services.streaming import ndjson_from_frame
+
+    df = pd.DataFrame(
+        {"Close": [1.5, np.nan, 2.0], "Volume": [10, 20, 30]},
+        index=pd.Index(pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-04"]), name="Date"),
+    )
+    chunks = list(ndjson_from_frame(df, batch_rows=2))
+    assert len(chunks) == 2
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert rows[0] == {"Date": "2024-01-02T00:00:00", "Close": 1.5, "Volume": 10}
+    assert rows[1]["Close"] is None
+
+
+def test_frame_records_render_like_to_dict_and_sanitize():
+    import pandas as pd
+
+    from app.schemas.common import Meta
+    from app.schemas.stock import StockResponse
+    from app.services.serializer import frame_records, render_json
+    from app.services.stock_service import render_response
+
+    df = pd.DataFrame(
+        {
+            "Close": [1.5, np.nan, np.inf],
+            "Volume": [10, 20, 30],
+            "Up": [True, False, True],
+            "Name": ["贵州茅台", None, "x"],
+        },
+        index=pd.DatetimeIndex(
+            [pd.Timestamp("2024-01-02"), pd.Timestamp("2024-01-03"), pd.Timestamp("2024-01-04 09:30:00.5")], name="Date"
+        ),
+    )
+    meta = Meta(stock_code="600519", rows=3)
+    old = StockResponse(
+        success=True, message="ok", meta=meta, data=sanitize_for_json(df.reset_index().to_dict(orient="records"))
+    )
+    new = StockResponse.model_construct(success=True, message="ok", meta=meta, data=frame_records(df), warnings=[])
+    assert render_response(new) == render_json(new) == render_json(old)
+
+    # whole-second timestamps take the per-column path
+    assert frame_records(df.iloc[:2])[0]["Date"] == "2024-01-02T00:00:00"
@@ -0,0 +1,63 @@
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import stocks
+from app.services import stock_service
+from app.services.akshare_client import normalize_symbol
+from app.utils.interval import calc_date_range
+
+
+def _bars(start, end):
+    days = pd.bdate_range(start, end)
+    return pd.DataFrame(
+        {"Open": 10.0, "High": 11.0, "Low": 9.0, "Close": [10.0 + i / 100 for i in range(len(days))], "Volume": 1000},
+        index=pd.Index(days, name="Date"),
+    )
+
+
+def test_failed_build_is_cached_only_briefly(monkeypatch):
+    # Settled history would be kept until the next open; a failure must not be
+    monkeypatch.setattr(stock_service, "_fetch_shared", lambda symbol, start, end: pd.DataFrame())
+    resp = stock_service.get_stock_data_with_features_by_dates("600519", "2020-01-02", "2020-06-30")
+    assert not resp.success
+
+    ck = "600519:2020-01-02:2020-06-30"
+    try:
+        assert stock_service._cache.ttl_remaining(ck) <= stock_service._cache.ttl_seconds
+
+        monkeypatch.setattr(stock_service, "_fetch_shared", lambda symbol, start, end: _bars(start, end))
+        stock_service._cache.delete(ck)  # the short TTL ran out
+        resp = stock_service.get_stock_data_with_features_by_dates("600519", "2020-01-02", "2020-06-30")
+        assert resp.success
+        assert stock_service._cache.ttl_remaining(ck) > stock_service._cache.ttl_seconds
+    finally:
+        stock_service._cache.delete(ck)
+
+
+def test_interval_responses_support_304_gzip_and_keep_last_modified(monkeypatch):
+    monkeypatch.setattr(stock_service, "_fetch_shared", lambda symbol, start, end: _bars(start, end))
+    app = FastAPI()
+    app.include_router(stocks.router)
+    client = TestClient(app)
+
+    _, _, interval = calc_date_range("1y")
+    ck = stock_service._make_cache_key(normalize_symbol("600519"), interval)
+    try:
+        first = client.get("/stocks/600519", params={"interval": "1y"}, headers={"Accept-Encoding": "gzip"})
+        assert first.status_code == 200
+        assert first.headers["content-encoding"] == "gzip"
+        assert first.json()["success"]
+        etag, modified = first.headers["etag"], first.headers["last-modified"]
+
+        assert client.get("/stocks/600519", params={"interval": "1y"}, headers={"If-None-Match": etag}).status_code == 304
+        assert client.get("/stocks/600519", params={"interval": "1y"}, headers={"If-Modified-Since": modified}).status_code == 304
+
+        # The cached response expires; the rebuilt one has the same content and keeps Last-Modified
+        stamp = stock_service.response_stamp(stock_service._cache.peek(ck))
+        stock_service._cache.delete(ck)
+        again = client.get("/stocks/600519", params={"interval": "1y"}, headers={"If-Modified-Since": modified})
+        assert again.status_code == 304
+        assert stock_service.response_stamp(stock_service._cache.peek(ck)) == stamp
+    finally:
+        stock_service._cache.delete(ck)
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# 与 stock_api 共用的基础模块在 api/common；服务在自己的目录下启动，把 api/ 加进 sys.path 才能导入
+_API_DIR = str(Path(__file__).resolve().parents[2])
+if _API_DIR not in sys.path:
+    sys.path.append(_API_DIR)
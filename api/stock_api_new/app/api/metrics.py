@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core import stats
+from common import metrics
+
+router = APIRouter(tags=['metrics'])
+
+@router.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(stats.snapshot), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,84 @@
+from __future__ import annotations 
+
+from datetime import date, timedelta 
+from typing import Annotated 
+
+import pandas as pd
+from fastapi import APIRouter, HTTPException, Path, Query, Response
+
+from app.core import stats
+from app.core.config import settings
+from app.inference.explain import ExplanationStore
+from app.inference.predictor import Predictor
+from app.inference.registry import ModelRegistry
+from app.services.candles import load_candles
+from app.schemas.predict import ExplainMeta, ExplainResponse, PredictMeta, PredictResponse
+
+
+router = APIRouter(prefix='/stocks', tags=['predict'])
+
+# 模型在应用启动时加载一次（见 app.main 的 lifespan）
+models = ModelRegistry(settings.model_dir)
+
+
+def _load_window(stock_code: str) -> tuple[pd.DataFrame, str]:
+    # 与训练一致用 models.adjust 的日线；取足够长的历史让 EMA 类特征收敛
+    end = date.today()
+    start = end - timedelta(days=settings.predict_history_days)
+    df, _, span = load_candles(stock_code, start, end, models.adjust, 2000)
+    return df, span.version
+
+
+_predictor = Predictor(
+    models,
+    _load_window,
+    max_batch=settings.predict_max_batch,
+    max_wait_ms=settings.predict_max_wait_ms,
+    cache_entries=settings.predict_cache_entries,
+)
+stats.register("predict", _predictor.stats)
+
+# 解释由 app.inference.explain 每天收盘后批量算好，这里只读
+_explanations = ExplanationStore(settings.explain_dir)
+stats.register("explanations", _explanations.stats)
+
+
+def load_models() -> None:
+    models.load()
+
+
+@router.get("/{stock_code}/predict", response_model=PredictResponse)
+def predict(
+    response: Response,
+    stock_code : Annotated[str, Path(min_length=6, max_length=6, pattern=r'\d{6}')],
+) -> PredictResponse:
+    prediction, cache_status = _predictor.predict(stock_code)
+    response.headers["X-Cache"] = cache_status
+    return PredictResponse(
+        meta=PredictMeta(
+            stock_code=stock_code,
+            as_of=prediction.as_of,
+            bars=prediction.bars,
+            adjust=models.adjust,
+            model_version=models.version,
+        ),
+        data=prediction.scores,
+    )
+
+
+@router.get("/{stock_code}/explain", response_model=ExplainResponse)
+def explain(
+    stock_code : Annotated[str, Path(min_length=6, max_length=6, pattern=r'\d{6}')],
+    day : Annotated[date | None, Query(alias="date", description="YYYY-MM-DD，默认最近一个已计算的交易日")] = None,
+) -> ExplainResponse:
+    version = models.version
+    if not version:
+        raise HTTPException(status_code=503, detail="no prediction models loaded")
+    day = day or _explanations.latest(version)
+    data = _explanations.lookup(version, stock_code, day) if day is not None else None
+    if data is None:
+        raise HTTPException(status_code=404, detail="no explanation for given stock/date")
+    return ExplainResponse(
+        meta=ExplainMeta(stock_code=stock_code, date=day, model_version=version),
+        data=data,
+    )
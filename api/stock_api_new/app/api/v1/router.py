@@ -1,7 +1,11 @@
 from fastapi import APIRouter 
 from app.api.v1.health import router as health_router 
 from app.api.v1.stocks import router as stocks_router
+from app.api.v1.stats import router as stats_router
+from app.api.v1.predict import router as predict_router
 
 api_router = APIRouter() 
 api_router.include_router(health_router)
-api_router.include_router(stocks_router)
\ No newline at end of file
+api_router.include_router(stocks_router)
+api_router.include_router(stats_router)
+api_router.include_router(predict_router)
\ No newline at end of file
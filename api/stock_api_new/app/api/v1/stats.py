@@ -0,0 +1,11 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from app.core import stats
+
+router = APIRouter(tags=['stats'])
+
+@router.get('/stats')
+def get_stats() -> dict[str, dict[str, Any]]:
+    return stats.snapshot()
@@ -1,59 +1,57 @@
 from __future__ import annotations 
 
+import contextvars
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta 
 from typing import Annotated, Literal 
 
-from fastapi import APIRouter, Path, Query, HTTPException, Response
-
-from app.schemas.stocks import Candle, CandleMeta, CandleResponse, Interval, Adjust
-from app.providers.akshare_provider import AkShareProvider
-from app.core.cache import TTLCache 
+import pandas as pd
+from fastapi import APIRouter, Path, Query, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.schemas.stocks import (
+    Adjust,
+    BatchCandleRequest,
+    BatchCandleResponse,
+    CandleMeta,
+    CandleResponse,
+    ColumnarCandleResponse,
+    Interval,
+)
+from common.cache import TTLCache
+from common.http_cache import conditional_response, make_etag
+from app.core.errors import error_code_for_status
+from app.core.serialize import CANDLE_FIELDS, candle_columns, candle_rows, dumps, encode_candles
+from app.core.stream import ARROW_STREAM, arrow_chunks, ndjson_chunks, pa, stream_format
 from app.core.config import settings
+from app.core import stats
+from common import ratelimit, timing
+from app.services import candles
 
 
 router = APIRouter(prefix='/stocks', tags=['stocks'])
 
-_cache = TTLCache(ttl_seconds=settings.cache_ttl_seconds)
-
-
-
-# def _fake_candles(start: date, end: date) -> list[Candle]:
-#     out: list[Candle] = []
-#     cur = start
-#     price = 10.0
-#     while cur <= end:
-#         # 只生成工作日数据也行，这里简单起见每天一条
-#         open_ = price
-#         close = price * 1.001
-#         high = max(open_, close) * 1.002
-#         low = min(open_, close) * 0.998
-#         out.append(
-#             Candle(
-#                 date=cur,
-#                 open=round(open_, 2),
-#                 high=round(high, 2),
-#                 low=round(low, 2),
-#                 close=round(close, 2),
-#                 volume=100000,
-#             )
-#         )
-#         price = close
-#         cur += timedelta(days=1)
-#     return out
+# 按 (ETag, 编码) 缓存编码 / 压缩后的响应体；ETag 相同内容就相同，所以不设过期，只按字节数 LRU
+_bodies = TTLCache(
+    ttl_seconds=math.inf,
+    max_bytes=settings.response_cache_max_bytes,
+)
 
-@router.get("/{stock_code}/candles",
-            response_model=CandleResponse,
-            response_model_exclude_none=True)
-def get_candles(
-    response : Response,
-    stock_code : Annotated[str, Path(min_length=6, max_length=6, pattern=r'\d{6}')],
-    interval : Annotated[Interval, Query(description='Data window preset')] ='30d',
-    start : Annotated[date | None, Query(description='YYYY--MM--DD')] = None, 
-    end : Annotated[date | None, Query(description='YYYY--MM--DD')] = None, 
-    limit : Annotated[int, Query(ge=1, le=2000)] = 1000,
-    adjust: Annotated[Adjust, Query(description="Price adjustment: '' | qfq | hfq")] = "",
-    fields: Annotated[str | None, Query(description="Comma-separated fields: date,open,high,low,close,volume")] = None,
-) -> CandleResponse:
+# 批量接口拉取未命中 symbol 的线程池，所有批量请求共享，限制对上游的总并发
+_batch_pool = ThreadPoolExecutor(max_workers=settings.batch_concurrency, thread_name_prefix="candles-batch")
+
+_STOCK_CODE = re.compile(r'\d{6}')
+
+# JSON 响应一次性编码，默认 / 最多返回的条数；NDJSON / Arrow 按批发送，默认不限条数
+_JSON_LIMIT = 1000
+_JSON_MAX_LIMIT = 2000
+
+stats.register("candles_bodies", _bodies.stats)
+
+
+def _resolve_window(interval: Interval, start: date | None, end: date | None) -> tuple[date, date]:
     # 当 start/end 为空的时候，根据 interval 给出区间 
     today = date.today() 
 
@@ -77,112 +75,163 @@ def get_candles(
     if start > end:
         raise HTTPException(status_code=400, detail='start must be <= end')
 
-    if stock_code == '000000':
-        raise HTTPException(status_code=404, detail='stock not found')
-
-    fields_key = fields or "ALL"
-    cache_key = (
-        f"candles:{stock_code}:"
-        f"start={start.isoformat()}:end={end.isoformat()}:"
-        f"interval={interval}:adjust={adjust}:limit={limit}:fields={fields_key}"
-    )
-
-    cached = _cache.get(cache_key)
-
-    # 缓存命中直接返回
-    if cached is not None:
-        response.headers['X-Cache'] = 'HIT'
-        return cached
+    return start, end
 
-    response.headers["X-Cache"] = "MISS"
 
-    df = AkShareProvider.get_a_stock_daily(stock_code, start, end, adjust=adjust)
+def _parse_fields(fields: str | None) -> tuple[str, ...]:
+    if not fields:
+        return CANDLE_FIELDS
+    parts = {p.strip().lower() for p in fields.split(",") if p.strip()}
+    if not parts or not parts.issubset(CANDLE_FIELDS):
+        raise HTTPException(status_code=400, detail="invalid fields")
+    # 输出顺序与 Candle 模型字段顺序一致
+    return tuple(f for f in CANDLE_FIELDS if f in parts)
 
-    # limit：取最近 limit 条（akshare 通常是按日期升序）
-    df = df.sort_values("date").tail(limit)
 
-    candles = [
-        Candle(
-            date=row["date"],
-            open=float(row["open"]),
-            high=float(row["high"]),
-            low=float(row["low"]),
-            close=float(row["close"]),
-            volume=int(row["volume"]),
+@router.get("/{stock_code}/candles",
+            response_model=CandleResponse | ColumnarCandleResponse,
+            response_model_exclude_none=True)
+def get_candles(
+    request: Request,
+    stock_code : Annotated[str, Path(min_length=6, max_length=6, pattern=r'\d{6}')],
+    interval : Annotated[Interval, Query(description='Data window preset')] ='30d',
+    start : Annotated[date | None, Query(description='YYYY--MM--DD')] = None, 
+    end : Annotated[date | None, Query(description='YYYY--MM--DD')] = None, 
+    limit : Annotated[int | None, Query(ge=1, description=f'JSON: default {_JSON_LIMIT}, max {_JSON_MAX_LIMIT}; NDJSON / Arrow: unlimited by default')] = None,
+    adjust: Annotated[Adjust, Query(description="Price adjustment: '' | qfq | hfq")] = "",
+    fields: Annotated[str | None, Query(description="Comma-separated fields: date,open,high,low,close,volume")] = None,
+    response_format: Annotated[Literal["rows", "columnar"], Query(alias="format", description="rows | columnar (one array per field)")] = "rows",
+) -> Response:
+    start, end = _resolve_window(interval, start, end)
+    wanted = _parse_fields(fields)
+    media_type = stream_format(request.headers.get("accept"))
+    if media_type == ARROW_STREAM and pa is None:
+        raise HTTPException(status_code=406, detail="arrow output is not available (pyarrow not installed)")
+    if media_type is None:
+        limit = _JSON_LIMIT if limit is None else limit
+        if limit > _JSON_MAX_LIMIT:
+            raise HTTPException(status_code=400, detail=f"limit must be <= {_JSON_MAX_LIMIT} for JSON responses")
+    df, cache_status, span = candles.load_candles(stock_code, start, end, adjust, limit)
+
+    if media_type is not None:
+        # Accept: application/x-ndjson / Arrow IPC stream：按批编码、边编码边发送
+        chunks = arrow_chunks(df, wanted) if media_type == ARROW_STREAM else ndjson_chunks(df, wanted)
+        return StreamingResponse(
+            chunks,
+            media_type=media_type,
+            headers={"X-Cache": cache_status, "X-Rows": str(len(df))},
         )
-        for _, row in df.iterrows()
-    ]
 
-    resp = CandleResponse(
-        message=f"candles for {stock_code}",
-        meta=CandleMeta(
+    # ETag = 最后一根 K 线的日期 + 数据版本 + 决定响应内容的参数；没变就 304，不再编码
+    last_day = pd.Timestamp(df["date"].iloc[-1]).strftime("%Y%m%d")
+    etag = make_etag(
+        last_day, span.version, stock_code, adjust, interval, start, end, limit, ",".join(wanted), response_format
+    )
+
+    def render() -> bytes:
+        # 按列整体编码成 JSON bytes，不逐行构造 Candle / model_dump
+        meta = CandleMeta(
             stock_code=stock_code,
             interval=interval,
             start=start,
             end=end,
-            rows=len(candles),
-        ),
-        data=candles,
-    )
-
-    allowed = {"date", "open", "high", "low", "close", "volume"}
-
-    def normalize_fields(s : str) -> list[str]:
-        parts = [p.strip().lower() for p in s.split(",") if p.strip()]
-        parts = sorted(set(parts))
-        return parts
-
-    wanted = None
-    fields_key = "ALL"
-    if fields:
-        wanted = normalize_fields(fields)
-        if not wanted or any(f not in allowed for f in wanted):
-            raise HTTPException(status_code=400, detail="invalid fields")
-        fields_key = ",".join(wanted)
-
-    cache_key = (
-        f"candles:{stock_code}:"
-        f"start={start.isoformat()}:end={end.isoformat()}:"
-        f"interval={interval}:adjust={adjust}:limit={limit}:fields={fields_key}"
-    )
-
-    cached = _cache.get(cache_key)
-    if cached is not None:
-        response.headers["X-Cache"] = "HIT"
-        return cached
-
-    response.headers["X-Cache"] = "MISS"
-
-    df = AkShareProvider.get_a_stock_daily(stock_code, start, end, adjust=adjust)
-    df = df.sort_values("date").tail(limit)
-
-    candles = [ 
-        Candle( 
-            date=row["date"], 
-            open=float(row["open"]), 
-            high=float(row["high"]), 
-            low=float(row["low"]), 
-            close=float(row["close"]), 
-            volume=int(row["volume"]), 
-            ) for _, row in df.iterrows() 
-        ] 
-            
-    resp = CandleResponse( 
-        message=f"candles for {stock_code}",
-        meta=CandleMeta( 
-            stock_code=stock_code, 
-            interval=interval,
-            start=start, 
-            end=end, 
-            rows=len(candles), 
-            ), 
-        data=candles, 
+            rows=len(df),
+        )
+        return encode_candles(
+            df,
+            message=f"candles for {stock_code}",
+            meta=meta.model_dump(mode="json"),
+            fields=wanted,
+            columnar=response_format == "columnar",
         )
 
-    resp_dict = resp.model_dump()
-    if wanted is not None:
-        resp_dict["data"] = [{k: item[k] for k in wanted} for item in resp_dict["data"]]
+    return conditional_response(
+        request,
+        etag=etag,
+        last_modified=span.updated_at,
+        render=render,
+        bodies=_bodies,
+        min_compress_bytes=settings.compress_min_bytes,
+        headers={"X-Cache": cache_status},
+    )
 
-    _cache.set(cache_key, resp_dict)
 
-    return resp_dict
+@router.post("/candles:batch", response_model=BatchCandleResponse)
+def get_candles_batch(req: BatchCandleRequest) -> Response:
+    """
+    多个 symbol 共用同一个时间窗口 / adjust / fields：
+    缓存命中的直接返回，未命中的交给有界线程池并发拉取；
+    单个 symbol 的 404 / 502 只记录在 errors 里，不影响整批
+    """
+    start, end = _resolve_window(req.interval, req.start, req.end)
+    wanted = _parse_fields(req.fields)
+    columnar = req.format == "columnar"
+
+    codes = list(dict.fromkeys(c.strip() for c in req.codes))
+    results: dict[str, dict] = {}
+    errors: dict[str, dict] = {}
+
+    def _ok(code: str, df: pd.DataFrame, cache_status: str) -> None:
+        with timing.stage("serialize"):
+            columns = candle_columns(df, wanted)
+            results[code] = {
+                "rows": len(df),
+                "cache": cache_status,
+                "data": columns if columnar else candle_rows(columns),
+            }
+
+    def _fail(code: str, exc: Exception) -> None:
+        if isinstance(exc, HTTPException):
+            errors[code] = {
+                "status": exc.status_code,
+                "error_code": error_code_for_status(exc.status_code),
+                "message": str(exc.detail),
+            }
+        else:
+            errors[code] = {"status": 500, "error_code": "INTERNAL_ERROR", "message": "Internal server error"}
+
+    misses = []
+    for code in codes:
+        if not _STOCK_CODE.fullmatch(code):
+            _fail(code, HTTPException(status_code=400, detail="stock_code must be 6 digits"))
+            continue
+        candles.prewarmer.touch((code, req.adjust))
+        df = candles.frames.get_cached(code, start, end, req.adjust)
+        if df is None:
+            misses.append(code)
+        elif df.empty:
+            _fail(code, HTTPException(status_code=404, detail="no data for given stock/time range"))
+        else:
+            _ok(code, df.tail(req.limit), "HIT")
+
+    # 带上当前请求的上下文，线程池里的阶段耗时也记到这个请求上；批量拉取排在单个交互请求后面
+    with ratelimit.priority(ratelimit.BATCH):
+        futures = {
+            code: _batch_pool.submit(contextvars.copy_context().run, candles.load_candles, code, start, end, req.adjust, req.limit)
+            for code in misses
+        }
+    for code, fut in futures.items():
+        try:
+            df, cache_status, _ = fut.result()
+            _ok(code, df, cache_status)
+        except Exception as e:
+            _fail(code, e)
+
+    body = {
+        "success": not errors,
+        "message": f"candles for {len(results)}/{len(codes)} symbols",
+        "meta": {
+            "interval": req.interval,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "requested": len(codes),
+            "succeeded": len(results),
+            "failed": len(errors),
+        },
+        # 保持请求里的顺序
+        "results": {c: results[c] for c in codes if c in results},
+        "errors": {c: errors[c] for c in codes if c in errors},
+    }
+    with timing.stage("serialize"):
+        content = dumps(body)
+    return Response(content=content, media_type="application/json")
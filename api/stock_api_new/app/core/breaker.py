@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+
+class CircuitOpenError(Exception):
+    """
+    熔断打开期间直接拒绝调用，retry_after 为预计恢复探测的秒数
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"circuit open, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    连续失败 failure_threshold 次后打开熔断，reset_seconds 内的调用直接失败；
+    之后进入半开状态，只放行一个探测调用：成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.failures = 0
+        self.rejections = 0
+        self.opens = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def before_call(self) -> None:
+        """
+        调用上游之前检查，熔断打开时抛 CircuitOpenError
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._current_state(now)
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejections += 1
+            retry_after = max(0.0, self.reset_seconds - (now - self._opened_at))
+        raise CircuitOpenError(retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opens += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(time.monotonic()),
+                "consecutive_failures": self._consecutive_failures,
+                "failures": self.failures,
+                "rejections": self.rejections,
+                "opens": self.opens,
+            }
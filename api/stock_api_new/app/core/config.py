@@ -10,10 +10,93 @@ class Settings(BaseModel):
     app_name: str = os.getenv("APP_NAME", "stock_api")
     api_prefix: str = os.getenv("API_PREFIX", "/v1")
 
+    # 上游数据源（app.providers 注册表里的名字）；启动时是否在后台提前导入它（不阻塞 /health）
+    upstream_provider: str = os.getenv("UPSTREAM_PROVIDER", "akshare")
+    upstream_warm_up: bool = os.getenv("UPSTREAM_WARM_UP", "1") == "1"
+
+    # 离线压测（common.tape）：live 直连 akshare | record 同时录进磁带 | replay 只从磁带回放。
+    # 回放延迟：constant / recorded（录制时的耗时）/ heavy_tail（中位数 latency_ms 的对数正态）；按概率注入失败；
+    # 磁带里没有的调用：error（当作上游出错，默认）| empty（当作无数据）
+    upstream_mode: str = os.getenv("UPSTREAM_MODE", "live")
+    upstream_tape_dir: str = os.getenv("UPSTREAM_TAPE_DIR", ".data/upstream_tape")
+    replay_latency: str = os.getenv("REPLAY_LATENCY", "recorded")
+    replay_latency_ms: float = float(os.getenv("REPLAY_LATENCY_MS", "50"))
+    replay_latency_sigma: float = float(os.getenv("REPLAY_LATENCY_SIGMA", "1.0"))
+    replay_failure_rate: float = float(os.getenv("REPLAY_FAILURE_RATE", "0"))
+    replay_miss: str = os.getenv("REPLAY_MISS", "error")
+    replay_seed: int = int(os.getenv("REPLAY_SEED", "0"))
+
     upstream_timeout_seconds: float = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "5.0"))
     upstream_retries: int = int(os.getenv("UPSTREAM_RETRIES", "1"))
+    upstream_max_workers: int = int(os.getenv("UPSTREAM_MAX_WORKERS", "16"))
+    upstream_backoff_base_seconds: float = float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", "0.2"))
+    upstream_backoff_max_seconds: float = float(os.getenv("UPSTREAM_BACKOFF_MAX_SECONDS", "2.0"))
+
+    # 上游限流：每秒最多多少次调用（出错 / 超时时自动降速，不低于 min）、令牌桶容量、同时在跑的调用数
+    upstream_rate_per_second: float = float(os.getenv("UPSTREAM_RATE_PER_SECOND", "10"))
+    upstream_rate_min_per_second: float = float(os.getenv("UPSTREAM_RATE_MIN_PER_SECOND", "1"))
+    upstream_burst: float = float(os.getenv("UPSTREAM_BURST", "10"))
+    upstream_max_concurrency: int = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "8"))
+
+    # qfq / hfq 由一份不复权日线 + 复权因子在本地计算（关掉则每种 adjust 各自向上游拉取、各存一份）。
+    # 默认关闭：新浪的因子套在东方财富的不复权日线上，还没有和东方财富自己的 qfq 序列核对过
+    adjust_locally: bool = os.getenv("ADJUST_LOCALLY", "0") == "1"
+
+    # 熔断：连续失败多少次打开，打开多久后放行探测请求
+    breaker_failure_threshold: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    breaker_reset_seconds: float = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
 
     cache_ttl_seconds: int = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+    cache_max_entries: int = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    cache_max_bytes: int = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    # 缓存后端：memory（每个 worker 各一份）| sqlite（同机 worker 共享）| redis
+    cache_backend: str = os.getenv("CACHE_BACKEND", "memory")
+    cache_sqlite_path: str = os.getenv("CACHE_SQLITE_PATH", ".data/cache.sqlite3")
+    cache_redis_url: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    # 过期后继续返回旧值的宽限期（同时后台刷新），0 表示关闭
+    cache_stale_seconds: float = float(os.getenv("CACHE_STALE_SECONDS", "300"))
+    # 按交易日历决定过期时间：已收盘的日线不过期，只有盘中的当日 K 线用 CACHE_TTL_SECONDS
+    cache_calendar_aware: bool = os.getenv("CACHE_CALENDAR_AWARE", "1") == "1"
+    # 节假日文件 TRADING_HOLIDAYS_FILE 由 common.market 直接读取（与 stock_api 共用）
+
+    # 热点预热：跟踪访问最多的 (symbol, adjust)，快过期时提前刷新；每分钟最多消耗多少次上游请求
+    prewarm_enabled: bool = os.getenv("PREWARM_ENABLED", "1") == "1"
+    prewarm_top_n: int = int(os.getenv("PREWARM_TOP_N", "50"))
+    prewarm_interval_seconds: float = float(os.getenv("PREWARM_INTERVAL_SECONDS", "5"))
+    prewarm_lead_seconds: float = float(os.getenv("PREWARM_LEAD_SECONDS", "15"))
+    prewarm_budget_per_minute: float = float(os.getenv("PREWARM_BUDGET_PER_MINUTE", "60"))
+
+    # 条件请求 / 压缩：编码和压缩后的响应体按 ETag 缓存的字节上限；小于 compress_min_bytes 的响应不压缩
+    response_cache_max_bytes: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    compress_min_bytes: int = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+
+    # 超过 SLOW_REQUEST_MS 的请求（连同 trace id 和各阶段耗时）记录在 /stats 的 slow_requests 里，
+    # 由 common.timing 直接读取（与 stock_api 共用）
+
+    # 批量 K 线接口：单次最多多少个 symbol、未命中时并发拉取的线程数
+    batch_max_symbols: int = int(os.getenv("BATCH_MAX_SYMBOLS", "500"))
+    batch_concurrency: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+    # 本地日线存储（已收盘的 K 线落盘，只增量拉取）
+    store_enabled: bool = os.getenv("OHLCV_STORE_ENABLED", "1") == "1"
+    store_dir: str = os.getenv("OHLCV_STORE_DIR", ".data/ohlcv")
+
+    # 全市场特征张量（app.features.build_tensor 生成，训练 / 选股 / 推理只读打开）
+    feature_tensor_dir: str = os.getenv("FEATURE_TENSOR_DIR", ".data/features")
+
+    # 预测接口：模型目录（启动时加载一次，有 CURRENT 文件时加载它指向的版本）、算特征取多少天的日线、
+    # 微批最多多少个 symbol / 第一条请求最多等多久、按 symbol 缓存多少条预测
+    model_dir: str = os.getenv("MODEL_DIR", ".data/models")
+    predict_history_days: int = int(os.getenv("PREDICT_HISTORY_DAYS", "400"))
+    predict_max_batch: int = int(os.getenv("PREDICT_MAX_BATCH", "64"))
+    predict_max_wait_ms: float = float(os.getenv("PREDICT_MAX_WAIT_MS", "5"))
+    predict_cache_entries: int = int(os.getenv("PREDICT_CACHE_ENTRIES", "10000"))
+
+    # SHAP 解释（app.inference.explain 每天批量生成，接口只读）
+    explain_dir: str = os.getenv("EXPLAIN_DIR", ".data/explanations")
+
+    # 训练数据集（app.training.train 生成，按参数摘要缓存）
+    dataset_dir: str = os.getenv("DATASET_DIR", ".data/datasets")
 
 
 settings = Settings()
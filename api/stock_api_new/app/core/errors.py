@@ -9,22 +9,29 @@ def _trace_id(request : Request) -> str | None:
     return getattr(request.state ,'trace_id', None)
 
 
-async def http_exception_handler(request: Request, exc: HTTPException):
+def error_code_for_status(status_code: int) -> str:
     code = "HTTP_ERROR"
-    if exc.status_code == 400:
+    if status_code == 400:
         code = "BAD_REQUEST"
-    elif exc.status_code == 404:
+    elif status_code == 404:
         code = "NOT_FOUND"
-    elif exc.status_code == 401:
+    elif status_code == 401:
         code = "UNAUTHORIZED"
-    elif exc.status_code == 403:
+    elif status_code == 403:
         code = "FORBIDDEN"
-    elif exc.status_code == 429:
+    elif status_code == 406:
+        code = "NOT_ACCEPTABLE"
+    elif status_code == 429:
         code = "RATE_LIMITED"
-    elif exc.status_code == 502:
+    elif status_code == 502:
         code = "UPSTREAM_ERROR"   
-    elif exc.status_code == 503:
+    elif status_code == 503:
         code = "SERVICE_UNAVAILABLE"
+    return code
+
+
+async def http_exception_handler(request: Request, exc: HTTPException):
+    code = error_code_for_status(exc.status_code)
 
     body = ErrorResponse(
         error_code=code,
@@ -32,7 +39,8 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         trace_id=_trace_id(request),
     )
     return JSONResponse(status_code=exc.status_code, 
-                        content=body.model_dump())
+                        content=body.model_dump(),
+                        headers=getattr(exc, "headers", None))
 
 
 async def validation_exception_handler(request : Request, exc : RequestValidationError):
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import hashlib
+import struct
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from common import codec
+from common.cache import TTLCache
+from common.cache_backends import SharedCache
+from common.prewarm import Revalidator
+from common.ohlcv_store import BAR_DTYPE, bars_to_frame, frame_to_bars
+
+FetchFn = Callable[[str, date, date, str], pd.DataFrame]
+TtlFn = Callable[[str, date], float | None]
+
+
+def _days(values) -> np.ndarray:
+    return np.asarray(pd.to_datetime(values).to_numpy().astype("datetime64[D]"))
+
+
+@dataclass
+class FrameSpan:
+    """
+    某个 (symbol, adjust) 已缓存的清洗后日线，覆盖 [lo, hi] 这段日期
+    """
+    frame: pd.DataFrame
+    days: np.ndarray      # frame["date"] 对应的 datetime64[D]，用于二分切片
+    lo: date
+    hi: date
+    version: str = ""         # K 线内容的摘要，内容不变则不变（ETag 用）
+    updated_at: float = 0.0   # 内容最近一次变化的时间（Last-Modified 用）
+
+    def slice(self, start: date, end: date) -> pd.DataFrame:
+        i = np.searchsorted(self.days, np.datetime64(start, "D"), side="left")
+        j = np.searchsorted(self.days, np.datetime64(end, "D"), side="right")
+        return self.frame.iloc[i:j]
+
+
+_SPAN_HEADER = struct.Struct("<ii8sd")
+_EPOCH = date(1970, 1, 1)
+
+
+def _version(frame: pd.DataFrame) -> str:
+    rows = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return hashlib.blake2b(rows.tobytes(), digest_size=8).hexdigest()
+
+
+def _encode_span(span: FrameSpan) -> bytes:
+    # 共享缓存后端的二进制格式：区间 [lo, hi] 的天数、版本、更新时间 + OhlcvStore 同款的定长 K 线数组
+    header = _SPAN_HEADER.pack(
+        (span.lo - _EPOCH).days,
+        (span.hi - _EPOCH).days,
+        bytes.fromhex(span.version or "00" * 8),
+        span.updated_at,
+    )
+    return header + frame_to_bars(span.frame).tobytes()
+
+
+def _decode_span(data: bytes) -> FrameSpan:
+    lo, hi, version, updated_at = _SPAN_HEADER.unpack_from(data)
+    bars = np.frombuffer(data, dtype=BAR_DTYPE, offset=_SPAN_HEADER.size)
+    frame = bars_to_frame(bars)
+    return FrameSpan(
+        frame=frame,
+        days=_days(frame["date"]),
+        lo=_EPOCH + timedelta(days=lo),
+        hi=_EPOCH + timedelta(days=hi),
+        version=version.hex(),
+        updated_at=updated_at,
+    )
+
+
+codec.register(FrameSpan, "FrameSpan", _encode_span, _decode_span)
+
+
+def _merge(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=["date", "open", "high", "low", "close", "volume"])
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates(subset="date", keep="last").sort_values("date", kind="stable")
+    return df.reset_index(drop=True)
+
+
+class RangeFrameCache:
+    """
+    按 (symbol, adjust) 缓存一整段清洗后的日线，而不是按请求参数缓存响应。
+
+    - 请求区间落在已缓存区间内：直接切片，不访问上游
+    - 请求超出已缓存区间：只拉缺的左段 / 右段，合并后扩展缓存区间
+    - 空回复不算覆盖（可能是上游出错 / 被限流）：MISS 拉到空表不写缓存，
+      PARTIAL 只扩展拿到了数据的那一侧，下次请求再问上游
+    - limit / fields 由调用方在切片结果上处理，不再产生独立的缓存项
+    - 传入 revalidator 时，过期但仍在宽限期内的缓存直接返回（STALE），同时在后台刷新
+    - 传入 ttl(adjust, hi) 时按缓存区间的截止日期决定过期时间（见 market.TradingCalendar.ttl_for）
+    """
+
+    def __init__(
+        self,
+        cache: TTLCache | SharedCache,
+        fetch: FetchFn,
+        revalidator: Revalidator | None = None,
+        ttl: TtlFn | None = None,
+    ):
+        self._cache = cache
+        self._fetch = fetch
+        self._revalidator = revalidator
+        self._ttl = ttl
+
+    @staticmethod
+    def _key(symbol: str, adjust: str) -> tuple[str, str, str]:
+        return ("frame", symbol, adjust)
+
+    def get(self, symbol: str, start: date, end: date, adjust: str) -> tuple[pd.DataFrame, str]:
+        """
+        返回 (切片后的 DataFrame, 缓存状态 HIT | STALE | PARTIAL | MISS)
+        """
+        span, status = self.get_span(symbol, start, end, adjust)
+        return span.slice(start, end), status
+
+    def get_span(self, symbol: str, start: date, end: date, adjust: str) -> tuple[FrameSpan, str]:
+        """
+        同 get，但返回覆盖 [start, end] 的整个 FrameSpan（调用方需要 version / updated_at 时用）
+        """
+        key = self._key(symbol, adjust)
+        span, stale = self._lookup(symbol, adjust)
+        prev = span
+
+        if span is not None and span.lo <= start and end <= span.hi:
+            if stale:
+                self._revalidate(symbol, adjust)
+            return span, "STALE" if stale else "HIT"
+        if stale:
+            # 陈旧数据不参与拼接，按未命中处理；前台拉取会替换这一项，不再后台刷新
+            span = None
+
+        if span is None:
+            status = "MISS"
+            fetched = self._fetch(symbol, start, end, adjust)
+            if fetched is None or fetched.empty:
+                empty = _merge([])
+                return FrameSpan(frame=empty, days=_days(empty["date"]), lo=start, hi=end), status
+            parts = [fetched]
+            lo, hi = start, end
+        else:
+            status = "PARTIAL"
+            parts = [span.frame]
+            lo, hi = span.lo, span.hi
+            if start < span.lo:
+                left = self._fetch(symbol, start, span.lo - timedelta(days=1), adjust)
+                if left is not None and not left.empty:
+                    parts.append(left)
+                    lo = start
+            if end > span.hi:
+                right = self._fetch(symbol, span.hi + timedelta(days=1), end, adjust)
+                if right is not None and not right.empty:
+                    parts.append(right)
+                    hi = end
+            if len(parts) == 1:
+                return span, status
+
+        # 并发扩展同一个 symbol 时，把别人刚写进去的部分也合并进来，避免互相覆盖
+        latest: FrameSpan | None = self._cache.peek(key)
+        if (
+            latest is not None
+            and latest is not span
+            and latest.lo <= hi + timedelta(days=1)
+            and lo <= latest.hi + timedelta(days=1)
+        ):
+            parts.insert(0, latest.frame)
+            lo, hi = min(lo, latest.lo), max(hi, latest.hi)
+
+        return self._store(symbol, adjust, _merge(parts), lo, hi, prev=latest or prev), status
+
+    def get_cached(self, symbol: str, start: date, end: date, adjust: str) -> pd.DataFrame | None:
+        """
+        只查缓存：区间已被覆盖时返回切片，否则返回 None（不访问上游）
+        """
+        span, stale = self._lookup(symbol, adjust)
+        if span is not None and span.lo <= start and end <= span.hi:
+            if stale:
+                self._revalidate(symbol, adjust)
+            return span.slice(start, end)
+        return None
+
+    def _lookup(self, symbol: str, adjust: str) -> tuple[FrameSpan | None, bool]:
+        key = self._key(symbol, adjust)
+        if self._revalidator is None:
+            return self._cache.get(key), False
+        return self._cache.get_or_stale(key)
+
+    def _revalidate(self, symbol: str, adjust: str) -> None:
+        # 返回了陈旧数据：在后台按原区间刷新
+        self._revalidator.submit((symbol, adjust), lambda: self.refresh(symbol, adjust))
+
+    def refresh(self, symbol: str, adjust: str) -> None:
+        """
+        按已缓存的区间重新拉取并写回（后台刷新 / 预热用）；不在缓存里则什么都不做
+        """
+        key = self._key(symbol, adjust)
+        span: FrameSpan | None = self._cache.peek(key, allow_stale=True)
+        if span is None:
+            return
+        fetched = self._fetch(symbol, span.lo, span.hi, adjust)
+        if fetched is None or fetched.empty:
+            # 空回复不能覆盖已缓存的数据：保留旧的，等下次刷新
+            return
+        parts = [fetched]
+        lo, hi = span.lo, span.hi
+
+        # 刷新期间别的请求扩展了区间：保留扩展出来的部分，重叠部分以新拉取的为准
+        latest: FrameSpan | None = self._cache.peek(key)
+        if latest is not None and latest is not span:
+            parts.insert(0, latest.frame)
+            lo, hi = min(lo, latest.lo), max(hi, latest.hi)
+
+        self._store(symbol, adjust, _merge(parts), lo, hi, prev=latest or span)
+
+    def _store(
+        self,
+        symbol: str,
+        adjust: str,
+        frame: pd.DataFrame,
+        lo: date,
+        hi: date,
+        prev: FrameSpan | None = None,
+    ) -> FrameSpan:
+        version = _version(frame)
+        # 内容没变（例如后台刷新拿到的是同样的数据）时保留原来的更新时间，客户端的 304 继续有效
+        updated_at = prev.updated_at if prev is not None and prev.version == version else time.time()
+        span = FrameSpan(frame=frame, days=_days(frame["date"]), lo=lo, hi=hi, version=version, updated_at=updated_at)
+        ttl = self._ttl(adjust, hi) if self._ttl is not None else None
+        self._cache.set(self._key(symbol, adjust), span, ttl=ttl)
+        return span
+
+    def ttl_remaining(self, symbol: str, adjust: str) -> float | None:
+        return self._cache.ttl_remaining(self._key(symbol, adjust))
+
+    def invalidate(self, symbol: str, adjust: str) -> None:
+        self._cache.delete(self._key(symbol, adjust))
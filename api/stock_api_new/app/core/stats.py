@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+# 各组件（缓存、single-flight 等）注册自己的统计函数，/stats 统一导出
+_sources: dict[str, Callable[[], dict[str, Any]]] = {}
+
+
+def register(name: str, fn: Callable[[], dict[str, Any]]) -> None:
+    _sources[name] = fn
+
+
+def snapshot() -> dict[str, dict[str, Any]]:
+    return {name: fn() for name, fn in _sources.items()}
@@ -0,0 +1,116 @@
+"""
+大区间 K 线的流式输出：NDJSON（每行一根 K 线）或 Arrow IPC stream。
+
+按 batch_rows 行一批编码、编码完一批就发送，不先拼出整个响应体：
+内存只和一批的大小有关，客户端收到第一批就可以开始处理。
+"""
+from __future__ import annotations
+
+import io
+from typing import Iterable, Iterator
+
+import pandas as pd
+
+from app.core.serialize import CANDLE_FIELDS, candle_columns, candle_rows, dumps
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow 可选，没有就只支持 NDJSON
+    pa = None
+
+NDJSON = "application/x-ndjson"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+BATCH_ROWS = 5000
+
+
+def _accept_q(accept: str) -> dict[str, float]:
+    """
+    Accept 头 -> media type -> q（缺省 1）；同一类型出现多次取最大的 q
+    """
+    out: dict[str, float] = {}
+    for part in accept.split(","):
+        media, *params = (p.strip() for p in part.split(";"))
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media:
+            out[media.lower()] = max(q, out.get(media.lower(), 0.0))
+    return out
+
+
+def stream_format(accept: str | None) -> str | None:
+    """
+    Accept 里要了 NDJSON / Arrow stream 时返回对应的 media type，否则 None（走普通 JSON）
+
+    q=0 表示不接受；两种流式格式按 q 取高的（相同时优先 Arrow），
+    application/json 的 q 更高时仍走普通 JSON
+    """
+    if not accept:
+        return None
+    qs = _accept_q(accept)
+    best = max((ARROW_STREAM, NDJSON), key=lambda t: qs.get(t, 0.0))
+    if qs.get(best, 0.0) <= 0 or qs.get("application/json", 0.0) > qs[best]:
+        return None
+    return best
+
+
+def _batches(df: pd.DataFrame, batch_rows: int) -> Iterator[pd.DataFrame]:
+    for i in range(0, len(df), batch_rows):
+        yield df.iloc[i: i + batch_rows]
+
+
+def ndjson_chunks(
+    df: pd.DataFrame, fields: Iterable[str] = CANDLE_FIELDS, batch_rows: int = BATCH_ROWS
+) -> Iterator[bytes]:
+    fields = tuple(fields)
+    for part in _batches(df, batch_rows):
+        rows = candle_rows(candle_columns(part, fields))
+        yield b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def _arrow_schema(fields: tuple[str, ...]):
+    types = {"date": pa.date32(), "volume": pa.int64()}
+    return pa.schema([(f, types.get(f, pa.float64())) for f in fields])
+
+
+def _arrow_column(df: pd.DataFrame, name: str, type_):
+    # 直接从列的 numpy 数组构造，NaN 记为 null
+    if name == "date":
+        return pa.array(pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]"), type=type_)
+    if name == "volume":
+        values = pd.to_numeric(df["volume"], errors="coerce").astype("Int64")
+        return pa.array(values, type=type_, from_pandas=True)
+    return pa.array(df[name].to_numpy(dtype="float64"), type=type_, from_pandas=True)
+
+
+def arrow_chunks(
+    df: pd.DataFrame, fields: Iterable[str] = CANDLE_FIELDS, batch_rows: int = BATCH_ROWS
+) -> Iterator[bytes]:
+    """
+    Arrow IPC stream：先发 schema，之后每批一个 RecordBatch，最后是结束标记
+    """
+    if pa is None:
+        raise RuntimeError("Arrow output requires the 'pyarrow' package")
+    fields = tuple(fields)
+    schema = _arrow_schema(fields)
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    for part in _batches(df, batch_rows):
+        batch = pa.record_batch([_arrow_column(part, f, schema.field(f).type) for f in fields], schema=schema)
+        writer.write_batch(batch)
+        yield drain()
+    writer.close()
+    yield drain()
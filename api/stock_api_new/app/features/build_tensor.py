@@ -0,0 +1,72 @@
+"""
+构建 / 增量更新全市场特征张量
+
+    cd api/stock_api_new
+    # 首次：全量构建
+    python -m app.features.build_tensor --symbols-file universe.txt --start 2015-01-01
+    # 之后每个交易日收盘后：只追加新的日期截面（universe.txt 里新出现的股票会补齐历史）
+    python -m app.features.build_tensor --symbols-file universe.txt
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import date
+from pathlib import Path
+
+from app.core.config import settings
+from common.market import settled_through
+from app.features.tensor import FeatureTensorBuilder
+from app import providers
+
+
+def _fetch(symbol: str, start: date, end: date, adjust: str):
+    return providers.get().get_a_stock_daily(symbol, start, end, adjust, allow_empty=True)
+
+
+def _read_symbols(args: argparse.Namespace) -> list[str]:
+    symbols = [s.strip() for s in (args.symbols or "").split(",") if s.strip()]
+    if args.symbols_file:
+        symbols += [line.strip() for line in Path(args.symbols_file).read_text().splitlines() if line.strip()]
+    return list(dict.fromkeys(symbols))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=settings.feature_tensor_dir)
+    parser.add_argument("--symbols", help="逗号分隔的股票代码")
+    parser.add_argument("--symbols-file", help="每行一个股票代码")
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2015, 1, 1), help="全量构建的起始日期")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="默认取最后一个已收盘交易日")
+    parser.add_argument("--adjust", default="qfq", choices=["", "qfq", "hfq"])
+    parser.add_argument("--rebuild", action="store_true", help="忽略已有张量，全量重建")
+    parser.add_argument("--workers", type=int, default=settings.batch_concurrency)
+    args = parser.parse_args()
+
+    symbols = _read_symbols(args)
+    end = args.end or settled_through()
+    builder = FeatureTensorBuilder(args.root, fetch=_fetch, adjust=args.adjust, max_workers=args.workers)
+
+    t0 = time.perf_counter()
+    if args.rebuild or not builder.exists():
+        if not symbols:
+            parser.error("full build needs --symbols or --symbols-file")
+        tensor = builder.build(symbols, args.start, end)
+        action = "built"
+    else:
+        tensor = builder.update(end, symbols)
+        action = "updated"
+
+    last = tensor.dates[-1] if len(tensor.dates) else "-"
+    print(
+        f"{action} {args.root}: {len(tensor.symbols)} symbols x {len(tensor.dates)} dates "
+        f"x {len(tensor.features)} features (last {last}) in {time.perf_counter() - t0:.1f}s"
+    )
+    if builder.failed:
+        print(f"{len(builder.failed)} symbols failed (left NaN, retried on the next update):")
+        for symbol, err in builder.failed.items():
+            print(f"  {symbol}: {err}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+笔记本（testlogic1 / validlogic）特征的 NumPy 批量实现。
+
+输入是按 (symbol × date) 对齐的二维数组（缺失 / 未上市 / 停牌为 NaN），
+一次计算全部 symbol 的全部特征，输出写入预分配的 (symbol, date, feature) 数组。
+滚动均值 / 标准差用前缀和实现（O(S·T)，与窗口长度无关，同一输入的多个窗口共用），
+EMA 沿时间轴迭代、跨 symbol 向量化。
+
+与 pandas 版本的差异：序列中间的 NaN（停牌）不参与 EMA，状态直接顺延，
+相当于 ewm(ignore_na=True)；没有中间缺失时结果与笔记本一致。
+"""
+from __future__ import annotations
+
+from typing import Mapping
+
+import numpy as np
+import pandas as pd
+
+# 特征名与笔记本保持一致，训练好的模型可以直接按列名取
+FEATURES: tuple[str, ...] = (
+    "RSI",
+    "MACD_Line",
+    "MACD_Signal",
+    "MACD_Hist",
+    "ATR",
+    "BB_Bandwidth",
+    "Relative_Volume",
+    "SMA_Bias",
+    "Lagged_Ret_1D",
+    "Lagged_Ret_5D",
+    "Lagged_Ret_10D",
+    "ma5",
+    "ma10",
+    "ma20",
+    "volatility",
+    "Log_Ret",
+)
+
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+
+# testlogic1.ipynb 训练模型用的特征及顺序
+NOTEBOOK_FEATURES: tuple[str, ...] = FEATURES[:11]
+
+
+def _as_2d(x) -> np.ndarray:
+    arr = np.asarray(x, dtype=np.float64)
+    return arr[None, :] if arr.ndim == 1 else arr
+
+
+def _shift(x: np.ndarray, n: int) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    out[:, n:] = x[:, :-n]
+    return out
+
+
+class _Prefix:
+    """
+    沿时间轴的前缀和 / 有效值计数（首列补 0），同一输入的多个窗口共用一次 cumsum
+    """
+
+    __slots__ = ("total", "count")
+
+    def __init__(self, x: np.ndarray):
+        S, T = x.shape
+        valid = ~np.isnan(x)
+        self.total = np.zeros((S, T + 1))
+        self.count = np.zeros((S, T + 1), dtype=np.int32)
+        np.cumsum(np.where(valid, x, 0.0), axis=1, out=self.total[:, 1:])
+        np.cumsum(valid, axis=1, out=self.count[:, 1:])
+
+    def window_sum(self, w: int) -> np.ndarray:
+        """
+        长度 w 的滚动和；窗口内不足 w 个有效值时为 NaN（pandas rolling 默认 min_periods=w）
+        """
+        S, T = self.total.shape[0], self.total.shape[1] - 1
+        out = np.full((S, T), np.nan)
+        if T >= w:
+            s = self.total[:, w:] - self.total[:, :-w]
+            s[self.count[:, w:] - self.count[:, :-w] < w] = np.nan
+            out[:, w - 1:] = s
+        return out
+
+
+def _rolling_mean(x: np.ndarray, w: int) -> np.ndarray:
+    return _Prefix(x).window_sum(w) / w
+
+
+def _demeaned(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # 方差与平移无关：先减去每个 symbol 的参考值，降低累计平方和的舍入误差
+    # 由有效值的和与个数求均值：全 NaN 的行（停牌 / 拉取失败）参考值取 0，不触发 nanmean 的警告
+    valid = ~np.isnan(x)
+    count = valid.sum(axis=1, keepdims=True)
+    total = np.where(valid, x, 0.0).sum(axis=1, keepdims=True)
+    ref = np.divide(total, count, out=np.zeros((x.shape[0], 1)), where=count > 0)
+    return x - ref, ref
+
+
+def _rolling_std(s1: np.ndarray, s2: np.ndarray, w: int) -> np.ndarray:
+    """
+    由（去均值后）窗口和与平方和得到样本标准差（ddof=1）
+    """
+    var = (s2 - s1 * s1 / w) / (w - 1)
+    return np.sqrt(np.maximum(var, 0.0))
+
+
+def _ema(x: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    adjust=False 的 EMA：y_t = alpha * x_t + (1 - alpha) * y_{t-1}，从每个 symbol 的第一个有效值开始
+    """
+    out = np.full_like(x, np.nan)
+    state = np.full(x.shape[0], np.nan)
+    beta = 1.0 - alpha
+    for t in range(x.shape[1]):
+        xt = x[:, t]
+        valid = ~np.isnan(xt)
+        state = np.where(
+            valid,
+            np.where(np.isnan(state), xt, alpha * xt + beta * state),
+            state,
+        )
+        out[:, t] = np.where(valid, state, np.nan)
+    return out
+
+
+def compute_features(
+    close,
+    high,
+    low,
+    volume,
+    *,
+    out: np.ndarray | None = None,
+    dtype=np.float32,
+) -> np.ndarray:
+    """
+    close / high / low / volume：形状 (S, T)（或单个 symbol 的 (T,)），按日期升序对齐。
+    返回 / 写入 out：形状 (S, T, len(FEATURES))。
+    """
+    c, h, l, v = _as_2d(close), _as_2d(high), _as_2d(low), _as_2d(volume)
+    S, T = c.shape
+    if out is None:
+        out = np.empty((S, T, len(FEATURES)), dtype=dtype)
+    elif out.shape != (S, T, len(FEATURES)):
+        raise ValueError(f"out must have shape {(S, T, len(FEATURES))}, got {out.shape}")
+
+    def put(name: str, values: np.ndarray) -> None:
+        out[:, :, FEATURE_INDEX[name]] = values
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prev = _shift(c, 1)
+
+        # RSI（Wilder 平滑：ewm(alpha=1/14, adjust=False)）
+        delta = c - prev
+        gain = np.where(np.isnan(c), np.nan, np.where(delta > 0, delta, 0.0))
+        loss = np.where(np.isnan(c), np.nan, np.where(delta < 0, -delta, 0.0))
+        avg_gain = _ema(gain, 1 / 14)
+        avg_loss = _ema(loss, 1 / 14)
+        put("RSI", 100 - (100 / (1 + avg_gain / avg_loss)))
+
+        # MACD (12, 26, 9)
+        macd = _ema(c, 2 / 13) - _ema(c, 2 / 27)
+        signal = _ema(macd, 2 / 10)
+        put("MACD_Line", macd)
+        put("MACD_Signal", signal)
+        put("MACD_Hist", macd - signal)
+
+        # ATR (14)：前一日收盘缺失时 TR 退化为 high - low
+        tr = np.fmax(np.fmax(h - l, np.abs(h - prev)), np.abs(l - prev))
+        put("ATR", _rolling_mean(tr, 14))
+
+        # 收盘价的均线 / 标准差共用一组前缀和
+        d, ref = _demeaned(c)
+        pc, pc2 = _Prefix(d), _Prefix(d * d)
+        s20 = pc.window_sum(20)
+        sma20 = s20 / 20 + ref
+        std20 = _rolling_std(s20, pc2.window_sum(20), 20)
+
+        # 布林带宽 (20, 2) / SMA 乖离 / 波动率
+        put("BB_Bandwidth", 4 * std20 / sma20)
+        put("SMA_Bias", c / sma20 - 1)
+        put("volatility", std20)
+
+        # 相对成交量
+        put("Relative_Volume", v / _rolling_mean(v, 20))
+
+        # 对数收益及滞后收益
+        log_ret = np.log(c / prev)
+        put("Log_Ret", log_ret)
+        put("Lagged_Ret_1D", _shift(log_ret, 1))
+        put("Lagged_Ret_5D", np.log(prev / _shift(c, 6)))
+        put("Lagged_Ret_10D", np.log(prev / _shift(c, 11)))
+
+        put("ma5", pc.window_sum(5) / 5 + ref)
+        put("ma10", pc.window_sum(10) / 10 + ref)
+        put("ma20", sma20)
+
+    return out
+
+
+def align_frames(
+    frames: Mapping[str, pd.DataFrame],
+    dates: np.ndarray | None = None,
+) -> tuple[list[str], np.ndarray, dict[str, np.ndarray]]:
+    """
+    把 provider 返回的单 symbol 日线（列：date, open, high, low, close, volume）
+    对齐成 (symbol × date) 矩阵，缺失日期为 NaN。
+    dates 为 None 时取所有 symbol 日期的并集，否则对齐到给定的日历（日历外的 K 线丢弃）。
+
+    返回 (symbols, dates[datetime64[D]], {"close": (S, T), "high": ..., "low": ..., "volume": ...})
+    """
+    symbols = list(frames)
+    day_arrays = [
+        pd.to_datetime(frames[s]["date"]).to_numpy().astype("datetime64[D]") for s in symbols
+    ]
+    if dates is None:
+        dates = np.unique(np.concatenate(day_arrays)) if day_arrays else np.array([], dtype="datetime64[D]")
+    else:
+        dates = np.asarray(dates, dtype="datetime64[D]")
+
+    fields = ("close", "high", "low", "volume")
+    panel = {f: np.full((len(symbols), len(dates)), np.nan) for f in fields}
+    for i, (sym, days) in enumerate(zip(symbols, day_arrays)):
+        cols = np.searchsorted(dates, days)
+        hit = cols < len(dates)
+        hit[hit] = dates[cols[hit]] == days[hit]
+        df = frames[sym]
+        for f in fields:
+            panel[f][i, cols[hit]] = df[f].to_numpy(dtype=np.float64)[hit]
+    return symbols, dates, panel
+
+
+def compact_panel(
+    panel: Mapping[str, np.ndarray],
+) -> tuple[dict[str, np.ndarray], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    align_frames 的结果 -> 每个 symbol 的 K 线挪到行首（按 close 是否缺失），行尾补 NaN。
+    并集日历上别的 symbol 有、自己没有的日期（停牌 / 上市较晚）不再是行中间的 NaN 空洞，
+    滚动窗口、EMA、滞后收益都按这个 symbol 自己的交易日计算。
+
+    返回 (紧凑 panel, rows, cols, pos)：紧凑矩阵的 [rows, pos] 对应原矩阵的 [rows, cols]
+    """
+    valid = ~np.isnan(panel["close"])
+    rows, cols = np.nonzero(valid)
+    pos = (np.cumsum(valid, axis=1) - 1)[rows, cols]
+    width = int(valid.sum(axis=1).max()) if valid.size else 0
+    compact = {}
+    for f, values in panel.items():
+        compact[f] = np.full((valid.shape[0], width), np.nan)
+        compact[f][rows, pos] = values[rows, cols]
+    return compact, rows, cols, pos
+
+
+def panel_features(
+    panel: Mapping[str, np.ndarray],
+    *,
+    out: np.ndarray | None = None,
+    dtype=np.float32,
+) -> np.ndarray:
+    """
+    同 compute_features，但每个 symbol 按自己的交易日计算（见 compact_panel）：
+    结果与单独计算这个 symbol 相同，不受同一批里其他 symbol 的日期影响；它没有 K 线的日期为 NaN
+    """
+    S, T = panel["close"].shape
+    if out is None:
+        out = np.empty((S, T, len(FEATURES)), dtype=dtype)
+    compact, rows, cols, pos = compact_panel(panel)
+    feats = compute_features(compact["close"], compact["high"], compact["low"], compact["volume"], dtype=np.float64)
+    out[:] = np.nan
+    out[rows, cols] = feats[rows, pos]
+    return out
+
+
+def features_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    单个 symbol 的便捷版本：输入 provider 日线，返回以 date 为索引、FEATURES 为列的 DataFrame
+    """
+    feats = compute_features(
+        df["close"].to_numpy(dtype=np.float64),
+        df["high"].to_numpy(dtype=np.float64),
+        df["low"].to_numpy(dtype=np.float64),
+        df["volume"].to_numpy(dtype=np.float64),
+        dtype=np.float64,
+    )[0]
+    return pd.DataFrame(feats, index=pd.Index(df["date"], name="date"), columns=list(FEATURES))
@@ -0,0 +1,345 @@
+"""
+全市场特征张量：按 (date, symbol, feature) 落盘的 float32 内存映射文件 + index.json 索引。
+
+- 按日期为主序存放：每天追加一个 (capacity, F) 的截面，就是在文件末尾写一段，
+  同一天全部 symbol 的截面是连续内存（选股 / 批量推理），单个 symbol 的历史是跨步视图（训练）
+- symbol 维预留 capacity 个槽位，新上市的股票直接占用空槽；槽位用完才整体重写一次
+- 读者用 np.memmap(mode='r') 打开，不把整个张量读进内存；
+  index.json 通过临时文件 + os.replace 更新，文件里超出索引长度的尾部数据对读者不可见
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Callable, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.features.kernels import FEATURES, align_frames, panel_features
+from common.ohlcv_store import COLUMNS
+
+FetchFn = Callable[[str, date, date, str], pd.DataFrame]
+
+DTYPE = np.dtype("<f4")
+INDEX_VERSION = 1
+
+# 增量更新时向前取的交易日数：滚动窗口最长 20，
+# EMA 的起点误差按 (1 - alpha)^WARMUP 衰减（最慢的 alpha=1/14 约 1e-8），低于 float32 精度
+WARMUP = 250
+
+# 全量构建时每批计算的 symbol 数，控制中间数组的内存
+BLOCK = 512
+
+# 用于判断历史是否被复权改写的特征（纯滚动均值，与起点无关，增量与全量结果一致）
+_CHECK = [FEATURES.index(name) for name in ("ma5", "ma10", "ma20")]
+
+
+def _capacity_for(n: int) -> int:
+    return max(64, int(n * 1.1) + 1)
+
+
+def _to_date(d: np.datetime64) -> date:
+    return pd.Timestamp(d).date()
+
+
+def _trading_days(frames: dict[str, pd.DataFrame]) -> np.ndarray:
+    """
+    所有 symbol 日期的并集，作为张量的日期轴
+    """
+    days = [pd.to_datetime(f["date"]).to_numpy().astype("datetime64[D]") for f in frames.values() if len(f)]
+    if not days:
+        return np.array([], dtype="datetime64[D]")
+    return np.unique(np.concatenate(days))
+
+
+class FeatureTensor:
+    """
+    只读视图：训练 / 选股 / 服务进程都可以直接打开，零拷贝读取
+    """
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+        self._index_mtime = None
+        self._load()
+
+    @classmethod
+    def open(cls, root: str | os.PathLike) -> "FeatureTensor":
+        return cls(root)
+
+    def _load(self) -> None:
+        index_path = self.root / "index.json"
+        stat = index_path.stat()
+        meta = json.loads(index_path.read_text())
+        if meta.get("version") != INDEX_VERSION or tuple(meta["features"]) != FEATURES:
+            raise ValueError(f"incompatible feature tensor at {self.root}")
+
+        self.adjust: str = meta["adjust"]
+        self.capacity: int = meta["capacity"]
+        self.symbols: list[str] = meta["symbols"]
+        self.dates = np.array(meta["dates"], dtype="datetime64[D]")
+        self.features: tuple[str, ...] = FEATURES
+        self._symbol_pos = {s: i for i, s in enumerate(self.symbols)}
+
+        shape = (len(self.dates), self.capacity, len(FEATURES))
+        if len(self.dates):
+            data = np.memmap(self.root / "tensor.f32", dtype=DTYPE, mode="r", shape=shape)
+        else:
+            data = np.empty(shape, dtype=DTYPE)
+        self.values = data[:, : len(self.symbols), :]
+        self._index_mtime = stat.st_mtime_ns
+
+    def refresh(self) -> bool:
+        """
+        索引有更新（追加了新交易日 / 新 symbol）就重新映射，返回是否有变化
+        """
+        try:
+            mtime = (self.root / "index.json").stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._index_mtime:
+            return False
+        self._load()
+        return True
+
+    # ---------- 查询 ----------
+
+    def symbol_pos(self, symbol: str) -> int:
+        try:
+            return self._symbol_pos[symbol]
+        except KeyError:
+            raise KeyError(f"symbol not in feature tensor: {symbol}") from None
+
+    def date_range(self, start: date | None = None, end: date | None = None) -> slice:
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(start, "D"), side="left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, np.datetime64(end, "D"), side="right"))
+        return slice(lo, hi)
+
+    def history(self, symbol: str, start: date | None = None, end: date | None = None) -> np.ndarray:
+        """
+        单个 symbol 的 (T, F) 视图（跨步，不复制）
+        """
+        return self.values[self.date_range(start, end), self.symbol_pos(symbol), :]
+
+    def cross_section(self, day: date) -> np.ndarray:
+        """
+        某个交易日全部 symbol 的 (S, F) 视图（连续内存）
+        """
+        pos = int(np.searchsorted(self.dates, np.datetime64(day, "D")))
+        if pos >= len(self.dates) or self.dates[pos] != np.datetime64(day, "D"):
+            raise KeyError(f"date not in feature tensor: {day}")
+        return self.values[pos]
+
+    def frame(self, symbol: str, start: date | None = None, end: date | None = None) -> pd.DataFrame:
+        rows = self.date_range(start, end)
+        return pd.DataFrame(
+            np.asarray(self.values[rows, self.symbol_pos(symbol), :]),
+            index=pd.Index(self.dates[rows], name="date"),
+            columns=list(FEATURES),
+        )
+
+
+class FeatureTensorBuilder:
+    """
+    构建 / 增量更新特征张量。K 线来自 provider（已收盘的日线走本地 OhlcvStore），
+    特征由 kernels.panel_features 批量计算（每个 symbol 按自己的交易日，停牌日留 NaN）。
+
+    - build：全量构建（覆盖旧张量）
+    - update：只追加新交易日的截面；新 symbol 补齐全部历史；
+      历史被复权改写的 symbol 整列重算
+    - 单个 symbol 拉取失败（404 / 502 / 503 等）不影响其余 symbol：它的格子留 NaN
+      （下次 update 与已存的最后一天对不上，会整列重算），失败的新 symbol 不加入张量；
+      最近一次 build / update 的失败记在 failed（symbol -> 错误）
+    """
+
+    def __init__(
+        self,
+        root: str | os.PathLike,
+        fetch: FetchFn,
+        *,
+        adjust: str = "qfq",
+        max_workers: int = 8,
+    ):
+        self.root = Path(root)
+        self._fetch = fetch
+        self.adjust = adjust
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self.failed: dict[str, str] = {}
+
+    # ---------- 文件读写 ----------
+
+    @property
+    def _data_path(self) -> Path:
+        return self.root / "tensor.f32"
+
+    def exists(self) -> bool:
+        return (self.root / "index.json").exists()
+
+    def _write_index(self, symbols: Sequence[str], dates: np.ndarray, capacity: int) -> None:
+        meta = {
+            "version": INDEX_VERSION,
+            "adjust": self.adjust,
+            "features": list(FEATURES),
+            "capacity": capacity,
+            "symbols": list(symbols),
+            "dates": [str(d) for d in np.asarray(dates, dtype="datetime64[D]")],
+        }
+        tmp = self.root / f"index.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self.root / "index.json")
+
+    def _fetch_one(self, symbol: str, start: date, end: date) -> tuple[pd.DataFrame, str | None]:
+        try:
+            return self._fetch(symbol, start, end, self.adjust), None
+        except Exception as e:
+            return pd.DataFrame(columns=COLUMNS), f"{type(e).__name__}: {getattr(e, 'detail', e)}"
+
+    def _fetch_all(
+        self, symbols: Iterable[str], start: date, end: date
+    ) -> tuple[dict[str, pd.DataFrame], dict[str, str]]:
+        """
+        返回 (symbol -> 日线, symbol -> 错误)；失败的 symbol 对应空表
+        """
+        symbols = list(symbols)
+        frames, failed = {}, {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for symbol, (df, err) in zip(symbols, pool.map(lambda s: self._fetch_one(s, start, end), symbols)):
+                frames[symbol] = df
+                if err is not None:
+                    failed[symbol] = err
+        return frames, failed
+
+    def _compute(self, frames: dict[str, pd.DataFrame], dates: np.ndarray) -> np.ndarray:
+        """
+        (S, T, F) float32，按 BLOCK 分批计算
+        """
+        symbols = list(frames)
+        out = np.empty((len(symbols), len(dates), len(FEATURES)), dtype=DTYPE)
+        for lo in range(0, len(symbols), BLOCK):
+            block = {s: frames[s] for s in symbols[lo: lo + BLOCK]}
+            _, _, panel = align_frames(block, dates)
+            panel_features(panel, out=out[lo: lo + len(block)])
+        return out
+
+    # ---------- 全量构建 ----------
+
+    def build(self, symbols: Sequence[str], start: date, end: date) -> FeatureTensor:
+        with self._lock:
+            symbols = list(dict.fromkeys(symbols))
+            frames, self.failed = self._fetch_all(symbols, start, end)
+            dates = _trading_days(frames)
+            if not len(dates):
+                failed = ", ".join(f"{s} ({err})" for s, err in self.failed.items()) or "none"
+                raise RuntimeError(f"no bars for any of {len(symbols)} symbols in [{start}, {end}]; failed: {failed}")
+            feats = self._compute(frames, dates)
+
+            capacity = _capacity_for(len(symbols))
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.root / f"tensor.{os.getpid()}.{threading.get_ident()}.tmp"
+            data = np.memmap(tmp, dtype=DTYPE, mode="w+", shape=(len(dates), capacity, len(FEATURES)))
+            data[:] = np.nan
+            data[:, : len(symbols), :] = feats.transpose(1, 0, 2)
+            data.flush()
+            del data
+            os.replace(tmp, self._data_path)
+            self._write_index(symbols, dates, capacity)
+        return FeatureTensor(self.root)
+
+    # ---------- 增量更新 ----------
+
+    def update(self, end: date, symbols: Sequence[str] | None = None) -> FeatureTensor:
+        """
+        追加 (最后一个交易日, end] 的截面；symbols 里不在张量中的股票补齐全部历史
+        """
+        with self._lock:
+            current = FeatureTensor(self.root)
+            old_symbols = list(current.symbols)
+            old_dates = current.dates
+            T, S, F = len(old_dates), len(old_symbols), len(FEATURES)
+            capacity = current.capacity
+            added = [s for s in dict.fromkeys(symbols or ()) if s not in current._symbol_pos]
+            del current
+
+            if T == 0:
+                raise ValueError("feature tensor is empty, run build() first")
+
+            # 1) 现有 symbol：只取最近 WARMUP 个交易日 + 新日期
+            w = min(T, WARMUP)
+            tail_start = _to_date(old_dates[T - w])
+            tail, tail_failed = self._fetch_all(old_symbols, tail_start, end)
+            new_dates = _trading_days(tail)
+            new_dates = new_dates[new_dates > old_dates[-1]]
+            calendar = np.concatenate([old_dates[T - w:], new_dates])
+            tail_feats = self._compute(tail, calendar)
+
+            # 2) 与已存的最后一天对比，历史被改写（复权）的 symbol 整列重算
+            data = np.memmap(self._data_path, dtype=DTYPE, mode="r+", shape=(T, capacity, F))
+            stored = np.asarray(data[T - 1, :S][:, _CHECK])
+            fresh = tail_feats[:, w - 1][:, _CHECK]
+            same = np.isclose(stored, fresh, rtol=1e-5, atol=0, equal_nan=True).all(axis=1)
+            # 这次没拉到的 symbol 不算被改写：保留已存的历史，新日期留 NaN
+            rewritten = [old_symbols[i] for i in np.flatnonzero(~same) if old_symbols[i] not in tail_failed]
+
+            # 3) 需要完整历史的 symbol：新上市 + 被改写
+            full_symbols = rewritten + added
+            full_feats, full_failed = None, {}
+            if full_symbols:
+                full, full_failed = self._fetch_all(full_symbols, _to_date(old_dates[0]), end)
+                full_feats = self._compute(full, np.concatenate([old_dates, new_dates]))
+            self.failed = {**tail_failed, **full_failed}
+            # 补历史失败：新 symbol 这次不加入（下次 update 再试）；被改写的保留旧历史，新日期留 NaN
+            full_rows = {s: j for j, s in enumerate(full_symbols) if s not in full_failed}
+            added = [s for s in added if s in full_rows]
+
+            new_symbols = old_symbols + added
+            if len(new_symbols) > capacity:
+                del data
+                capacity = self._grow(T, capacity, _capacity_for(len(new_symbols)))
+                data = np.memmap(self._data_path, dtype=DTYPE, mode="r+", shape=(T, capacity, F))
+
+            # 历史部分：就地改写对应的 symbol 列
+            pos = {s: i for i, s in enumerate(new_symbols)}
+            for sym, j in full_rows.items():
+                data[:, pos[sym], :] = full_feats[j, :T]
+            data.flush()
+            del data
+
+            # 新交易日的截面：追加到文件末尾
+            if len(new_dates):
+                block = np.full((len(new_dates), capacity, F), np.nan, dtype=DTYPE)
+                block[:, :S, :] = tail_feats[:, w:].transpose(1, 0, 2)
+                for sym, j in full_rows.items():
+                    block[:, pos[sym], :] = full_feats[j, T:]
+                for sym in full_failed:
+                    if sym in pos:
+                        block[:, pos[sym], :] = np.nan
+                with open(self._data_path, "r+b") as fh:
+                    # 上次写了数据但没来得及更新索引时，先截掉尾部
+                    fh.truncate(T * capacity * F * DTYPE.itemsize)
+                    fh.seek(0, os.SEEK_END)
+                    fh.write(block.tobytes())
+                    fh.flush()
+                    os.fsync(fh.fileno())
+
+            self._write_index(new_symbols, np.concatenate([old_dates, new_dates]), capacity)
+        return FeatureTensor(self.root)
+
+    def _grow(self, T: int, capacity: int, new_capacity: int) -> int:
+        """
+        symbol 槽位用完：按新容量整体重写一次（写临时文件再替换，已打开的读者仍然看到旧文件）
+        """
+        F = len(FEATURES)
+        old = np.memmap(self._data_path, dtype=DTYPE, mode="r", shape=(T, capacity, F))
+        tmp = self.root / f"tensor.{os.getpid()}.{threading.get_ident()}.tmp"
+        data = np.memmap(tmp, dtype=DTYPE, mode="w+", shape=(T, new_capacity, F))
+        data[:] = np.nan
+        data[:, :capacity, :] = old
+        data.flush()
+        del data, old
+        os.replace(tmp, self._data_path)
+        return new_capacity
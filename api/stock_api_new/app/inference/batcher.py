@@ -0,0 +1,106 @@
+"""
+微批：并发到达的单条请求攒成一批，一次调用处理。
+
+- submit 立即返回 Future；后台线程拿到第一条后最多再等 max_wait_ms，或攒满 max_batch 条就处理
+- 处理函数接收一批 item，按顺序返回同样长度的结果列表；抛异常时整批的 Future 都收到这个异常
+- 空闲时线程阻塞在队列上，不占 CPU；低负载下单条请求最多多等 max_wait_ms
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Sequence
+
+from common import metrics
+
+BATCH_SIZE = metrics.histogram(
+    "micro_batch_size", "Items scored per micro-batch", ["batcher"], buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        fn: Callable[[Sequence[Any]], Sequence[Any]],
+        *,
+        max_batch: int = 64,
+        max_wait_ms: float = 5.0,
+        name: str = "micro-batch",
+    ):
+        self._fn = fn
+        self.max_batch = max(int(max_batch), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000
+        self.name = name
+
+        self._queue: queue.SimpleQueue[tuple[Any, Future]] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+        self.items = 0
+        self.batches = 0
+        self.failed = 0
+        self.max_seen = 0
+
+    def submit(self, item: Any) -> Future:
+        fut: Future = Future()
+        self._queue.put((item, fut))
+        self._ensure_worker()
+        return fut
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _collect(self) -> list[tuple[Any, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            # 已被调用方取消的不再处理
+            batch = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            BATCH_SIZE.observe(len(batch), batcher=self.name)
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.max_seen = max(self.max_seen, len(batch))
+            try:
+                results = self._fn([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"batch fn returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), result in zip(batch, results):
+                fut.set_result(result)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "failed": self.failed,
+                "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "max_batch_seen": self.max_seen,
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+            }
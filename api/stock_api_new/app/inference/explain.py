@@ -0,0 +1,221 @@
+"""
+SHAP 解释：每个交易日收盘后对整个股票池批量计算一次并落盘，接口只读。
+
+    cd api/stock_api_new
+    # 特征取自全市场特征张量（app.features.build_tensor），默认算张量里最后一个交易日
+    python -m app.inference.explain
+    # 补算最近 20 个交易日
+    python -m app.inference.explain --days 20
+
+- 每个模型版本的解释器只建一次（LightGBM 自带 TreeSHAP，其余树模型用 shap.TreeExplainer），
+  一个交易日的整个截面每个模型一次调用
+- 存储：EXPLAIN_DIR/<模型版本>/<YYYYMMDD>/<target>.npy，形状 (S, F + 1) float32，
+  行与同目录 symbols.json 的顺序一致，最后一列是基准值；当天特征不全的 symbol 整行为 NaN
+- 查询 (模型版本, symbol, 日期) 是一次字典查找 + mmap 上的一行读取，不重新计算
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.inference.registry import ModelRegistry
+
+DTYPE = np.dtype("<f4")
+
+
+def _day_dir(day: date) -> str:
+    return day.strftime("%Y%m%d")
+
+
+class _Day:
+    """
+    一个 (模型版本, 交易日) 的全部解释：symbol -> 行号，每个目标一个 mmap 数组
+    """
+
+    def __init__(self, path: Path):
+        meta = json.loads((path / "symbols.json").read_text(encoding="utf-8"))
+        self.rows = {s: i for i, s in enumerate(meta["symbols"])}
+        self.features: dict[str, list[str]] = meta["features"]
+        self.values = {t: np.load(path / f"{t}.npy", mmap_mode="r") for t in self.features}
+
+
+class ExplanationStore:
+    def __init__(self, root: str | os.PathLike, *, max_open_days: int = 32):
+        self.root = Path(root)
+        self.max_open_days = max(1, max_open_days)
+        self._lock = threading.Lock()
+        self._open: OrderedDict[tuple[str, date], _Day] = OrderedDict()
+        # 模型版本 -> (目录 mtime, 最后一天)；新写入一天会改变目录 mtime
+        self._latest: dict[str, tuple[int, date | None]] = {}
+        self.lookups = 0
+        self.misses = 0
+
+    # ---------- 写 ----------
+
+    def write_day(
+        self,
+        version: str,
+        day: date,
+        symbols: Sequence[str],
+        features: dict[str, Sequence[str]],
+        values: dict[str, np.ndarray],
+    ) -> None:
+        """
+        values：目标 -> (S, F + 1)。写临时目录再替换，读者不会看到写了一半的数据
+        """
+        final = self.root / version / _day_dir(day)
+        tmp = final.with_name(f"{final.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.mkdir(parents=True, exist_ok=True)
+        for target, arr in values.items():
+            np.save(tmp / f"{target}.npy", np.asarray(arr, dtype=DTYPE))
+        meta = {"symbols": list(symbols), "features": {t: list(f) for t, f in features.items()}}
+        (tmp / "symbols.json").write_text(json.dumps(meta), encoding="utf-8")
+        with self._lock:
+            self._open.pop((version, day), None)
+            if final.exists():
+                shutil.rmtree(final)
+            os.replace(tmp, final)
+
+    # ---------- 读 ----------
+
+    def days(self, version: str) -> list[date]:
+        base = self.root / version
+        if not base.is_dir():
+            return []
+        out = []
+        for p in base.iterdir():
+            if p.is_dir() and len(p.name) == 8 and p.name.isdigit():
+                out.append(date(int(p.name[:4]), int(p.name[4:6]), int(p.name[6:])))
+        return sorted(out)
+
+    def latest(self, version: str) -> date | None:
+        try:
+            mtime = (self.root / version).stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._latest.get(version)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        days = self.days(version)
+        latest = days[-1] if days else None
+        self._latest[version] = (mtime, latest)
+        return latest
+
+    def _day(self, version: str, day: date) -> _Day | None:
+        key = (version, day)
+        with self._lock:
+            opened = self._open.get(key)
+            if opened is not None:
+                self._open.move_to_end(key)
+                return opened
+        path = self.root / version / _day_dir(day)
+        if not (path / "symbols.json").is_file():
+            return None
+        opened = _Day(path)
+        with self._lock:
+            self._open[key] = opened
+            while len(self._open) > self.max_open_days:
+                self._open.popitem(last=False)
+        return opened
+
+    def lookup(self, version: str, symbol: str, day: date) -> dict[str, dict[str, Any]] | None:
+        """
+        目标 -> {"base_value": 基准值, "contributions": {特征: SHAP 值}}（按绝对值从大到小）；
+        没有这一天 / 这个 symbol 的解释时返回 None
+        """
+        with self._lock:
+            self.lookups += 1
+        opened = self._day(version, day)
+        row = None if opened is None else opened.rows.get(symbol)
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        out = {}
+        for target, names in opened.features.items():
+            values = np.asarray(opened.values[target][row], dtype=np.float64)
+            if np.isnan(values).all():
+                continue
+            contributions = sorted(zip(names, values[:-1].tolist()), key=lambda kv: -abs(kv[1]))
+            out[target] = {"base_value": float(values[-1]), "contributions": dict(contributions)}
+        if not out:
+            with self._lock:
+                self.misses += 1
+            return None
+        return out
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"open_days": len(self._open), "lookups": self.lookups, "misses": self.misses}
+
+
+def explain_day(
+    registry: ModelRegistry,
+    store: ExplanationStore,
+    day: date,
+    symbols: Sequence[str],
+    x: np.ndarray,
+) -> int:
+    """
+    x：当天全部 symbol 的特征截面 (S, len(FEATURES))。
+    特征不全的行不进模型，结果里为 NaN。返回算了多少个 symbol
+    """
+    models = [m for m in registry.models.values() if m.contrib is not None]
+    if not models:
+        return 0
+    values, features = {}, {}
+    scored = 0
+    for m in models:
+        xm = np.asarray(x[:, m.columns], dtype=np.float64)
+        ok = np.isfinite(xm).all(axis=1)
+        out = np.full((len(symbols), len(m.features) + 1), np.nan, dtype=DTYPE)
+        if ok.any():
+            out[ok] = m.contrib(xm[ok])
+        values[m.name] = out
+        features[m.name] = m.features
+        scored = max(scored, int(ok.sum()))
+    store.write_day(registry.version, day, symbols, features, values)
+    return scored
+
+
+def main() -> None:
+    from app.features.tensor import FeatureTensor
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tensor-dir", default=settings.feature_tensor_dir)
+    parser.add_argument("--model-dir", default=settings.model_dir)
+    parser.add_argument("--out", default=settings.explain_dir)
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="只算这一天")
+    parser.add_argument("--days", type=int, default=1, help="不给 --date 时，算张量里最后几个交易日")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.model_dir)
+    registry.load()
+    if not registry.models:
+        parser.error(f"no models loaded from {args.model_dir}: {registry.errors}")
+    tensor = FeatureTensor.open(args.tensor_dir)
+    if tensor.adjust != registry.adjust:
+        parser.error(f"feature tensor is {tensor.adjust!r} but models expect {registry.adjust!r}")
+    days = [args.date] if args.date else [d.astype(object) for d in tensor.dates[-args.days:]]
+
+    store = ExplanationStore(args.out)
+    for day in days:
+        t0 = time.perf_counter()
+        n = explain_day(registry, store, day, tensor.symbols, np.asarray(tensor.cross_section(day)))
+        print(f"{registry.version} {day}: {n}/{len(tensor.symbols)} symbols in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
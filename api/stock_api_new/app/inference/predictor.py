@@ -0,0 +1,126 @@
+"""
+单个 symbol 的预测：取缓存的日线 → 进微批 → 整批一起算特征、每个模型一次 predict_proba。
+
+- 特征按批计算：同一批的 symbol 对齐成 (S, T) 矩阵走 panel_features，EMA 的时间循环整批只跑一遍；
+  每个 symbol 按自己的交易日计算（结果与单独计算相同，不取决于和谁分在一批），
+  取它自己最后一根 K 线那天的特征行
+- 预测结果按 symbol 缓存，带着 (最后一根 K 线的日期, 日线版本, 模型版本)：
+  新的 K 线到来（或盘中当日 K 线变化、模型重新加载）之前，重复请求直接返回缓存
+"""
+from __future__ import annotations
+
+import math
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Sequence
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+
+from common import timing
+from common.cache import TTLCache
+from app.features.kernels import align_frames, panel_features
+from app.inference.batcher import MicroBatcher
+from app.inference.registry import ModelRegistry
+
+# symbol -> (日线, 日线版本)
+LoadFn = Callable[[str], tuple[pd.DataFrame, str]]
+
+
+@dataclass(frozen=True)
+class Prediction:
+    as_of: date
+    bars: int
+    scores: dict[str, float | list[float] | None]
+
+
+def _jsonable(value: Any) -> float | list[float] | None:
+    if np.ndim(value):
+        return [_jsonable(v) for v in value]
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+class Predictor:
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        load: LoadFn,
+        *,
+        max_batch: int = 64,
+        max_wait_ms: float = 5.0,
+        cache_entries: int = 10_000,
+        timeout_seconds: float = 10.0,
+    ):
+        self.registry = registry
+        self._load = load
+        self.timeout_seconds = timeout_seconds
+        self._batcher = MicroBatcher(self._score, max_batch=max_batch, max_wait_ms=max_wait_ms, name="predict")
+        self._cache = TTLCache(ttl_seconds=math.inf, max_entries=cache_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def predict(self, stock_code: str) -> tuple[Prediction, str]:
+        """
+        返回 (预测, "HIT" | "MISS")；没有可用模型时 503
+        """
+        if not self.registry.models:
+            raise HTTPException(status_code=503, detail="no prediction models loaded")
+        df, version = self._load(stock_code)
+        stamp = (pd.Timestamp(df["date"].iloc[-1]).date(), version, self.registry.version)
+
+        cached = self._cache.get(stock_code)
+        if cached is not None and cached[0] == stamp:
+            with self._lock:
+                self.hits += 1
+            return cached[1], "HIT"
+        with self._lock:
+            self.misses += 1
+
+        with timing.stage("predict"):
+            fut = self._batcher.submit((stock_code, df))
+            try:
+                prediction = fut.result(timeout=self.timeout_seconds)
+            except TimeoutError:
+                fut.cancel()
+                raise HTTPException(status_code=503, detail="prediction timed out")
+        self._cache.set(stock_code, (stamp, prediction))
+        return prediction, "MISS"
+
+    def _score(self, items: Sequence[tuple[str, pd.DataFrame]]) -> list[Prediction]:
+        models = list(self.registry.models.values())
+        # 同一批里重复的 symbol 只算一次
+        unique = dict(items)
+        with timing.stage("features"):
+            keys, dates, panel = align_frames(unique)
+            feats = panel_features(panel, dtype=np.float64)
+            last_days = [pd.Timestamp(unique[k]["date"].iloc[-1]).to_datetime64().astype("datetime64[D]") for k in keys]
+            x = feats[np.arange(len(keys)), np.searchsorted(dates, last_days)]
+
+        with timing.stage("model"):
+            scores = {m.name: m.predict(x[:, m.columns]) for m in models}
+
+        row = {k: i for i, k in enumerate(keys)}
+        out = []
+        for code, _ in items:
+            i = row[code]
+            out.append(
+                Prediction(
+                    as_of=pd.Timestamp(last_days[i]).date(),
+                    bars=len(unique[code]),
+                    scores={name: _jsonable(values[i]) for name, values in scores.items()},
+                )
+            )
+        return out
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "models": self.registry.stats(),
+            "cache": {"entries": len(self._cache), "hits": hits, "misses": misses},
+            "batcher": self._batcher.stats(),
+        }
@@ -0,0 +1,193 @@
+"""
+推理用的模型：进程启动时从 MODEL_DIR 加载一次，之后只读。
+
+目录里每个目标一个文件，文件名（不含后缀）就是目标名，例如 Target_Direction：
+- `<target>.txt`：LightGBM Booster 的文本模型（笔记本里 `clf.booster_.save_model(path)`），需要 lightgbm
+- `<target>.pkl`：pickle 的估计器（有 predict_proba 即可，如 LGBMClassifier）。
+  pickle 可以执行任意代码，只加载自己训练、部署的文件
+- app.training.train 产出的版本目录：MODEL_DIR/CURRENT 里写着当前版本，加载 MODEL_DIR/<version>/
+- 可选的 manifest.json：{"version": "...", "adjust": "qfq", "features": [...]}；
+  模型本身带特征名（Booster.feature_name() / feature_name_ / feature_names_in_）时以模型为准
+
+模型用到的特征必须都在 app.features.kernels.FEATURES 里（testlogic1 的特征都在），
+否则这个模型不加载，原因记在 errors 里（/stats 可见）。
+"""
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from app.features.kernels import FEATURE_INDEX, NOTEBOOK_FEATURES
+
+
+def _optional(name: str):
+    """
+    lightgbm / shap 都是可选依赖，并且导入很慢：只在真正加载到需要它们的模型时才导入
+    （没有 lightgbm 时只能加载 pickle 的估计器；LightGBM 模型用自带的 TreeSHAP，不需要 shap）
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+MODEL_SUFFIXES = (".txt", ".pkl")
+
+
+@dataclass(frozen=True)
+class Model:
+    name: str
+    features: tuple[str, ...]
+    columns: np.ndarray       # features 在 FEATURES 里的下标，按模型的列顺序
+    predict: Callable[[np.ndarray], np.ndarray]   # (n, len(features)) -> 正类概率 (n,)，多分类为 (n, k)
+    # (n, len(features)) -> SHAP 值 (n, len(features) + 1)，最后一列是基准值；
+    # 二分类在 log-odds 空间：一行求和 = 正类概率的 logit。不支持时为 None
+    contrib: Callable[[np.ndarray], np.ndarray] | None = None
+
+    @classmethod
+    def from_estimator(cls, name: str, est: Any, features: tuple[str, ...]) -> "Model":
+        def predict(x: np.ndarray) -> np.ndarray:
+            proba = np.asarray(est.predict_proba(x), dtype=np.float64)
+            return proba[:, 1] if proba.ndim == 2 and proba.shape[1] == 2 else proba
+
+        return cls(name, features, _columns(features), predict, _estimator_contrib(est))
+
+    @classmethod
+    def from_booster(cls, name: str, booster: Any, features: tuple[str, ...]) -> "Model":
+        # 二分类 Booster.predict 返回的就是正类概率
+        return cls(
+            name,
+            features,
+            _columns(features),
+            lambda x: np.asarray(booster.predict(x), dtype=np.float64),
+            lambda x: np.asarray(booster.predict(x, pred_contrib=True), dtype=np.float64),
+        )
+
+
+def _estimator_contrib(est: Any) -> Callable[[np.ndarray], np.ndarray] | None:
+    """
+    LGBMClassifier 直接用它的 Booster 算 TreeSHAP；其他树模型有 shap 时建一个 TreeExplainer
+    （每个模型、也就是每个模型版本只建一次）
+    """
+    booster = getattr(est, "booster_", None)
+    if booster is not None and hasattr(booster, "predict"):
+        return lambda x: np.asarray(booster.predict(x, pred_contrib=True), dtype=np.float64)
+    shap = _optional("shap")
+    if shap is None:
+        return None
+    try:
+        explainer = shap.TreeExplainer(est)
+    except Exception:
+        return None
+
+    def contrib(x: np.ndarray) -> np.ndarray:
+        values = explainer.shap_values(x)
+        base = np.asarray(explainer.expected_value, dtype=np.float64).reshape(-1)
+        # 二分类：旧版 shap 返回每类一个数组，新版返回 (n, F, 2)；取正类
+        if isinstance(values, list):
+            values = values[-1]
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 3:
+            values = values[:, :, -1]
+        return np.column_stack([values, np.full(len(values), base[-1])])
+
+    return contrib
+
+
+def _columns(features: tuple[str, ...]) -> np.ndarray:
+    missing = [f for f in features if f not in FEATURE_INDEX]
+    if missing:
+        raise ValueError(f"unsupported features: {', '.join(missing)}")
+    return np.array([FEATURE_INDEX[f] for f in features], dtype=np.intp)
+
+
+def _feature_names(obj: Any, fallback: tuple[str, ...]) -> tuple[str, ...]:
+    names = getattr(obj, "feature_name_", None)
+    if names is None:
+        names = getattr(obj, "feature_names_in_", None)
+    if names is None and callable(getattr(obj, "feature_name", None)):
+        names = obj.feature_name()
+    # 用 numpy 数组训练的模型只有 Column_0 ... 这样的占位名，按 fallback 的顺序
+    if names is None or not len(names) or all(str(n).startswith("Column_") for n in names):
+        return fallback
+    return tuple(str(n) for n in names)
+
+
+class ModelRegistry:
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.path = self.root
+        self._lock = threading.Lock()
+        self.models: dict[str, Model] = {}
+        self.errors: dict[str, str] = {}
+        self.version = ""
+        self.adjust = "qfq"
+        self.loaded_at: float | None = None
+
+    def _resolve(self) -> Path:
+        current = self.root / "CURRENT"
+        if current.is_file():
+            return self.root / current.read_text(encoding="utf-8").strip()
+        return self.root
+
+    def load(self) -> None:
+        path = self._resolve()
+        manifest: dict[str, Any] = {}
+        manifest_path = path / "manifest.json"
+        if manifest_path.is_file():
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        # 模型和 manifest 都没给特征名时按笔记本的特征顺序
+        default_features = tuple(manifest.get("features") or NOTEBOOK_FEATURES)
+
+        models: dict[str, Model] = {}
+        errors: dict[str, str] = {}
+        digest = hashlib.blake2b(digest_size=8)
+        paths = sorted(p for p in path.glob("*") if p.suffix in MODEL_SUFFIXES) if path.is_dir() else []
+        for file in paths:
+            stat = file.stat()
+            digest.update(f"{file.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+            try:
+                models[file.stem] = self._load_file(file, default_features)
+            except Exception as e:
+                errors[file.stem] = f"{type(e).__name__}: {e}"
+
+        with self._lock:
+            self.path = path
+            self.models = models
+            self.errors = errors
+            self.version = str(manifest.get("version") or digest.hexdigest())
+            self.adjust = str(manifest.get("adjust", "qfq"))
+            self.loaded_at = time.time()
+
+    @staticmethod
+    def _load_file(path: Path, default_features: tuple[str, ...]) -> Model:
+        if path.suffix == ".txt":
+            lgb = _optional("lightgbm")
+            if lgb is None:
+                raise RuntimeError("lightgbm is not installed")
+            booster = lgb.Booster(model_file=str(path))
+            return Model.from_booster(path.stem, booster, _feature_names(booster, default_features))
+        with path.open("rb") as f:
+            est = pickle.load(f)
+        if not hasattr(est, "predict_proba"):
+            raise TypeError(f"{type(est).__name__} has no predict_proba")
+        return Model.from_estimator(path.stem, est, _feature_names(est, default_features))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "version": self.version,
+                "adjust": self.adjust,
+                "loaded": sorted(self.models),
+                "errors": dict(self.errors),
+                "loaded_at": self.loaded_at,
+            }
@@ -1,21 +1,43 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI 
 from fastapi.exceptions import RequestValidationError
 from fastapi import HTTPException
 
+from app import providers
 from app.core.config import settings 
 from app.api.v1.router import api_router 
 from app.core.trace import TraceIdMiddleware 
+from app.api.metrics import router as metrics_router
+from app.api.v1.predict import load_models
 from app.core.errors import (
     http_exception_handler, 
     validation_exception_handler, 
     unhandled_exception_handler,
 )
+from app.core import stats
+from common import timing
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 预测模型只在启动时加载一次；上游 provider 在后台导入，不阻塞就绪
+    load_models()
+    if settings.upstream_warm_up:
+        providers.warm_up()
+    yield
+
 
-app = FastAPI(title=settings.app_name)
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
+# TimingMiddleware 在 TraceIdMiddleware 里面，才能拿到 trace id
+app.add_middleware(timing.TimingMiddleware)
 app.add_middleware(TraceIdMiddleware)
+stats.register("slow_requests", timing.slow_requests)
 
 app.include_router(api_router, prefix=settings.api_prefix)
+# Prometheus 默认抓取 /metrics，不放在 api_prefix 下
+app.include_router(metrics_router)
 
 app.add_exception_handler(HTTPException, http_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
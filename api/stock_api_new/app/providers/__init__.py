@@ -0,0 +1,88 @@
+"""
+上游数据源注册表：名字 -> "模块:属性"，第一次 get() 时才导入。
+
+akshare 连同它的依赖导入要数秒，放在模块顶层会让每次 worker 重启 / 扩容 / 跑测试都先等它，
+/health 也要等它。现在导入推迟到第一次访问上游；warm_up() 在后台线程里提前导入，
+不阻塞启动和 /health。
+"""
+from __future__ import annotations
+
+import importlib
+import threading
+import time
+from typing import Any
+
+from app.core import stats as _stats
+from app.core.config import settings
+
+_targets: dict[str, Any] = {
+    "akshare": "app.providers.akshare_provider:AkShareProvider",
+}
+_loaded: dict[str, Any] = {}
+_lock = threading.Lock()
+_timings: dict[str, dict[str, float]] = {}
+
+
+def register(name: str, target: Any) -> None:
+    """
+    target 是 "模块:属性" 字符串（懒加载）或已经导入的 provider 对象
+    """
+    with _lock:
+        _targets[name] = target
+        _loaded.pop(name, None)
+
+
+def get(name: str | None = None) -> Any:
+    name = name or settings.upstream_provider
+    provider = _loaded.get(name)
+    if provider is not None:
+        return provider
+    with _lock:
+        provider = _loaded.get(name)
+        if provider is None:
+            target = _targets.get(name)
+            if target is None:
+                raise KeyError(f"unknown upstream provider: {name}")
+            t0 = time.perf_counter()
+            if isinstance(target, str):
+                module, _, attr = target.partition(":")
+                target = getattr(importlib.import_module(module), attr)
+            provider = _loaded[name] = target
+            _timings.setdefault(name, {})["load_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+    return provider
+
+
+def warm_up(name: str | None = None) -> threading.Thread:
+    """
+    后台导入 provider 并调用它的 warm_up()（如导入 akshare）；失败只记录，第一次请求时再试
+    """
+    name = name or settings.upstream_provider
+
+    def _run() -> None:
+        t0 = time.perf_counter()
+        try:
+            provider = get(name)
+            hook = getattr(provider, "warm_up", None)
+            if hook is not None:
+                hook()
+        except Exception as e:
+            _timings.setdefault(name, {})["warm_up_error"] = f"{type(e).__name__}: {e}"
+        else:
+            _timings.setdefault(name, {})["warm_up_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+
+    thread = threading.Thread(target=_run, name=f"provider-warm-up-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def stats() -> dict[str, Any]:
+    with _lock:
+        return {
+            "default": settings.upstream_provider,
+            "registered": sorted(_targets),
+            "loaded": sorted(_loaded),
+            **{name: dict(t) for name, t in _timings.items()},
+        }
+
+
+_stats.register("providers", stats)
@@ -2,12 +2,47 @@ from __future__ import annotations
 
 from datetime import date
 import pandas as pd
-import akshare as ak
 import concurrent.futures
+import random
+import threading
 import time
 from fastapi import HTTPException
 
+from app.core import stats
+from common import timing
+from app.core.breaker import CircuitBreaker, CircuitOpenError
 from app.core.config import settings
+from common.ratelimit import AdaptiveLimiter, RateLimitTimeout
+from common.adjust import ADJUSTS, AdjustFactors, NoFactors, apply_factors, sina_symbol
+from common.ohlcv_store import COLUMNS, OhlcvStore
+from common.tape import open_upstream
+
+
+_ak = None
+_ak_lock = threading.Lock()
+
+
+def _akshare():
+    """
+    akshare 推迟到第一次访问上游时导入（或由 providers.warm_up 在后台提前导入）。
+    UPSTREAM_MODE=record / replay 时换成磁带的录制 / 回放（common.tape），接口相同
+    """
+    global _ak
+    if _ak is None:
+        with _ak_lock:
+            if _ak is None:
+                with timing.stage("import"):
+                    _ak = open_upstream(
+                        settings.upstream_mode,
+                        settings.upstream_tape_dir,
+                        latency=settings.replay_latency,
+                        latency_ms=settings.replay_latency_ms,
+                        sigma=settings.replay_latency_sigma,
+                        failure_rate=settings.replay_failure_rate,
+                        miss=settings.replay_miss,
+                        seed=settings.replay_seed,
+                    )
+    return _ak
 
 
 def _fmt(d: date) -> str:
@@ -15,82 +50,290 @@ def _fmt(d: date) -> str:
     return d.strftime("%Y%m%d")
 
 
-def run_with_timeout_and_retry(fn, *, timeout_s: float, retries: int):
+# 进程内共享、有界的上游线程池：超时后直接返回给调用方，不等待仍在运行的 akshare 调用
+_upstream_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=settings.upstream_max_workers,
+    thread_name_prefix="akshare",
+)
+
+# akshare 连续失败时熔断，直接 503，不再占用请求线程
+_breaker = CircuitBreaker(
+    failure_threshold=settings.breaker_failure_threshold,
+    reset_seconds=settings.breaker_reset_seconds,
+)
+
+# 进程内所有上游调用共用的限流器：交互请求优先于批量和后台刷新，出错 / 超时时降速
+_limiter = AdaptiveLimiter(
+    rate=settings.upstream_rate_per_second,
+    min_rate=settings.upstream_rate_min_per_second,
+    burst=settings.upstream_burst,
+    max_concurrency=settings.upstream_max_concurrency,
+)
+
+# 复权因子来自新浪，是另一个上游：单独熔断、单独限流，新浪出问题不影响日线请求
+_factor_breaker = CircuitBreaker(
+    failure_threshold=settings.breaker_failure_threshold,
+    reset_seconds=settings.breaker_reset_seconds,
+)
+_factor_limiter = AdaptiveLimiter(
+    rate=settings.upstream_rate_per_second,
+    min_rate=settings.upstream_rate_min_per_second,
+    burst=settings.upstream_burst,
+    max_concurrency=settings.upstream_max_concurrency,
+)
+
+_counters_lock = threading.Lock()
+_counters = {"calls": 0, "timeouts": 0, "errors": 0, "retries": 0, "throttled": 0, "adjust_fallbacks": 0}
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def _backoff(attempt: int) -> float:
+    # full jitter：避免大量请求在同一时刻一起重试
+    cap = min(settings.upstream_backoff_max_seconds, settings.upstream_backoff_base_seconds * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def run_with_timeout_and_retry(
+    fn,
+    *,
+    timeout_s: float,
+    retries: int,
+    breaker: CircuitBreaker = _breaker,
+    limiter: AdaptiveLimiter = _limiter,
+):
+    """
+    在共享线程池里执行 fn，每次尝试最多等待 timeout_s（含限流和排队时间）。
+    熔断打开时抛 CircuitOpenError，限流排队超时抛 RateLimitTimeout，都不会进入重试。
+    """
     last_exc = None
     for i in range(retries + 1):
+        t0 = time.monotonic()
+        try:
+            with timing.stage("rate_limit"):
+                limiter.acquire(timeout=timeout_s)
+        except RateLimitTimeout:
+            _count("throttled")
+            raise
         try:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as ex:
-                fut = ex.submit(fn)
-                return fut.result(timeout=timeout_s)
+            breaker.before_call()
+        except CircuitOpenError:
+            limiter.release()
+            # 重试过程中熔断被打开：抛出真实的上游错误
+            if last_exc is not None:
+                raise last_exc
+            raise
+        _count("calls")
+
+        fut = _upstream_pool.submit(fn)
+        # 超时后调用可能还在跑：真正结束时才归还并发名额
+        fut.add_done_callback(lambda _: limiter.release())
+        try:
+            with timing.stage("upstream"):
+                result = fut.result(timeout=max(0.0, timeout_s - (time.monotonic() - t0)))
         except concurrent.futures.TimeoutError:
+            # 还在排队的直接取消；已经在跑的无法中断，但调用方不再等它
+            fut.cancel()
+            _count("timeouts")
             last_exc = TimeoutError("upstream timeout")
         except Exception as e:
+            _count("errors")
             last_exc = e
+        else:
+            breaker.record_success()
+            limiter.record(True)
+            return result
 
-        time.sleep(0.2 * (i + 1))
+        breaker.record_failure()
+        limiter.record(False)
+        if i < retries and breaker.state != CircuitBreaker.OPEN:
+            _count("retries")
+            with timing.stage("retry_sleep"):
+                time.sleep(_backoff(i))
 
     raise last_exc
 
 
+def upstream_stats() -> dict:
+    with _counters_lock:
+        counters = dict(_counters)
+    out = {
+        **counters,
+        "pool_workers": settings.upstream_max_workers,
+        "pool_queued": _upstream_pool._work_queue.qsize(),
+        "breaker": _breaker.stats(),
+        "limiter": _limiter.stats(),
+        "factor_breaker": _factor_breaker.stats(),
+        "factor_limiter": _factor_limiter.stats(),
+    }
+    # 录制 / 回放时附上磁带的统计（调用数、未命中、注入的失败）
+    tape_stats = getattr(_ak, "stats", None)
+    if callable(tape_stats):
+        out["tape"] = tape_stats()
+    return out
+
+
+stats.register("upstream", upstream_stats)
+
+
+def _clean(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    akshare 原始表 -> date, open, high, low, close, volume；无数据时返回空表
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=COLUMNS)
+
+    # akshare 返回常见中文列名：日期/开盘/收盘/最高/最低/成交量（不同版本可能略有差异）
+    colmap_candidates = {
+        "日期": "date",
+        "开盘": "open",
+        "最高": "high",
+        "最低": "low",
+        "收盘": "close",
+        "成交量": "volume",
+    }
+
+    # 缺列时报上游错误而不是返回空表：空表会被本地存储当成「这段日期没有 K 线」
+    missing = [k for k in colmap_candidates if k not in df.columns]
+    if missing:
+        raise HTTPException(status_code=502, detail=f"upstream akshare error: missing columns {missing}")
+
+    # 只取存在的列并重命名
+    cols_present = {k: v for k, v in colmap_candidates.items() if k in df.columns}
+    df = df[list(cols_present.keys())].rename(columns=cols_present)
+
+    # 类型整理
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    for c in ["open", "high", "low", "close"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    df["volume"] = pd.to_numeric(df["volume"], errors="coerce").fillna(0).astype(int)
+
+    # 去掉无效行
+    return df.dropna(subset=["date", "open", "high", "low", "close"])
+
+
+def _call_upstream(fn, *, breaker: CircuitBreaker = _breaker, limiter: AdaptiveLimiter = _limiter):
+    """
+    限流 + 超时 + 重试 + 熔断地执行一次 akshare 调用，失败转成对应的 HTTPException
+    """
+    try:
+        return run_with_timeout_and_retry(
+            fn,
+            timeout_s=settings.upstream_timeout_seconds,
+            retries=settings.upstream_retries,
+            breaker=breaker,
+            limiter=limiter,
+        )
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="upstream akshare unavailable (circuit open)",
+            headers={"Retry-After": str(max(1, int(e.retry_after)))},
+        )
+    except RateLimitTimeout as e:
+        raise HTTPException(
+            status_code=503,
+            detail="upstream akshare busy (rate limited)",
+            headers={"Retry-After": str(max(1, int(e.retry_after)))},
+        )
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"upstream akshare error: {type(e).__name__}")
+
+
+def _fetch_upstream(stock_code: str, start: date, end: date, adjust: str) -> pd.DataFrame:
+    # 在调用线程里导入，不计入上游超时
+    ak = _akshare()
+    df = _call_upstream(
+        lambda: ak.stock_zh_a_hist(
+            symbol=stock_code,
+            period="daily",
+            start_date=_fmt(start),
+            end_date=_fmt(end),
+            adjust=adjust,
+        )
+    )
+    with timing.stage("clean"):
+        return _clean(df)
+
+
+def _fetch_factors(stock_code: str, adjust: str) -> pd.DataFrame:
+    ak = _akshare()
+
+    def fetch():
+        try:
+            return ak.stock_zh_a_daily(symbol=sina_symbol(stock_code), adjust=f"{adjust}-factor")
+        except ValueError as e:
+            # 新浪没有这个代码的因子时 akshare 抛 ValueError("sina hfq factor not available")：
+            # 当作正常答复返回，不重试，也不算熔断 / 限流的失败
+            if "factor not available" not in str(e):
+                raise
+            return None
+
+    df = _call_upstream(fetch, breaker=_factor_breaker, limiter=_factor_limiter)
+    if df is None:
+        raise NoFactors(f"no {adjust} factors for {stock_code}")
+    return df
+
+
+_store = OhlcvStore(settings.store_dir, fetch=_fetch_upstream) if settings.store_enabled else None
+
+# qfq / hfq 由不复权日线 + 复权因子在本地算出，三种 adjust 共用一份历史
+_factors = AdjustFactors(_fetch_factors)
+
+stats.register("adjust_factors", _factors.stats)
+
+
+def _read(stock_code: str, start: date, end: date, adjust: str) -> pd.DataFrame:
+    if _store is not None:
+        return _store.get(stock_code, start, end, adjust)
+    return _fetch_upstream(stock_code, start, end, adjust)
+
+
+def _read_adjusted(stock_code: str, start: date, end: date, adjust: str) -> pd.DataFrame:
+    raw = _read(stock_code, start, end, "")
+    if raw.empty:
+        return raw
+    try:
+        days, factors = _factors.get(stock_code, adjust)
+    except HTTPException:
+        # 拿不到因子（新浪接口异常 502 / 因子熔断或限流 503）：退回直接向上游要复权后的数据
+        _count("adjust_fallbacks")
+        return _read(stock_code, start, end, adjust)
+    if len(factors) == 0:
+        # 因子表为空 / 解析不出因子：同样退回，不能把不复权价当复权价返回
+        _count("adjust_fallbacks")
+        return _read(stock_code, start, end, adjust)
+    with timing.stage("adjust"):
+        return apply_factors(raw, days, factors, adjust)
+
 
 class AkShareProvider:
     """
     只负责：从 akshare 拿数据 + 转成需要的列
+    已收盘的日线走本地 OhlcvStore，只向上游拉缺的日期；qfq / hfq 由不复权日线和复权因子在本地算出
     """
 
     @staticmethod
-    def get_a_stock_daily(stock_code : str, start: date, end : date, adjust : str) -> pd.DataFrame:
+    def warm_up() -> None:
+        _akshare()
+
+    @staticmethod
+    def get_a_stock_daily(stock_code : str, start: date, end : date, adjust : str, allow_empty: bool = False) -> pd.DataFrame:
         """
         返回列：date, open, high, low, close, volume
+        allow_empty=True 时区间内无数据返回空表（用于补齐缓存缺口），否则 404
         """
-        try:
-            def _call():
-                return ak.stock_zh_a_hist(
-                    symbol=stock_code,
-                    period="daily",
-                    start_date=_fmt(start),
-                    end_date=_fmt(end),
-                    adjust=adjust,
-                )
-
-            df = run_with_timeout_and_retry(
-                _call, 
-                timeout_s=settings.upstream_timeout_seconds, 
-                retries=settings.upstream_retries,
-                )
+        if adjust in ADJUSTS and settings.adjust_locally:
+            df = _read_adjusted(stock_code, start, end, adjust)
+        else:
+            df = _read(stock_code, start, end, adjust)
 
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"upstream akshare error: {type(e).__name__}")
-
-
-        if df is None or df.empty:
+        if df.empty and not allow_empty:
             # 没数据：可以视为资源不存在或时间范围无数据
             # 这里先用 404
             raise HTTPException(status_code=404, detail="no data for given stock/time range")
 
-        # akshare 返回常见中文列名：日期/开盘/收盘/最高/最低/成交量（不同版本可能略有差异）
-        colmap_candidates = {
-            "日期": "date",
-            "开盘": "open",
-            "最高": "high",
-            "最低": "low",
-            "收盘": "close",
-            "成交量": "volume",
-        }
-
-        # 只取存在的列并重命名
-        cols_present = {k: v for k, v in colmap_candidates.items() if k in df.columns}
-        df = df[list(cols_present.keys())].rename(columns=cols_present)
-
-        # 类型整理
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        for c in ["open", "high", "low", "close"]:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-        df["volume"] = pd.to_numeric(df["volume"], errors="coerce").fillna(0).astype(int)
-
-        # 去掉无效行
-        df = df.dropna(subset=["date", "open", "high", "low", "close"])
-        if df.empty:
-            raise HTTPException(status_code=404, detail="no usable data after cleaning")
-
         return df
@@ -0,0 +1,35 @@
+from __future__ import annotations 
+from datetime import date 
+
+from pydantic import BaseModel 
+
+class PredictMeta(BaseModel):
+    stock_code : str 
+    as_of : date            # 用哪一天（最后一根 K 线）的特征
+    bars : int              # 计算特征用了多少根 K 线
+    adjust : str 
+    model_version : str 
+
+class PredictResponse(BaseModel):
+    success : bool = True 
+    message : str = 'ok'
+    meta : PredictMeta
+    # 目标名 -> 正类概率（多分类模型为各类概率）；特征不足无法预测时为 null
+    data : dict[str, float | list[float] | None]
+
+
+class Explanation(BaseModel):
+    base_value : float 
+    # 特征 -> SHAP 值，按绝对值从大到小；base_value + 各特征之和 = 正类概率的 log-odds
+    contributions : dict[str, float]
+
+class ExplainMeta(BaseModel):
+    stock_code : str 
+    date : date 
+    model_version : str 
+
+class ExplainResponse(BaseModel):
+    success : bool = True 
+    message : str = 'ok'
+    meta : ExplainMeta
+    data : dict[str, Explanation]
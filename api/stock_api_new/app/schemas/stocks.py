@@ -1,9 +1,11 @@
 from __future__ import annotations 
 from datetime import date 
-from typing import Literal 
+from typing import Any, Literal 
 
 from pydantic import BaseModel, Field 
 
+from app.core.config import settings
+
 Interval = Literal['7d', '30d', '365d', '3m', '6m', '1y']
 Adjust = Literal["", "qfq", "hfq"]
 
@@ -28,3 +30,49 @@ class CandleResponse(BaseModel):
     meta : CandleMeta
     data : list[Candle]
 
+
+
+class ColumnarCandleResponse(BaseModel):
+    """
+    format=columnar：每个字段一个数组，按日期升序对齐
+    """
+    success : bool = True 
+    message : str = 'ok'
+    meta : CandleMeta
+    data : dict[str, list[date | float | int | None]]
+
+
+class BatchCandleRequest(BaseModel):
+    codes : list[str] = Field(min_length=1, max_length=settings.batch_max_symbols)
+    interval : Interval = '30d'
+    start : date | None = None 
+    end : date | None = None 
+    limit : int = Field(default=1000, ge=1, le=2000)
+    adjust : Adjust = ""
+    fields : str | None = None 
+    format : Literal["rows", "columnar"] = "rows"
+
+class BatchCandleMeta(BaseModel):
+    interval : Interval 
+    start : date 
+    end : date 
+    requested : int 
+    succeeded : int 
+    failed : int 
+
+class BatchCandleResult(BaseModel):
+    rows : int 
+    cache : str     # HIT | PARTIAL | MISS
+    data : list[dict[str, Any]] | dict[str, list[Any]]
+
+class BatchCandleError(BaseModel):
+    status : int 
+    error_code : str 
+    message : str 
+
+class BatchCandleResponse(BaseModel):
+    success : bool      # 全部成功才为 True
+    message : str 
+    meta : BatchCandleMeta
+    results : dict[str, BatchCandleResult]
+    errors : dict[str, BatchCandleError]
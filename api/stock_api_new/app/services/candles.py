@@ -0,0 +1,93 @@
+"""
+日线读取：(symbol, adjust) 整段缓存 + 同 key 并发合并 + 热点预热。
+
+/stocks/.../candles、批量接口和 /predict 共用这一份缓存，路由模块只负责参数解析和编码。
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+from fastapi import HTTPException
+
+from app import providers
+from app.core import stats
+from app.core.config import settings
+from app.core.frame_cache import FrameSpan, RangeFrameCache
+from common import timing
+from common.cache_backends import make_cache
+from common.market import calendar
+from common.prewarm import Prewarmer, Revalidator
+from common.singleflight import SingleFlight
+
+
+_cache = make_cache(
+    settings.cache_backend,
+    ttl_seconds=settings.cache_ttl_seconds,
+    stale_seconds=settings.cache_stale_seconds,
+    max_entries=settings.cache_max_entries,
+    max_bytes=settings.cache_max_bytes,
+    sqlite_path=settings.cache_sqlite_path,
+    redis_url=settings.cache_redis_url,
+    namespace="stock_api_new",
+)
+_flight = SingleFlight()
+_revalidator = Revalidator()
+
+
+def _fetch_part(stock_code: str, start: date, end: date, adjust: str):
+    # 同一 (symbol, start, end, adjust) 的并发 miss 只打一次上游，其余等待共享结果
+    return _flight.do(
+        (stock_code, start, end, adjust),
+        lambda: providers.get().get_a_stock_daily(stock_code, start, end, adjust=adjust, allow_empty=True),
+    )
+
+
+def _frame_ttl(adjust: str, hi: date) -> float | None:
+    # 已收盘的日线不过期，只有包含盘中当日 K 线的区间用短 TTL；非交易时段保留到下次开盘
+    if not settings.cache_calendar_aware:
+        return None
+    return calendar.ttl_for(hi, live_ttl=settings.cache_ttl_seconds, adjust=adjust)
+
+
+frames = RangeFrameCache(_cache, fetch=_fetch_part, revalidator=_revalidator, ttl=_frame_ttl)
+
+# 热点 (symbol, adjust) 在过期前由后台刷新，请求不再等待上游
+prewarmer = Prewarmer(
+    refresh=lambda key: frames.refresh(*key),
+    remaining=lambda key: frames.ttl_remaining(*key),
+    revalidator=_revalidator,
+    top_n=settings.prewarm_top_n,
+    interval_seconds=settings.prewarm_interval_seconds,
+    lead_seconds=settings.prewarm_lead_seconds,
+    budget_per_minute=settings.prewarm_budget_per_minute,
+    enabled=settings.prewarm_enabled,
+)
+
+stats.register("candles_cache", _cache.stats)
+stats.register("candles_singleflight", _flight.stats)
+stats.register("candles_revalidate", _revalidator.stats)
+stats.register("candles_prewarm", prewarmer.stats)
+
+
+def load_candles(
+    stock_code: str, start: date, end: date, adjust: str, limit: int | None
+) -> tuple[pd.DataFrame, str, FrameSpan]:
+    """
+    返回 (日线, X-Cache 状态, 所在的缓存区间)；没有数据时 404
+    """
+    if stock_code == '000000':
+        raise HTTPException(status_code=404, detail='stock not found')
+
+    # 缓存的是 (symbol, adjust) 的整段日线：子区间 / limit / fields 都在切片上完成，
+    # 只有超出已缓存区间的部分才会访问上游
+    prewarmer.touch((stock_code, adjust))
+    span, cache_status = frames.get_span(stock_code, start, end, adjust)
+    with timing.stage("slice"):
+        df = span.slice(start, end)
+
+    if df.empty:
+        raise HTTPException(status_code=404, detail="no data for given stock/time range")
+
+    # limit：取最近 limit 条（缓存的日线已按日期升序）；None 时返回整个切片
+    return (df if limit is None else df.tail(limit)), cache_status, span
@@ -0,0 +1,170 @@
+"""
+训练数据集：(symbol, date) 一行，特征 + 目标，落盘后重复使用。
+
+- 目录名是 (symbols, 区间, adjust, 特征, 目标) 的摘要：同样的输入第二次直接打开，不再拉日线、不再计算
+- 每个数组一个 .npy，用 mmap 只读打开：进程池里的每个 worker 各自映射同一份文件，
+  不需要把数据 pickle 给子进程
+- 行按 (date, symbol) 排序，walk-forward 的训练 / 测试集都是连续的行区间（切片不复制）
+- 和笔记本一样，特征有 NaN / inf 或任一目标未知的行丢弃
+- 特征和目标按每个 symbol 自己的交易日计算（kernels.compact_panel）：同一批里别的 symbol
+  交易、自己停牌的日期不会让前后的行变成 NaN 而被丢掉
+- 单个 symbol 拉取失败（404 / 502 / 503 等）只跳过这个 symbol，记在 meta.json 的 skipped 里；
+  有跳过的数据集下次 build 时不直接复用，而是重新构建
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Callable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.features.kernels import FEATURE_INDEX, align_frames, compact_panel, compute_features
+from app.training.targets import HORIZON, TARGETS, compute_targets
+
+FetchFn = Callable[[str, date, date, str], pd.DataFrame]
+
+DATASET_VERSION = 1
+# 每批计算的 symbol 数，控制中间 (S, T, F) 数组的内存
+BLOCK = 256
+
+_ARRAYS = ("x", "y", "days", "symbol")
+
+
+def dataset_key(
+    symbols: Sequence[str], start: date, end: date, adjust: str, features: Sequence[str]
+) -> str:
+    parts = [DATASET_VERSION, ",".join(symbols), start, end, adjust, ",".join(features), ",".join(TARGETS), HORIZON]
+    return hashlib.blake2b("\x1f".join(map(str, parts)).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class Dataset:
+    """
+    只读打开的数据集：x (N, F) float32、y (N, K) int8、days (N,) datetime64[D]、symbol (N,) 下标
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+        meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("version") != DATASET_VERSION:
+            raise ValueError(f"incompatible dataset at {self.path}")
+        self.key: str = meta["key"]
+        self.adjust: str = meta["adjust"]
+        self.start = date.fromisoformat(meta["start"])
+        self.end = date.fromisoformat(meta["end"])
+        self.symbols: list[str] = meta["symbols"]
+        self.features: tuple[str, ...] = tuple(meta["features"])
+        self.targets: tuple[str, ...] = tuple(meta["targets"])
+        # symbol -> 拉取失败的原因
+        self.skipped: dict[str, str] = meta.get("skipped", {})
+        self.x, self.y, self.days, self.symbol = (np.load(self.path / f"{name}.npy", mmap_mode="r") for name in _ARRAYS)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+
+class DatasetBuilder:
+    def __init__(self, root: str | os.PathLike, fetch: FetchFn, *, max_workers: int = 8):
+        self.root = Path(root)
+        self._fetch = fetch
+        self.max_workers = max_workers
+
+    def build(
+        self,
+        symbols: Sequence[str],
+        start: date,
+        end: date,
+        *,
+        adjust: str = "qfq",
+        features: Sequence[str],
+        rebuild: bool = False,
+    ) -> Dataset:
+        symbols = list(dict.fromkeys(symbols))
+        features = tuple(features)
+        path = self.root / dataset_key(symbols, start, end, adjust, features)
+        if (path / "meta.json").exists() and not rebuild:
+            existing = Dataset(path)
+            if not existing.skipped:
+                return existing
+
+        columns = [FEATURE_INDEX[f] for f in features]
+        parts: list[tuple[np.ndarray, ...]] = []
+        skipped: dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for lo in range(0, len(symbols), BLOCK):
+                block = symbols[lo: lo + BLOCK]
+                frames = {}
+                for s, (df, err) in zip(block, pool.map(lambda s: self._fetch_one(s, start, end, adjust), block)):
+                    if err is not None:
+                        skipped[s] = err
+                    elif df is not None and len(df):
+                        frames[s] = df
+                if frames:
+                    parts.append(self._rows(frames, columns, offset={s: lo + i for i, s in enumerate(block)}))
+
+        if not parts:
+            parts.append(
+                (
+                    np.empty((0, len(features)), np.float32),
+                    np.empty((0, len(TARGETS)), np.int8),
+                    np.empty(0, "datetime64[D]"),
+                    np.empty(0, np.int32),
+                )
+            )
+        x, y, days, symbol = (np.concatenate(arrays) for arrays in zip(*parts))
+        order = np.lexsort((symbol, days))
+
+        tmp = self.root / f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.mkdir(parents=True, exist_ok=True)
+        for name, values in zip(_ARRAYS, (x, y, days, symbol)):
+            np.save(tmp / f"{name}.npy", values[order])
+        meta = {
+            "version": DATASET_VERSION,
+            "key": path.name,
+            "adjust": adjust,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "symbols": symbols,
+            "features": list(features),
+            "targets": list(TARGETS),
+            "rows": int(len(order)),
+            "skipped": skipped,
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+        return Dataset(path)
+
+    def _fetch_one(self, symbol: str, start: date, end: date, adjust: str) -> tuple[pd.DataFrame | None, str | None]:
+        try:
+            return self._fetch(symbol, start, end, adjust), None
+        except Exception as e:
+            return None, f"{type(e).__name__}: {getattr(e, 'detail', e)}"
+
+    @staticmethod
+    def _rows(
+        frames: dict[str, pd.DataFrame], columns: list[int], offset: dict[str, int]
+    ) -> tuple[np.ndarray, ...]:
+        symbols, dates, panel = align_frames(frames)
+        compact, rows, cols, pos = compact_panel(panel)
+        feats = compute_features(compact["close"], compact["high"], compact["low"], compact["volume"])[:, :, columns]
+        targets = compute_targets(compact["close"], compact["high"], compact["low"])
+        # 紧凑矩阵的 (symbol, 第 k 根 K 线) -> 日历上的列；行尾补的 NaN 为 -1
+        day_col = np.full(compact["close"].shape, -1, dtype=np.int64)
+        day_col[rows, pos] = cols
+        ok = (day_col >= 0) & np.isfinite(feats).all(axis=2) & ~np.isnan(targets).any(axis=2)
+        s_idx, k_idx = np.nonzero(ok)
+        return (
+            np.ascontiguousarray(feats[s_idx, k_idx], dtype=np.float32),
+            targets[s_idx, k_idx].astype(np.int8),
+            dates[day_col[s_idx, k_idx]],
+            np.array([offset[s] for s in symbols], dtype=np.int32)[s_idx],
+        )
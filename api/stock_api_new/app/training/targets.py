@@ -0,0 +1,80 @@
+"""
+testlogic1.ipynb 的四个二分类目标，按 (symbol × date) 批量计算。
+
+- Target_Direction：5 日后收盘价高于今天收盘价
+- Target_Downside_Risk：未来 5 日最低价跌破今天收盘价的 95%
+- Target_Breakout：未来 5 日最高价突破含今天在内的 20 日最高价
+- Target_High_Volatility：未来 5 日振幅 / 今天收盘价 高于该 symbol 自身的 75 分位
+  （与笔记本一致，分位数取整段样本）
+
+未来数据不足（最后 HORIZON 天）、20 日窗口不满或窗口内有停牌（对齐后的 NaN）时为 NaN，
+训练时整行丢弃。
+"""
+from __future__ import annotations
+
+import numpy as np
+
+TARGETS: tuple[str, ...] = (
+    "Target_Direction",
+    "Target_Downside_Risk",
+    "Target_Breakout",
+    "Target_High_Volatility",
+)
+
+HORIZON = 5
+BREAKOUT_WINDOW = 20
+VOLATILITY_QUANTILE = 0.75
+
+
+def _as_2d(x) -> np.ndarray:
+    arr = np.asarray(x, dtype=np.float64)
+    return arr[None, :] if arr.ndim == 1 else arr
+
+
+def _rolling(x: np.ndarray, w: int, fn) -> np.ndarray:
+    """
+    含当天在内的 w 日窗口（窗口不满为 NaN），沿时间轴
+    """
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= w:
+        windows = np.lib.stride_tricks.sliding_window_view(x, w, axis=1)
+        out[:, w - 1:] = fn(windows, axis=2)
+    return out
+
+
+def _lead(x: np.ndarray, n: int) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    out[:, : x.shape[1] - n] = x[:, n:]
+    return out
+
+
+def compute_targets(close, high, low, *, dtype=np.float32) -> np.ndarray:
+    """
+    close / high / low：形状 (S, T)（或单个 symbol 的 (T,)），按日期升序对齐。
+    返回 (S, T, len(TARGETS))，取值 0 / 1，未知为 NaN
+    """
+    c, h, l = _as_2d(close), _as_2d(high), _as_2d(low)
+    out = np.full((*c.shape, len(TARGETS)), np.nan, dtype=dtype)
+
+    # 窗口 [t+1, t+HORIZON] 的最高 / 最低：t+HORIZON 处的滚动值前移 HORIZON 天
+    fwd_close = _lead(c, HORIZON)
+    fwd_high = _lead(_rolling(h, HORIZON, np.max), HORIZON)
+    fwd_low = _lead(_rolling(l, HORIZON, np.min), HORIZON)
+    high_20 = _rolling(h, BREAKOUT_WINDOW, np.max)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fwd_range = (fwd_high - fwd_low) / c
+        known = ~np.isnan(fwd_range)
+        threshold = np.full((c.shape[0], 1), np.nan)
+        has = known.any(axis=1)
+        if has.any():
+            threshold[has, 0] = np.nanquantile(fwd_range[has], VOLATILITY_QUANTILE, axis=1)
+
+        def put(name: str, cond: np.ndarray, valid: np.ndarray) -> None:
+            out[:, :, TARGETS.index(name)] = np.where(valid, cond, np.nan)
+
+        put("Target_Direction", fwd_close > c, ~np.isnan(fwd_close) & ~np.isnan(c))
+        put("Target_Downside_Risk", fwd_low < c * 0.95, ~np.isnan(fwd_low) & ~np.isnan(c))
+        put("Target_Breakout", fwd_high > high_20, ~np.isnan(fwd_high) & ~np.isnan(high_20))
+        put("Target_High_Volatility", fwd_range > threshold, known)
+    return out
@@ -0,0 +1,256 @@
+"""
+训练全部目标：walk-forward 评估 + 全量数据训练出部署用的模型，进程池并行
+
+    cd api/stock_api_new
+    # 数据集按 (symbols, 区间, adjust) 缓存在 DATASET_DIR，同样的参数再跑不会重新拉日线
+    python -m app.training.train --symbols-file universe.txt --start 2015-01-01
+    # 每个 worker 2 个 LightGBM 线程，worker 数默认 CPU 核数 / 2
+    python -m app.training.train --symbols-file universe.txt --threads-per-worker 2 --splits 5
+
+- 任务是 (目标, 折) 和 (目标, 全量)，全部提交到一个 spawn 的进程池；每个 worker 的
+  LightGBM / OpenMP 线程数固定为 threads_per_worker，workers × threads 不超过核数，不会互相抢核
+- worker 用 mmap 打开同一份数据集，训练 / 测试集是行区间切片，不复制也不经过 pickle
+- 产出 MODEL_DIR/<version>/<target>.txt（LightGBM 文本模型）+ manifest.json（特征、各折指标），
+  全部写完后才更新 MODEL_DIR/CURRENT 指向新版本；API 启动时加载 CURRENT 指向的版本
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from itertools import repeat
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from app import providers
+from app.core.config import settings
+from common.market import settled_through
+from app.features.kernels import NOTEBOOK_FEATURES
+from app.training.dataset import Dataset, DatasetBuilder
+from app.training.targets import HORIZON
+from app.training.walkforward import Fold, walk_forward_splits
+
+# 与笔记本的 LGBMClassifier(random_state=42, verbose=-1) 默认参数一致
+DEFAULT_PARAMS: dict[str, Any] = {
+    "objective": "binary",
+    "learning_rate": 0.1,
+    "num_leaves": 31,
+    "min_child_samples": 20,
+    "seed": 42,
+    "verbose": -1,
+}
+NUM_BOOST_ROUND = 100
+
+_THREAD_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+@dataclass(frozen=True)
+class Task:
+    target: str
+    fold: Fold | None = None      # None：全量训练，模型写到 output
+    output: str | None = None
+
+
+# ---------- worker 进程 ----------
+
+_dataset: Dataset | None = None
+_threads = 1
+
+
+def _init_worker(dataset_path: str, threads: int) -> None:
+    # lightgbm 在任务里才导入，这里设的 OpenMP 线程数对它生效
+    global _dataset, _threads
+    for name in _THREAD_ENV:
+        os.environ[name] = str(threads)
+    _threads = threads
+    _dataset = Dataset(dataset_path)
+
+
+def _auc(y: np.ndarray, p: np.ndarray) -> float | None:
+    pos = int(y.sum())
+    neg = len(y) - pos
+    if pos == 0 or neg == 0:
+        return None
+    ranks = pd.Series(p).rank(method="average").to_numpy()
+    return float((ranks[y == 1].sum() - pos * (pos + 1) / 2) / (pos * neg))
+
+
+def _run(task: Task, params: dict[str, Any], num_boost_round: int) -> dict[str, Any]:
+    import lightgbm as lgb
+
+    ds = _dataset
+    j = ds.targets.index(task.target)
+    rows = task.fold.train if task.fold is not None else slice(0, len(ds))
+    t0 = time.perf_counter()
+    train_set = lgb.Dataset(ds.x[rows], label=ds.y[rows, j], feature_name=list(ds.features))
+    booster = lgb.train({**params, "num_threads": _threads}, train_set, num_boost_round=num_boost_round)
+    result: dict[str, Any] = {
+        "target": task.target,
+        "fold": None if task.fold is None else task.fold.index,
+        "train_rows": rows.stop - rows.start,
+        "fit_seconds": round(time.perf_counter() - t0, 3),
+    }
+    if task.fold is None:
+        booster.save_model(task.output)
+        return result
+
+    test = task.fold.test
+    y = np.asarray(ds.y[test, j])
+    p = booster.predict(ds.x[test], num_threads=_threads)
+    result.update(
+        test_rows=test.stop - test.start,
+        test_start=str(task.fold.test_start),
+        test_end=str(task.fold.test_end),
+        auc=_auc(y, p),
+        accuracy=float(((p >= 0.5) == (y == 1)).mean()) if len(y) else None,
+    )
+    return result
+
+
+# ---------- 调度 ----------
+
+def _write_current(model_root: Path, version: str) -> None:
+    tmp = model_root / f"CURRENT.{os.getpid()}.{threading.get_ident()}.tmp"
+    tmp.write_text(version, encoding="utf-8")
+    os.replace(tmp, model_root / "CURRENT")
+
+
+def train_models(
+    dataset: Dataset,
+    model_root: str | os.PathLike,
+    *,
+    n_splits: int = 5,
+    workers: int | None = None,
+    threads_per_worker: int = 2,
+    params: dict[str, Any] | None = None,
+    num_boost_round: int = NUM_BOOST_ROUND,
+) -> dict[str, Any]:
+    """
+    返回写入 manifest.json 的内容（含各折指标）
+    """
+    cpus = os.cpu_count() or 1
+    threads = max(1, min(threads_per_worker, cpus))
+    workers = workers or max(1, cpus // threads)
+    params = {**DEFAULT_PARAMS, **(params or {})}
+
+    model_root = Path(model_root)
+    version = datetime.now().strftime("%Y%m%d-%H%M%S")
+    staging = model_root / f"{version}.tmp"
+    staging.mkdir(parents=True, exist_ok=True)
+
+    folds = walk_forward_splits(dataset.days, n_splits, gap=HORIZON)
+    # 训练集大的任务先提交（全量模型，然后是靠后的折），避免最后只剩一个长任务在跑
+    tasks = [Task(t, output=str(staging / f"{t}.txt")) for t in dataset.targets]
+    tasks += [Task(t, fold=f) for f in reversed(folds) for t in dataset.targets]
+
+    t0 = time.perf_counter()
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(tasks)),
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(str(dataset.path), threads),
+    ) as pool:
+        results = list(pool.map(_run, tasks, repeat(params), repeat(num_boost_round)))
+
+    metrics = {}
+    for target in dataset.targets:
+        scored = sorted((r for r in results if r["target"] == target and r["fold"] is not None), key=lambda r: r["fold"])
+        aucs = [r["auc"] for r in scored if r["auc"] is not None]
+        metrics[target] = {"mean_auc": round(float(np.mean(aucs)), 4) if aucs else None, "folds": scored}
+
+    manifest = {
+        "version": version,
+        "adjust": dataset.adjust,
+        "features": list(dataset.features),
+        "targets": list(dataset.targets),
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "dataset": {"key": dataset.key, "rows": len(dataset), "start": str(dataset.start), "end": str(dataset.end)},
+        "params": params,
+        "num_boost_round": num_boost_round,
+        "workers": workers,
+        "threads_per_worker": threads,
+        "train_seconds": round(time.perf_counter() - t0, 1),
+        "metrics": metrics,
+    }
+    (staging / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    final = model_root / version
+    if final.exists():
+        shutil.rmtree(final)
+    os.replace(staging, final)
+    _write_current(model_root, version)
+    return manifest
+
+
+# ---------- 命令行 ----------
+
+def _fetch(symbol: str, start: date, end: date, adjust: str):
+    return providers.get().get_a_stock_daily(symbol, start, end, adjust, allow_empty=True)
+
+
+def _read_symbols(args: argparse.Namespace) -> list[str]:
+    symbols = [s.strip() for s in (args.symbols or "").split(",") if s.strip()]
+    if args.symbols_file:
+        symbols += [line.strip() for line in Path(args.symbols_file).read_text().splitlines() if line.strip()]
+    return list(dict.fromkeys(symbols))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", help="逗号分隔的股票代码")
+    parser.add_argument("--symbols-file", help="每行一个股票代码")
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2015, 1, 1))
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="默认取最后一个已收盘交易日")
+    parser.add_argument("--adjust", default="qfq", choices=["", "qfq", "hfq"])
+    parser.add_argument("--dataset-dir", default=settings.dataset_dir)
+    parser.add_argument("--model-dir", default=settings.model_dir)
+    parser.add_argument("--rebuild-dataset", action="store_true", help="忽略已缓存的数据集")
+    parser.add_argument("--splits", type=int, default=5, help="walk-forward 折数")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认 CPU 核数 / threads-per-worker")
+    parser.add_argument("--threads-per-worker", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=NUM_BOOST_ROUND)
+    parser.add_argument("--fetch-workers", type=int, default=settings.batch_concurrency)
+    args = parser.parse_args()
+
+    symbols = _read_symbols(args)
+    if not symbols:
+        parser.error("needs --symbols or --symbols-file")
+    end = args.end or settled_through()
+
+    t0 = time.perf_counter()
+    builder = DatasetBuilder(args.dataset_dir, fetch=_fetch, max_workers=args.fetch_workers)
+    dataset = builder.build(
+        symbols, args.start, end, adjust=args.adjust, features=NOTEBOOK_FEATURES, rebuild=args.rebuild_dataset
+    )
+    print(f"dataset {dataset.path}: {len(dataset)} rows x {len(dataset.features)} features in {time.perf_counter() - t0:.1f}s")
+    if dataset.skipped:
+        print(f"{len(dataset.skipped)} symbols skipped (fetch failed):")
+        for symbol, err in dataset.skipped.items():
+            print(f"  {symbol}: {err}")
+
+    manifest = train_models(
+        dataset,
+        args.model_dir,
+        n_splits=args.splits,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        num_boost_round=args.rounds,
+    )
+    print(f"models {manifest['version']} in {manifest['train_seconds']}s "
+          f"({manifest['workers']} workers x {manifest['threads_per_worker']} threads)")
+    for target, m in manifest["metrics"].items():
+        print(f"  {target:<24} mean AUC {m['mean_auc']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+walk-forward（扩张窗口）切分：交易日分成 n_splits + 1 段，第 k 折用前 k 段训练、第 k + 1 段测试。
+
+目标看未来 HORIZON 天，训练集末尾 gap 个交易日的标签会用到测试期的价格，所以训练集在测试开始前
+再空出 gap 天。数据集的行按日期排序，返回的都是行区间的切片。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Fold:
+    index: int
+    train: slice
+    test: slice
+    test_start: np.datetime64
+    test_end: np.datetime64
+
+
+def walk_forward_splits(days: np.ndarray, n_splits: int = 5, gap: int = 0) -> list[Fold]:
+    """
+    days：每行的日期（升序）。交易日太少、切不出非空的训练 / 测试集的折跳过
+    """
+    unique = np.unique(np.asarray(days, dtype="datetime64[D]"))
+    bounds = np.linspace(0, len(unique), n_splits + 2).astype(int)
+    folds = []
+    for k in range(1, n_splits + 1):
+        test_lo, test_hi = bounds[k], bounds[k + 1]
+        train_hi = test_lo - gap
+        if train_hi <= 0 or test_hi <= test_lo:
+            continue
+        rows = np.searchsorted(days, unique[[train_hi, test_lo]], side="left")
+        test_end = np.searchsorted(days, unique[test_hi - 1], side="right")
+        folds.append(
+            Fold(
+                index=len(folds),
+                train=slice(0, int(rows[0])),
+                test=slice(int(rows[1]), int(test_end)),
+                test_start=unique[test_lo],
+                test_end=unique[test_hi - 1],
+            )
+        )
+    return folds
@@ -0,0 +1,2 @@
+# 导入 app 会把 api/ 加进 sys.path（见 app/__init__.py），之后才能导入 common.bench
+import app  # noqa: F401
@@ -0,0 +1,147 @@
+"""
+/v1 接口的离线基准：上游换成 common.bench.fake_upstream（可配置延迟 / 失败率），不访问网络。
+
+    cd api/stock_api_new
+    python -m bench.bench_api --requests 300 --concurrency 8 --latency-ms 20 --out bench-new.json
+    # 与另一个提交的结果对比
+    cd .. && python -m common.bench.compare stock_api_new/bench-old.json stock_api_new/bench-new.json
+
+    # 用录制的真实上游数据和耗时（common.tape）代替假上游，可叠加重尾延迟和失败注入
+    python -m bench.bench_api --replay .data/upstream_tape --replay-latency heavy_tail --latency-ms 80 --failure-rate 0.02
+
+场景：缓存未命中 / 命中 / fields+limit / columnar / 304 重验证 / 批量接口，
+以及 K 线序列化和特征内核的微基准。回放时 symbol 取自磁带，未命中场景轮流使用磁带里的 symbol
+（磁带里的 symbol 比请求数少时，后面的请求会命中缓存）。
+"""
+from __future__ import annotations
+
+import argparse
+import os
+
+# 必须在导入 app 之前设置：不落盘、不预热、进程内缓存，保证每次运行条件一致
+os.environ.setdefault("OHLCV_STORE_ENABLED", "0")
+os.environ.setdefault("PREWARM_ENABLED", "0")
+os.environ.setdefault("CACHE_BACKEND", "memory")
+# 假上游不需要保护：限流放开，测的是服务本身（限流的效果用 UPSTREAM_RATE_PER_SECOND 等覆盖后单独看）
+os.environ.setdefault("UPSTREAM_RATE_PER_SECOND", "100000")
+os.environ.setdefault("UPSTREAM_BURST", "100000")
+os.environ.setdefault("UPSTREAM_MAX_CONCURRENCY", "64")
+
+from common.bench.fake_upstream import FakeUpstream  # noqa: E402
+from common.bench.harness import print_table, run_load, time_call, write_result  # noqa: E402
+
+
+def endpoint_scenarios(args: argparse.Namespace, codes: list[str] | None = None) -> dict[str, dict]:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    def client() -> TestClient:
+        return TestClient(app)
+
+    n, c = args.requests, args.concurrency
+    url = "/v1/stocks/{code}/candles"
+    warm = client()
+    hot = codes[0] if codes else "600519"
+    warm.get(url.format(code=hot), params={"interval": "1y"})
+    etag = warm.get(url.format(code=hot), params={"interval": "1y"}).headers["etag"]
+    batch_codes = codes[:50] if codes else [f"{600000 + i:06d}" for i in range(50)]
+    miss = (lambda i: codes[(i + 1) % len(codes)]) if codes else (lambda i: f"{300000 + i:06d}")
+    warm.post("/v1/stocks/candles:batch", json={"codes": batch_codes, "interval": "1y"})
+
+    scenarios = {
+        # 每个请求一个新 symbol：必然访问上游
+        "candles_miss": lambda cl, i: cl.get(url.format(code=miss(i)), params={"interval": "1y"}),
+        "candles_hit": lambda cl, i: cl.get(url.format(code=hot), params={"interval": "1y"}),
+        "candles_hit_fields_limit": lambda cl, i: cl.get(
+            url.format(code=hot), params={"interval": "1y", "fields": "date,close", "limit": 100}
+        ),
+        "candles_hit_columnar": lambda cl, i: cl.get(url.format(code=hot), params={"interval": "1y", "format": "columnar"}),
+        "candles_hit_gzip": lambda cl, i: cl.get(
+            url.format(code=hot), params={"interval": "1y"}, headers={"Accept-Encoding": "gzip"}
+        ),
+        "candles_304": lambda cl, i: cl.get(url.format(code=hot), params={"interval": "1y"}, headers={"If-None-Match": etag}),
+        "batch_hit_50": lambda cl, i: cl.post("/v1/stocks/candles:batch", json={"codes": batch_codes, "interval": "1y"}),
+    }
+    out = {}
+    for name, fn in scenarios.items():
+        requests = max(1, n // 10) if name == "batch_hit_50" else n
+        out[name] = run_load(client, fn, requests=requests, concurrency=c)
+    return out
+
+
+def micro_benchmarks(args: argparse.Namespace) -> dict[str, dict]:
+    from bench.bench_serialize import fast_columnar, fast_rows, make_frame
+    from app.features.kernels import features_frame
+
+    df = make_frame(args.rows)
+    return {
+        f"encode_candles_rows_{args.rows}": time_call(lambda: fast_rows(df), args.repeat),
+        f"encode_candles_columnar_{args.rows}": time_call(lambda: fast_columnar(df), args.repeat),
+        f"features_frame_{args.rows}": time_call(lambda: features_frame(df), args.repeat),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=300)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="假上游的平均延迟")
+    ap.add_argument("--jitter-ms", type=float, default=5.0)
+    ap.add_argument("--failure-rate", type=float, default=0.0, help="假上游失败的概率")
+    ap.add_argument("--replay", metavar="TAPE_DIR", help="从录制的磁带回放上游（不用假上游，跳过微基准）")
+    ap.add_argument(
+        "--replay-latency", choices=("constant", "recorded", "heavy_tail"), default="recorded",
+        help="回放延迟：固定 --latency-ms / 录制时的耗时 / 中位数 --latency-ms 的重尾分布",
+    )
+    ap.add_argument("--latency-sigma", type=float, default=1.0, help="heavy_tail 的对数正态 sigma")
+    ap.add_argument("--rows", type=int, default=2000, help="微基准的 K 线条数")
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="结果写入的 JSON 文件")
+    ap.add_argument("--skip-micro", action="store_true")
+    args = ap.parse_args()
+
+    codes = None
+    if args.replay:
+        # 必须在导入 app 之前：配置在导入时读取
+        os.environ.update(
+            UPSTREAM_MODE="replay",
+            UPSTREAM_TAPE_DIR=args.replay,
+            REPLAY_LATENCY=args.replay_latency,
+            REPLAY_LATENCY_MS=str(args.latency_ms),
+            REPLAY_LATENCY_SIGMA=str(args.latency_sigma),
+            REPLAY_FAILURE_RATE=str(args.failure_rate),
+            REPLAY_SEED=str(args.seed),
+        )
+        from common.tape import Tape
+
+        codes = Tape(args.replay).symbols()
+        if not codes:
+            ap.error(f"no recordings in {args.replay}")
+        args.skip_micro = True
+    else:
+        upstream = FakeUpstream(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, failure_rate=args.failure_rate, seed=args.seed
+        ).install()
+
+    endpoints = endpoint_scenarios(args, codes)
+    micro = {} if args.skip_micro else micro_benchmarks(args)
+    if args.replay:
+        from app.providers.akshare_provider import upstream_stats
+
+        upstream_summary = upstream_stats().get("tape", {})
+    else:
+        upstream_summary = upstream.stats()
+    config = {k: v for k, v in vars(args).items() if k not in ("out", "skip_micro")}
+    write_result(args.out, "stock_api_new", config, {"endpoints": endpoints, "micro": micro, "upstream": upstream_summary})
+
+    print_table("endpoints", endpoints)
+    if micro:
+        print_table("micro", micro)
+    if args.out:
+        print(f"\nwrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+/candles 序列化微基准：旧路径（iterrows + Candle + model_dump + JSONResponse）vs 列式快路径
+
+    cd api/stock_api_new
+    python -m bench.bench_serialize --rows 2000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.serialize import encode_candles
+from app.schemas.stocks import Candle, CandleMeta, CandleResponse
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    close = 10 + rng.standard_normal(rows).cumsum() * 0.1
+    start = date(2015, 1, 1)
+    return pd.DataFrame(
+        {
+            "date": [start + timedelta(days=i) for i in range(rows)],
+            "open": close + 0.01,
+            "high": close + 0.05,
+            "low": close - 0.05,
+            "close": close,
+            "volume": rng.integers(1_000, 1_000_000, rows),
+        }
+    )
+
+
+def _meta(df: pd.DataFrame) -> CandleMeta:
+    return CandleMeta(stock_code="600519", interval="1y", start=df["date"].iloc[0], end=df["date"].iloc[-1], rows=len(df))
+
+
+def legacy_path(df: pd.DataFrame) -> bytes:
+    candles = [
+        Candle(
+            date=row["date"],
+            open=float(row["open"]),
+            high=float(row["high"]),
+            low=float(row["low"]),
+            close=float(row["close"]),
+            volume=int(row["volume"]),
+        )
+        for _, row in df.iterrows()
+    ]
+    resp = CandleResponse(message="candles for 600519", meta=_meta(df), data=candles)
+    resp_dict = resp.model_dump()
+    validated = CandleResponse.model_validate(resp_dict)
+    return JSONResponse(jsonable_encoder(validated, exclude_none=True)).body
+
+
+def fast_rows(df: pd.DataFrame) -> bytes:
+    return encode_candles(df, message="candles for 600519", meta=_meta(df).model_dump(mode="json"))
+
+
+def fast_columnar(df: pd.DataFrame) -> bytes:
+    return encode_candles(df, message="candles for 600519", meta=_meta(df).model_dump(mode="json"), columnar=True)
+
+
+def timeit(fn, df: pd.DataFrame, repeat: int) -> float:
+    fn(df)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(df)
+    return (time.perf_counter() - t0) / repeat
+
+
+def run(rows: int, repeat: int) -> dict[str, dict[str, float]]:
+    df = make_frame(rows)
+    assert legacy_path(df) == fast_rows(df), "fast path must be byte-compatible"
+
+    out = {}
+    base = None
+    for name, fn in (("legacy", legacy_path), ("fast_rows", fast_rows), ("fast_columnar", fast_columnar)):
+        sec = timeit(fn, df, repeat)
+        base = base or sec
+        out[name] = {"ms": round(sec * 1000, 3), "bytes": len(fn(df)), "speedup": round(base / sec, 1)}
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    for name, r in run(args.rows, args.repeat).items():
+        print(f"{name:<14} {r['ms']:>9.3f} ms  {r['bytes']:>8} bytes  x{r['speedup']}")
+
+
+if __name__ == "__main__":
+    main()
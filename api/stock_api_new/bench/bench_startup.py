@@ -0,0 +1,146 @@
+"""
+冷启动基准：每轮起一个新的 Python 进程，测 import app.main 的耗时、到第一个响应的耗时，
+并用 -X importtime 列出各模块（app.*、common.* 和几个重的第三方包）的累计导入时间。
+
+    cd api/stock_api_new
+    python -m bench.bench_startup --runs 5 --out startup-new.json
+    # 与另一个提交的结果对比（startup 一节按 p95 比较）
+    cd .. && python -m common.bench.compare stock_api_new/startup-old.json stock_api_new/startup-new.json
+
+- import_app_ms：import app.main（不含解释器启动）
+- first_health_ms：应用导入完成后，lifespan 启动 + 第一个 GET /v1/health
+- process_to_first_health_ms：从父进程启动子进程到第一个 health 响应
+- upstream_ready_ms：把上游换成 common.bench.fake_upstream 的耗时（基本就是 import akshare；
+  预热线程已经导入完时接近 0）
+- first_candles_ms：第一个 K 线请求（假上游，零延迟）
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from common.bench.harness import latency_summary, print_table, write_result
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# 与 bench.bench_api 一致：不落盘、不预热缓存、进程内缓存
+_ENV = {
+    "OHLCV_STORE_ENABLED": "0",
+    "PREWARM_ENABLED": "0",
+    "CACHE_BACKEND": "memory",
+    "UPSTREAM_RATE_PER_SECOND": "100000",
+    "UPSTREAM_BURST": "100000",
+}
+
+# 除 app.* 之外单独列出的第三方包
+_HEAVY = ("akshare", "pandas", "numpy", "fastapi", "pydantic", "starlette")
+
+_CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+from app.main import app
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    t2 = time.perf_counter()
+    status = client.get("/v1/health").status_code
+    t3 = time.perf_counter()
+    wall = time.time()
+    from common.bench.fake_upstream import FakeUpstream
+    FakeUpstream(latency_ms=0, jitter_ms=0).install()
+    t4 = time.perf_counter()
+    candles = client.get("/v1/stocks/600519/candles", params={"interval": "1y"}).status_code
+    t5 = time.perf_counter()
+print(json.dumps({
+    "import_app_ms": (t1 - t0) * 1000,
+    "first_health_ms": (t3 - t1) * 1000,
+    "upstream_ready_ms": (t4 - t3) * 1000,
+    "first_candles_ms": (t5 - t4) * 1000,
+    "health_wall": wall,
+    "status": [status, candles],
+}))
+"""
+
+
+def _env(warm_up: bool) -> dict[str, str]:
+    env = {**os.environ, **_ENV, "UPSTREAM_WARM_UP": "1" if warm_up else "0"}
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(ROOT), env.get("PYTHONPATH")) if p)
+    return env
+
+
+def run_once(warm_up: bool) -> dict[str, float]:
+    started = time.time()
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD], cwd=ROOT, env=_env(warm_up), capture_output=True, text=True, check=True
+    )
+    sample = json.loads(out.stdout.strip().splitlines()[-1])
+    if sample.pop("status") != [200, 200]:
+        raise RuntimeError(f"unexpected status in startup run: {out.stdout}")
+    sample["process_to_first_health_ms"] = (sample.pop("health_wall") - started) * 1000
+    return sample
+
+
+def parse_importtime(stderr: str) -> dict[str, float]:
+    """
+    -X importtime 的输出（"import time: self [us] | cumulative | imported package"）
+    -> 模块 -> 累计毫秒；只保留 app.*、common.* 和 _HEAVY 里的顶层包
+    """
+    out = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        name = parts[2]
+        if name.split(".")[0] in ("app", "common") or name in _HEAVY:
+            out[name] = int(parts[1]) / 1000
+    return out
+
+
+def import_profile(warm_up: bool) -> dict[str, float]:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=_env(warm_up), capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(out.stderr)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5, help="冷启动次数（每次一个新进程）")
+    ap.add_argument("--no-warm-up", action="store_true", help="UPSTREAM_WARM_UP=0：akshare 在第一次访问上游时才导入")
+    ap.add_argument("--top", type=int, default=15, help="打印导入最慢的前几个模块")
+    ap.add_argument("--out", help="结果写入的 JSON 文件")
+    args = ap.parse_args()
+    warm_up = not args.no_warm_up
+
+    samples: dict[str, list[float]] = defaultdict(list)
+    modules: dict[str, list[float]] = defaultdict(list)
+    for _ in range(args.runs):
+        for name, ms in run_once(warm_up).items():
+            samples[name].append(ms)
+        for name, ms in import_profile(warm_up).items():
+            modules[name].append(ms)
+
+    startup = {name: {"runs": len(v), **latency_summary(v)} for name, v in samples.items()}
+    imports = {name: {"runs": len(v), **latency_summary(v)} for name, v in modules.items()}
+    top = dict(sorted(imports.items(), key=lambda kv: -kv[1]["p50_ms"])[: args.top])
+
+    config = {"runs": args.runs, "warm_up": warm_up}
+    write_result(args.out, "stock_api_new", config, {"startup": startup, "imports": imports})
+
+    print_table("startup", startup)
+    print_table("imports (cumulative, -X importtime)", top)
+    if args.out:
+        print(f"\nwrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
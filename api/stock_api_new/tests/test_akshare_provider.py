@@ -0,0 +1,76 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from common.adjust import AdjustFactors, NoFactors
+
+
+def _raw() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "date": [date(2024, 1, 2), date(2024, 6, 3), date(2024, 6, 4)],
+            "open": [10.0, 10.0, 5.0],
+            "high": [10.0, 10.0, 5.0],
+            "low": [10.0, 10.0, 5.0],
+            "close": [10.0, 10.0, 5.0],
+            "volume": [100, 100, 200],
+        }
+    )
+
+
+def test_provider_falls_back_to_adjusted_bars_without_factors(monkeypatch):
+    from app.providers import akshare_provider
+
+    reads = []
+
+    def read(stock_code, start, end, adjust):
+        reads.append(adjust)
+        return _raw()
+
+    monkeypatch.setattr(akshare_provider, "_read", read)
+    monkeypatch.setattr(akshare_provider, "_factors", AdjustFactors(lambda symbol, adjust: pd.DataFrame()))
+    out = akshare_provider._read_adjusted("600519", date(2024, 1, 1), date(2024, 6, 30), "qfq")
+    # 没有因子：不复权日线之后直接向上游要 qfq 日线，而不是把不复权价当 qfq 返回
+    assert reads == ["", "qfq"]
+    assert out.equals(_raw())
+
+
+def test_missing_sina_factors_do_not_trip_the_price_breaker_or_limiter(monkeypatch):
+    from app.providers import akshare_provider
+
+    class _Ak:
+        calls = 0
+
+        def stock_zh_a_daily(self, symbol, adjust):
+            _Ak.calls += 1
+            raise ValueError("sina hfq factor not available")
+
+    monkeypatch.setattr(akshare_provider, "_ak", _Ak())
+    failures, rate = akshare_provider._breaker.stats()["failures"], akshare_provider._limiter.rate
+    with pytest.raises(NoFactors):
+        akshare_provider._fetch_factors("830799", "qfq")
+    assert _Ak.calls == 1
+    assert akshare_provider._breaker.stats()["failures"] == failures
+    assert akshare_provider._factor_breaker.stats()["failures"] == 0
+    assert akshare_provider._limiter.rate == rate
+
+
+def test_provider_falls_back_when_the_factor_source_is_unavailable(monkeypatch):
+    from fastapi import HTTPException
+
+    from app.providers import akshare_provider
+
+    reads = []
+
+    def read(stock_code, start, end, adjust):
+        reads.append(adjust)
+        return _raw()
+
+    def fetch(symbol, adjust):
+        raise HTTPException(status_code=503, detail="upstream akshare unavailable (circuit open)")
+
+    monkeypatch.setattr(akshare_provider, "_read", read)
+    monkeypatch.setattr(akshare_provider, "_factors", AdjustFactors(fetch))
+    akshare_provider._read_adjusted("600519", date(2024, 1, 1), date(2024, 6, 30), "qfq")
+    assert reads == ["", "qfq"]
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+from app.core.breaker import CircuitBreaker, CircuitOpenError
+from app.providers.akshare_provider import run_with_timeout_and_retry
+
+
+def test_breaker_opens_after_threshold_and_probes_after_reset():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()  # the single half-open probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_timeout_returns_without_waiting_for_the_upstream_call():
+    breaker = CircuitBreaker(failure_threshold=10)
+    t0 = time.monotonic()
+    with pytest.raises(TimeoutError):
+        run_with_timeout_and_retry(lambda: time.sleep(1.0), timeout_s=0.05, retries=0, breaker=breaker)
+    assert time.monotonic() - t0 < 0.5
+
+
+def test_open_breaker_fails_fast_without_calling_upstream():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    calls = []
+
+    def boom():
+        calls.append(1)
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        run_with_timeout_and_retry(boom, timeout_s=1, retries=3, breaker=breaker)
+    with pytest.raises(CircuitOpenError):
+        run_with_timeout_and_retry(boom, timeout_s=1, retries=3, breaker=breaker)
+    assert len(calls) == 1
@@ -0,0 +1,54 @@
+from datetime import date
+
+import numpy as np
+
+from app.features.kernels import FEATURE_INDEX, FEATURES
+from app.inference.explain import ExplanationStore, explain_day
+from app.inference.registry import Model, ModelRegistry
+
+FEATS = ("SMA_Bias", "RSI")
+
+
+def _registry() -> ModelRegistry:
+    calls = []
+
+    def contrib(x):
+        # 每个特征的贡献 = 特征值本身，基准值 0.5
+        calls.append(len(x))
+        return np.column_stack([x, np.full(len(x), 0.5)])
+
+    registry = ModelRegistry("/nonexistent")
+    registry.models = {
+        "Target_Breakout": Model(
+            "Target_Breakout", FEATS, np.array([FEATURE_INDEX[f] for f in FEATS]), lambda x: x[:, 0], contrib
+        )
+    }
+    registry.version = "v1"
+    registry.calls = calls
+    return registry
+
+
+def test_one_contrib_call_per_day_and_lookup_is_a_read(tmp_path):
+    registry = _registry()
+    store = ExplanationStore(tmp_path)
+    symbols = ["600000", "000001", "300750"]
+    x = np.random.default_rng(0).normal(size=(3, len(FEATURES)))
+    x[2, FEATURE_INDEX["RSI"]] = np.nan   # 特征不全，不解释
+
+    assert explain_day(registry, store, date(2024, 7, 1), symbols, x) == 2
+    assert explain_day(registry, store, date(2024, 7, 2), symbols, x * 2) == 2
+    assert registry.calls == [2, 2]
+    assert store.days("v1") == [date(2024, 7, 1), date(2024, 7, 2)]
+    assert store.latest("v1") == date(2024, 7, 2)
+
+    got = store.lookup("v1", "000001", date(2024, 7, 1))["Target_Breakout"]
+    assert got["base_value"] == 0.5
+    want = {f: x[1, FEATURE_INDEX[f]] for f in FEATS}
+    np.testing.assert_allclose([got["contributions"][f] for f in FEATS], [want[f] for f in FEATS], rtol=1e-6)
+    # 按绝对值从大到小
+    assert list(got["contributions"]) == sorted(FEATS, key=lambda f: -abs(want[f]))
+
+    assert store.lookup("v1", "300750", date(2024, 7, 1)) is None
+    assert store.lookup("v1", "688981", date(2024, 7, 1)) is None
+    assert store.lookup("v2", "000001", date(2024, 7, 1)) is None
+    assert registry.calls == [2, 2]
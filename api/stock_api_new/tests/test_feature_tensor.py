@@ -0,0 +1,150 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from app.features.tensor import FeatureTensor, FeatureTensorBuilder
+
+
+def _history(seed: int, start: str, n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame(
+        {
+            "date": pd.bdate_range(start, periods=n).date,
+            "open": close,
+            "high": close * 1.01,
+            "low": close * 0.99,
+            "close": close,
+            "volume": rng.integers(1_000, 100_000, n),
+        }
+    )
+
+
+class FakeProvider:
+    def __init__(self, histories):
+        self.histories = histories
+        self.calls = []
+
+    def __call__(self, symbol, start, end, adjust):
+        self.calls.append((symbol, start, end))
+        df = self.histories[symbol]
+        return df[(df["date"] >= start) & (df["date"] <= end)].reset_index(drop=True)
+
+
+def _fresh(tmp_path, histories, symbols, start, end):
+    return FeatureTensorBuilder(tmp_path / "fresh", fetch=FakeProvider(histories)).build(symbols, start, end)
+
+
+def test_daily_update_appends_slices_matching_a_full_build(tmp_path):
+    histories = {
+        "600000": _history(1, "2023-01-02", 400),
+        "000001": _history(2, "2023-06-01", 300),
+    }
+    start, mid, end = date(2023, 1, 2), date(2024, 3, 29), date(2024, 7, 31)
+
+    provider = FakeProvider(histories)
+    builder = FeatureTensorBuilder(tmp_path / "t", fetch=provider)
+    builder.build(["600000", "000001"], start, mid)
+    before = (tmp_path / "t" / "tensor.f32").stat().st_size
+
+    provider.calls.clear()
+    tensor = builder.update(end)
+    # 增量只拉最近一段
+    assert all(s > start for _, s, _ in provider.calls)
+    assert (tmp_path / "t" / "tensor.f32").stat().st_size > before
+
+    fresh = _fresh(tmp_path, histories, ["600000", "000001"], start, end)
+    assert isinstance(tensor.values, np.memmap)
+    np.testing.assert_array_equal(tensor.dates, fresh.dates)
+    np.testing.assert_allclose(tensor.values, fresh.values, rtol=1e-5, atol=1e-6, equal_nan=True)
+
+
+def test_suspended_days_do_not_leak_into_neighbouring_features(tmp_path):
+    suspended = _history(1, "2023-01-02", 300).drop(index=[150]).reset_index(drop=True)
+    histories = {"600000": suspended, "000001": _history(2, "2023-01-02", 300)}
+    start, end = date(2023, 1, 2), date(2024, 3, 1)
+
+    both = _fresh(tmp_path / "both", histories, ["600000", "000001"], start, end)
+    alone = _fresh(tmp_path / "alone", histories, ["600000"], start, end)
+    frame = both.frame("600000")
+    np.testing.assert_allclose(frame.dropna(how="all").to_numpy(), alone.frame("600000").to_numpy(), rtol=1e-5, equal_nan=True)
+
+
+def test_update_rebuilds_rewritten_history_and_adds_new_symbols(tmp_path):
+    histories = {"600000": _history(1, "2023-01-02", 400)}
+    builder = FeatureTensorBuilder(tmp_path / "t", fetch=FakeProvider(histories))
+    builder.build(["600000"], date(2023, 1, 2), date(2024, 3, 29))
+
+    # 复权改写了历史 + 新增一只股票
+    histories["600000"] = histories["600000"].assign(
+        **{c: histories["600000"][c] * 0.9 for c in ("open", "high", "low", "close")}
+    )
+    histories["000001"] = _history(3, "2023-03-01", 350)
+    tensor = builder.update(date(2024, 7, 31), ["600000", "000001"])
+
+    fresh = _fresh(tmp_path, histories, ["600000", "000001"], date(2023, 1, 2), date(2024, 7, 31))
+    assert tensor.symbols == ["600000", "000001"]
+    np.testing.assert_allclose(tensor.values, fresh.values, rtol=1e-5, atol=1e-6, equal_nan=True)
+
+
+def test_failed_symbols_are_left_nan_and_retried(tmp_path):
+    histories = {"600000": _history(1, "2023-01-02", 400), "000001": _history(2, "2023-01-02", 400)}
+    provider = FakeProvider(histories)
+    down = {"000001"}
+
+    def flaky(symbol, start, end, adjust):
+        if symbol in down:
+            raise HTTPException(status_code=502, detail="upstream akshare error: boom")
+        return provider(symbol, start, end, adjust)
+
+    builder = FeatureTensorBuilder(tmp_path / "t", fetch=flaky)
+    tensor = builder.build(["600000", "000001"], date(2023, 1, 2), date(2024, 3, 29))
+    assert tensor.symbols == ["600000", "000001"]
+    assert np.isnan(tensor.values[:, 1]).all() and not np.isnan(tensor.values[:, 0]).all()
+    assert list(builder.failed) == ["000001"]
+    assert "boom" in builder.failed["000001"]
+
+    # 新 symbol 拉取失败：这次不加入
+    histories["000002"] = _history(3, "2023-03-01", 350)
+    down = {"000001", "000002"}
+    tensor = builder.update(date(2024, 5, 31), ["600000", "000001", "000002"])
+    assert tensor.symbols == ["600000", "000001"]
+    assert set(builder.failed) == {"000001", "000002"}
+
+    # 恢复后 update 补齐全部历史，与全量构建一致
+    down = set()
+    tensor = builder.update(date(2024, 7, 31), ["600000", "000001", "000002"])
+    assert builder.failed == {}
+    fresh = _fresh(tmp_path, histories, ["600000", "000001", "000002"], date(2023, 1, 2), date(2024, 7, 31))
+    assert tensor.symbols == fresh.symbols
+    np.testing.assert_allclose(tensor.values, fresh.values, rtol=1e-5, atol=1e-6, equal_nan=True)
+
+
+def test_build_reports_every_failed_symbol_when_nothing_was_fetched(tmp_path):
+    def down(symbol, start, end, adjust):
+        raise HTTPException(status_code=503, detail="upstream rate limit exceeded")
+
+    builder = FeatureTensorBuilder(tmp_path / "t", fetch=down)
+    with pytest.raises(RuntimeError, match="600000.*000001"):
+        builder.build(["600000", "000001"], date(2023, 1, 2), date(2024, 3, 29))
+    assert not (tmp_path / "t" / "index.json").exists()
+
+
+def test_reader_views_and_refresh(tmp_path):
+    histories = {"600000": _history(1, "2023-01-02", 120), "000001": _history(2, "2023-01-02", 120)}
+    builder = FeatureTensorBuilder(tmp_path / "t", fetch=FakeProvider(histories))
+    builder.build(["600000", "000001"], date(2023, 1, 2), date(2023, 4, 28))
+
+    reader = FeatureTensor.open(tmp_path / "t")
+    day = reader.dates[-1]
+    assert reader.cross_section(day).shape == (2, len(reader.features))
+    assert reader.history("000001").shape == (len(reader.dates), len(reader.features))
+    assert list(reader.frame("600000").columns) == list(reader.features)
+
+    assert not reader.refresh()
+    builder.update(date(2023, 6, 16))
+    assert reader.refresh()
+    assert reader.dates[-1] == np.datetime64("2023-06-16")
@@ -0,0 +1,180 @@
+import math
+import time
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from app.core.frame_cache import RangeFrameCache
+from common.cache import TTLCache
+from common.cache_backends import RedisCache, SqliteCache
+from common.prewarm import Prewarmer, Revalidator
+from common.testing import LocalRedis
+
+
+def _fake_fetch(calls):
+    def fetch(symbol, start, end, adjust):
+        calls.append((start, end))
+        days = pd.bdate_range(start, end)
+        return pd.DataFrame(
+            {
+                "date": [d.date() for d in days],
+                "open": 1.0,
+                "high": 1.0,
+                "low": 1.0,
+                "close": 1.0,
+                "volume": 1,
+            }
+        )
+
+    return fetch
+
+
+def test_sub_ranges_are_served_from_one_cached_frame():
+    calls = []
+    frames = RangeFrameCache(TTLCache(ttl_seconds=60), fetch=_fake_fetch(calls))
+
+    df, status = frames.get("600519", date(2024, 1, 1), date(2024, 6, 30), "qfq")
+    assert status == "MISS"
+
+    df, status = frames.get("600519", date(2024, 3, 1), date(2024, 3, 31), "qfq")
+    assert status == "HIT"
+    assert df["date"].min() == date(2024, 3, 1)
+    assert df["date"].max() == date(2024, 3, 29)
+    assert len(calls) == 1
+
+
+def test_only_missing_edges_are_fetched():
+    calls = []
+    frames = RangeFrameCache(TTLCache(ttl_seconds=60), fetch=_fake_fetch(calls))
+
+    frames.get("600519", date(2024, 3, 1), date(2024, 3, 31), "")
+    df, status = frames.get("600519", date(2024, 2, 1), date(2024, 4, 30), "")
+
+    assert status == "PARTIAL"
+    assert calls[1:] == [
+        (date(2024, 2, 1), date(2024, 2, 29)),
+        (date(2024, 4, 1), date(2024, 4, 30)),
+    ]
+    assert df["date"].is_unique and df["date"].is_monotonic_increasing
+
+
+def test_empty_replies_never_become_covered_ranges():
+    calls = []
+    good = _fake_fetch(calls)
+    reply = {"empty": True}
+
+    def fetch(symbol, start, end, adjust):
+        if reply["empty"]:
+            calls.append((start, end))
+            return pd.DataFrame(columns=["date", "open", "high", "low", "close", "volume"])
+        return good(symbol, start, end, adjust)
+
+    frames = RangeFrameCache(TTLCache(ttl_seconds=60), fetch=fetch, ttl=lambda adjust, hi: math.inf)
+
+    # MISS 拿到空表：不写缓存，下次再问上游
+    df, status = frames.get("600519", date(2024, 3, 1), date(2024, 3, 31), "")
+    assert status == "MISS" and df.empty
+    reply["empty"] = False
+    df, status = frames.get("600519", date(2024, 3, 1), date(2024, 3, 31), "")
+    assert status == "MISS" and not df.empty
+
+    # PARTIAL 右段为空：不扩展 hi，下次还会去拉
+    reply["empty"] = True
+    _, status = frames.get("600519", date(2024, 3, 1), date(2024, 4, 30), "")
+    assert status == "PARTIAL"
+    reply["empty"] = False
+    df, status = frames.get("600519", date(2024, 3, 1), date(2024, 4, 30), "")
+    assert status == "PARTIAL" and df["date"].max() == date(2024, 4, 30)
+    assert calls[-1] == (date(2024, 4, 1), date(2024, 4, 30))
+    assert frames.get("600519", date(2024, 4, 1), date(2024, 4, 30), "")[1] == "HIT"
+
+
+def _wait_for(pred, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pred():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_stale_entry_is_served_while_refreshing_in_background():
+    calls = []
+    cache = TTLCache(ttl_seconds=0.05, stale_seconds=60)
+    frames = RangeFrameCache(cache, fetch=_fake_fetch(calls), revalidator=Revalidator())
+
+    frames.get("600519", date(2024, 1, 1), date(2024, 6, 30), "qfq")
+    time.sleep(0.06)
+
+    df, status = frames.get("600519", date(2024, 3, 1), date(2024, 3, 31), "qfq")
+    assert status == "STALE"
+    assert not df.empty
+    # 后台按原来缓存的整段区间重新拉取
+    assert _wait_for(lambda: len(calls) == 2)
+    assert calls[1] == (date(2024, 1, 1), date(2024, 6, 30))
+    assert _wait_for(lambda: frames.get("600519", date(2024, 3, 1), date(2024, 3, 31), "qfq")[1] == "HIT")
+
+
+def test_stale_entry_outside_the_range_is_fetched_once():
+    calls = []
+    cache = TTLCache(ttl_seconds=0.05, stale_seconds=60)
+    revalidator = Revalidator()
+    frames = RangeFrameCache(cache, fetch=_fake_fetch(calls), revalidator=revalidator)
+
+    frames.get("600519", date(2024, 1, 1), date(2024, 3, 31), "qfq")
+    time.sleep(0.06)
+
+    # 陈旧且不覆盖请求区间：只做前台 MISS 拉取，不再提交后台刷新
+    _, status = frames.get("600519", date(2024, 1, 1), date(2024, 6, 30), "qfq")
+    assert status == "MISS"
+    time.sleep(0.05)
+    assert calls == [(date(2024, 1, 1), date(2024, 3, 31)), (date(2024, 1, 1), date(2024, 6, 30))]
+    assert revalidator.stats()["submitted"] == 0
+
+
+def test_prewarm_refreshes_hot_keys_within_budget():
+    calls = []
+    cache = TTLCache(ttl_seconds=0.05, stale_seconds=60)
+    revalidator = Revalidator()
+    frames = RangeFrameCache(cache, fetch=_fake_fetch(calls), revalidator=revalidator)
+    prewarmer = Prewarmer(
+        refresh=lambda key: frames.refresh(*key),
+        remaining=lambda key: frames.ttl_remaining(*key),
+        revalidator=revalidator,
+        lead_seconds=1.0,
+        budget_per_minute=1,
+        autostart=False,  # 不启动后台线程，手动 run_once
+    )
+
+    for code in ("600519", "000001"):
+        frames.get(code, date(2024, 1, 1), date(2024, 1, 31), "")
+        prewarmer.touch((code, ""))
+    prewarmer.touch(("600519", ""))
+
+    assert prewarmer.run_once() == 1  # 预算只够一次，先刷最热的
+    assert _wait_for(lambda: len(calls) == 3)
+    assert prewarmer.stats()["over_budget"] == 1
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "redis"])
+def test_workers_share_cached_frames(backend, tmp_path):
+    redis = LocalRedis()
+
+    def make():
+        if backend == "sqlite":
+            return SqliteCache(tmp_path / "cache.sqlite3", ttl_seconds=60)
+        return RedisCache(redis, ttl_seconds=60)
+
+    calls = []
+    worker_a = RangeFrameCache(make(), fetch=_fake_fetch(calls))
+    worker_b = RangeFrameCache(make(), fetch=_fake_fetch(calls))
+
+    df_a, status = worker_a.get("600519", date(2024, 1, 1), date(2024, 6, 30), "qfq")
+    assert status == "MISS"
+    df_b, status = worker_b.get("600519", date(2024, 3, 1), date(2024, 3, 31), "qfq")
+    assert status == "HIT"
+    assert len(calls) == 1
+
+    expected = df_a[(df_a["date"] >= date(2024, 3, 1)) & (df_a["date"] <= date(2024, 3, 31))]
+    pd.testing.assert_frame_equal(df_b.reset_index(drop=True), expected.reset_index(drop=True))
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+from app.features.kernels import FEATURES, align_frames, compute_features, features_frame, panel_features
+
+
+def _bars(n: int, seed: int, start: str = "2024-01-01") -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    high = close * (1 + rng.uniform(0, 0.03, n))
+    low = close * (1 - rng.uniform(0, 0.03, n))
+    return pd.DataFrame(
+        {
+            "date": pd.bdate_range(start, periods=n).date,
+            "open": close,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": rng.integers(1_000, 100_000, n),
+        }
+    )
+
+
+def _notebook_features(df: pd.DataFrame) -> pd.DataFrame:
+    # testlogic1 / validlogic 里的写法，逐列照抄
+    c, h, l, v = df["close"], df["high"], df["low"], df["volume"].astype(float)
+    out = pd.DataFrame(index=df.index)
+
+    delta = c.diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = gain.ewm(alpha=1 / 14, adjust=False).mean()
+    avg_loss = loss.ewm(alpha=1 / 14, adjust=False).mean()
+    out["RSI"] = 100 - (100 / (1 + avg_gain / avg_loss))
+
+    out["MACD_Line"] = c.ewm(span=12, adjust=False).mean() - c.ewm(span=26, adjust=False).mean()
+    out["MACD_Signal"] = out["MACD_Line"].ewm(span=9, adjust=False).mean()
+    out["MACD_Hist"] = out["MACD_Line"] - out["MACD_Signal"]
+
+    tr = pd.concat([h - l, (h - c.shift()).abs(), (l - c.shift()).abs()], axis=1).max(axis=1)
+    out["ATR"] = tr.rolling(14).mean()
+
+    sma20, std20 = c.rolling(20).mean(), c.rolling(20).std()
+    out["BB_Bandwidth"] = ((sma20 + 2 * std20) - (sma20 - 2 * std20)) / sma20
+    out["Relative_Volume"] = v / v.rolling(20).mean()
+    out["SMA_Bias"] = c / sma20 - 1
+
+    out["Log_Ret"] = np.log(c / c.shift(1))
+    out["Lagged_Ret_1D"] = out["Log_Ret"].shift(1)
+    out["Lagged_Ret_5D"] = np.log(c.shift(1) / c.shift(6))
+    out["Lagged_Ret_10D"] = np.log(c.shift(1) / c.shift(11))
+
+    out["ma5"] = c.rolling(5).mean()
+    out["ma10"] = c.rolling(10).mean()
+    out["ma20"] = sma20
+    out["volatility"] = std20
+    return out[list(FEATURES)]
+
+
+def test_single_symbol_matches_notebook_formulas():
+    df = _bars(300, seed=1)
+    got = features_frame(df).to_numpy()
+    want = _notebook_features(df).to_numpy()
+    np.testing.assert_allclose(got, want, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_batched_symbols_with_different_listing_dates():
+    frames = {
+        "600000": _bars(200, seed=2),
+        "000001": _bars(120, seed=3, start="2024-04-01"),  # 晚上市，前面整段为 NaN
+    }
+    symbols, dates, panel = align_frames(frames)
+    feats = compute_features(panel["close"], panel["high"], panel["low"], panel["volume"], dtype=np.float64)
+    assert feats.shape == (2, len(dates), len(FEATURES))
+
+    for i, sym in enumerate(symbols):
+        df = frames[sym]
+        cols = np.searchsorted(dates, pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]"))
+        want = _notebook_features(df).to_numpy()
+        np.testing.assert_allclose(feats[i, cols], want, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+    late = symbols.index("000001")
+    first = np.searchsorted(dates, np.datetime64("2024-04-01"))
+    assert np.isnan(feats[late, :first]).all()
+
+
+def test_panel_features_use_each_symbols_own_trading_days():
+    suspended = _bars(200, seed=4)
+    suspended = suspended.drop(index=len(suspended) - 10).reset_index(drop=True)  # 10 个交易日前停牌一天
+    frames = {"600000": suspended, "000001": _bars(200, seed=5)}
+    symbols, dates, panel = align_frames(frames)
+    feats = panel_features(panel, dtype=np.float64)
+
+    for i, sym in enumerate(symbols):
+        df = frames[sym]
+        cols = np.searchsorted(dates, pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]"))
+        np.testing.assert_allclose(feats[i, cols], features_frame(df).to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True)
+        missing = np.setdiff1d(np.arange(len(dates)), cols)
+        assert np.isnan(feats[i, missing]).all()
+    # 停牌之后的最后一天照常有完整的特征
+    assert np.isfinite(feats[symbols.index("600000"), -1]).all()
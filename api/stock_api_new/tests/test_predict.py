@@ -0,0 +1,134 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from app.features.kernels import features_frame
+from app.inference.batcher import MicroBatcher
+from app.inference.predictor import Predictor
+from app.inference.registry import Model, ModelRegistry
+
+
+def _bars(n: int, seed: int, start: str = "2024-01-01") -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame(
+        {
+            "date": pd.bdate_range(start, periods=n).date,
+            "open": close,
+            "high": close * 1.01,
+            "low": close * 0.99,
+            "close": close,
+            "volume": rng.integers(1_000, 100_000, n),
+        }
+    )
+
+
+class _Est:
+    """
+    把第一个特征原样当作正类概率返回，方便核对送进模型的特征行
+    """
+
+    feature_names_in_ = np.array(["SMA_Bias", "RSI"])
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_proba(self, x):
+        self.calls.append(len(x))
+        return np.column_stack([1 - x[:, 0], x[:, 0]])
+
+
+def _predictor(frames: dict, est: _Est, **kwargs) -> Predictor:
+    registry = ModelRegistry("/nonexistent")
+    registry.models = {"Target_Direction": Model.from_estimator("Target_Direction", est, ("SMA_Bias", "RSI"))}
+    registry.version = "v1"
+    return Predictor(registry, lambda code: (frames[code], str(len(frames[code]))), **kwargs)
+
+
+def test_micro_batcher_groups_concurrent_submits():
+    gate = threading.Event()
+    sizes = []
+
+    def fn(items):
+        gate.wait(1)
+        sizes.append(len(items))
+        return [i * 2 for i in items]
+
+    batcher = MicroBatcher(fn, max_batch=8, max_wait_ms=50)
+    first = batcher.submit(0)
+    futures = [batcher.submit(i) for i in range(1, 10)]
+    gate.set()
+    assert first.result(1) == 0
+    assert [f.result(1) for f in futures] == [i * 2 for i in range(1, 10)]
+    assert sum(sizes) == 10 and max(sizes) <= 8 and len(sizes) < 10
+
+
+def test_micro_batcher_propagates_errors_to_the_whole_batch():
+    def fn(items):
+        raise ValueError("boom")
+
+    fut = MicroBatcher(fn, max_wait_ms=0).submit(1)
+    with pytest.raises(ValueError):
+        fut.result(1)
+
+
+def test_batched_scores_match_single_symbol_features_and_are_cached():
+    frames = {"600000": _bars(300, seed=1), "000001": _bars(120, seed=2, start="2024-06-03")}
+    est = _Est()
+    predictor = _predictor(frames, est, max_wait_ms=20)
+
+    results = {}
+    threads = [threading.Thread(target=lambda c=c: results.__setitem__(c, predictor.predict(c))) for c in frames]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for code, df in frames.items():
+        prediction, status = results[code]
+        assert status == "MISS"
+        assert prediction.as_of == df["date"].iloc[-1]
+        want = features_frame(df)["SMA_Bias"].iloc[-1]
+        assert prediction.scores["Target_Direction"] == pytest.approx(want, rel=1e-9)
+    assert sum(est.calls) == 2
+
+    # 没有新 K 线：直接命中缓存，不再进模型
+    assert predictor.predict("600000")[1] == "HIT"
+    assert sum(est.calls) == 2
+
+    # 新的一根 K 线到来后重新计算
+    frames["600000"] = _bars(301, seed=1)
+    assert predictor.predict("600000")[1] == "MISS"
+    assert sum(est.calls) == 3
+
+
+def test_scores_do_not_depend_on_the_rest_of_the_batch():
+    suspended = _bars(300, seed=1)
+    suspended = suspended.drop(index=len(suspended) - 10).reset_index(drop=True)
+    frames = {"600000": suspended, "000001": _bars(300, seed=2)}
+    predictor = _predictor(frames, _Est())
+
+    alone = predictor._score([("600000", frames["600000"])])[0]
+    batched = predictor._score([("600000", frames["600000"]), ("000001", frames["000001"])])[0]
+    assert alone.scores["Target_Direction"] is not None
+    assert batched == alone
+
+
+def test_no_models_is_503():
+    predictor = Predictor(ModelRegistry("/nonexistent"), lambda code: (_bars(50, seed=3), "x"))
+    with pytest.raises(HTTPException) as exc:
+        predictor.predict("600000")
+    assert exc.value.status_code == 503
+
+
+def test_registry_rejects_models_with_unknown_features(tmp_path):
+    (tmp_path / "Target_Breakout.pkl").write_bytes(b"not a pickle")
+    registry = ModelRegistry(tmp_path)
+    registry.load()
+    assert registry.models == {}
+    assert "Target_Breakout" in registry.errors
+    with pytest.raises(ValueError):
+        Model.from_estimator("x", _Est(), ("rsi", "macd"))
@@ -0,0 +1,117 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.api.v1 import stocks
+from app.core.config import settings
+from app.core.frame_cache import RangeFrameCache
+from app.core.stream import BATCH_ROWS
+from app.services import candles
+from common.cache import TTLCache
+
+
+def _bars(start: str, end: str) -> pd.DataFrame:
+    days = pd.bdate_range(start, end)
+    close = 10 + np.arange(len(days)) * 0.01
+    return pd.DataFrame(
+        {
+            "date": days.date,
+            "open": close,
+            "high": close + 0.1,
+            "low": close - 0.1,
+            "close": close,
+            "volume": np.arange(len(days)) + 1000,
+        }
+    )
+
+
+class FakeFetch:
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+
+    def __call__(self, symbol, start, end, adjust):
+        self.calls.append((symbol, start, end))
+        if symbol in self.failing:
+            raise HTTPException(status_code=502, detail="upstream akshare error: boom")
+        return _bars(start, end)
+
+
+@pytest.fixture
+def fetch(monkeypatch):
+    fake = FakeFetch()
+    monkeypatch.setattr(candles, "frames", RangeFrameCache(TTLCache(ttl_seconds=60), fetch=fake))
+    return fake
+
+
+@pytest.fixture
+def client(fetch):
+    app = FastAPI()
+    app.include_router(stocks.router)
+    return TestClient(app)
+
+
+def test_ndjson_streams_the_whole_range_in_batches(client):
+    params = {"start": "1995-01-02", "end": "2024-06-28"}
+    resp = client.get("/stocks/600519/candles", params=params, headers={"Accept": "application/x-ndjson"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    expected = _bars(params["start"], params["end"])
+    assert len(rows) == len(expected) == int(resp.headers["x-rows"]) > BATCH_ROWS
+    assert rows[0]["date"] == "1995-01-02" and rows[-1]["date"] == "2024-06-28"
+
+    limited = client.get(
+        "/stocks/600519/candles", params={**params, "limit": 10}, headers={"Accept": "application/x-ndjson"}
+    )
+    assert [json.loads(line)["date"] for line in limited.text.splitlines()] == [r["date"] for r in rows[-10:]]
+
+
+def test_json_keeps_the_row_cap(client):
+    params = {"start": "2010-01-04", "end": "2024-06-28"}
+    assert len(client.get("/stocks/600519/candles", params=params).json()["data"]) == 1000
+    assert client.get("/stocks/600519/candles", params={**params, "limit": 2001}).status_code == 400
+
+    # q=0 表示不接受 NDJSON，仍然走 JSON
+    resp = client.get(
+        "/stocks/600519/candles", params=params, headers={"Accept": "application/x-ndjson;q=0, application/json"}
+    )
+    assert resp.headers["content-type"].startswith("application/json")
+
+
+def test_batch_isolates_per_symbol_errors(client, fetch):
+    fetch.failing.add("000002")
+    body = {"codes": ["600519", "000000", "000002", "000001"], "start": "2024-01-02", "end": "2024-06-28"}
+    resp = client.post("/stocks/candles:batch", json=body)
+    assert resp.status_code == 200
+    out = resp.json()
+    assert out["success"] is False
+    assert list(out["results"]) == ["600519", "000001"]
+    assert out["results"]["600519"]["rows"] == len(_bars("2024-01-02", "2024-06-28"))
+    assert out["errors"]["000000"]["status"] == 404
+    assert out["errors"]["000002"]["status"] == 502 and "boom" in out["errors"]["000002"]["message"]
+    assert (out["meta"]["requested"], out["meta"]["succeeded"], out["meta"]["failed"]) == (4, 2, 2)
+
+
+def test_batch_serves_covered_ranges_from_the_cache(client, fetch):
+    client.get("/stocks/600519/candles", params={"start": "2024-01-02", "end": "2024-06-28"})
+    calls = len(fetch.calls)
+
+    body = {"codes": ["600519", "000001"], "start": "2024-03-01", "end": "2024-03-29", "limit": 5}
+    out = client.post("/stocks/candles:batch", json=body).json()
+    assert out["results"]["600519"]["cache"] == "HIT"
+    assert out["results"]["000001"]["cache"] == "MISS"
+    days = [r["date"] for r in out["results"]["600519"]["data"]]
+    assert days == ["2024-03-25", "2024-03-26", "2024-03-27", "2024-03-28", "2024-03-29"]
+    assert [c[0] for c in fetch.calls[calls:]] == ["000001"]
+
+
+def test_batch_rejects_too_many_symbols(client, fetch):
+    codes = [f"{i:06d}" for i in range(1, settings.batch_max_symbols + 2)]
+    assert client.post("/stocks/candles:batch", json={"codes": codes}).status_code == 422
+    assert client.post("/stocks/candles:batch", json={"codes": []}).status_code == 422
+    assert fetch.calls == []
@@ -0,0 +1,54 @@
+import json
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.serialize import encode_candles
+from app.core.stream import ARROW_STREAM, NDJSON, arrow_chunks, ndjson_chunks, stream_format
+
+
+def _frame(n):
+    days = pd.bdate_range("2000-01-03", periods=n)
+    close = 10 + np.arange(n) * 0.01
+    close[3] = np.nan
+    return pd.DataFrame(
+        {
+            "date": [d.date() for d in days],
+            "open": close,
+            "high": close + 0.1,
+            "low": close - 0.1,
+            "close": close,
+            "volume": np.arange(n) + 1000,
+        }
+    )
+
+
+def test_stream_format_from_accept():
+    assert stream_format("application/json") is None
+    assert stream_format("application/x-ndjson") == NDJSON
+    assert stream_format(f"{ARROW_STREAM};q=1, application/json") == ARROW_STREAM
+    assert stream_format("application/x-ndjson;q=0") is None
+    assert stream_format(f"{ARROW_STREAM};q=0, application/x-ndjson") == NDJSON
+    assert stream_format(f"{ARROW_STREAM};q=0.5, application/x-ndjson;q=0.8") == NDJSON
+    assert stream_format("application/json, application/x-ndjson;q=0.1") is None
+
+
+def test_ndjson_batches_match_json_rows():
+    df = _frame(12)
+    chunks = list(ndjson_chunks(df, batch_rows=5))
+    assert len(chunks) == 3
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    expected = json.loads(encode_candles(df, message="", meta={}))["data"]
+    assert rows == expected
+    assert rows[3]["close"] is None
+
+
+def test_arrow_stream_round_trip():
+    pa = pytest.importorskip("pyarrow")
+    df = _frame(12)
+    table = pa.ipc.open_stream(b"".join(arrow_chunks(df, ("date", "close", "volume"), batch_rows=5))).read_all()
+    assert table.num_rows == 12
+    assert table.column("date")[0].as_py() == date(2000, 1, 3)
+    assert table.column("close").null_count == 1
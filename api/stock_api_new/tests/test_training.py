@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from app.features.kernels import NOTEBOOK_FEATURES
+from app.training.dataset import DatasetBuilder
+from app.training.targets import HORIZON, TARGETS, compute_targets
+from app.training.walkforward import walk_forward_splits
+
+
+def _bars(n: int, seed: int, start: str = "2020-01-01") -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame(
+        {
+            "date": pd.bdate_range(start, periods=n).date,
+            "open": close,
+            "high": close * (1 + rng.uniform(0, 0.03, n)),
+            "low": close * (1 - rng.uniform(0, 0.03, n)),
+            "close": close,
+            "volume": rng.integers(1_000, 100_000, n),
+        }
+    )
+
+
+def _notebook_targets(df: pd.DataFrame) -> pd.DataFrame:
+    # testlogic1 的写法，逐行照抄
+    out = pd.DataFrame(index=df.index)
+    fwd_close = df["close"].shift(-5)
+    fwd_high = df["high"].rolling(window=5).max().shift(-5)
+    fwd_low = df["low"].rolling(window=5).min().shift(-5)
+    out["Target_Direction"] = (fwd_close > df["close"]).astype(int)
+    out["Target_Downside_Risk"] = (fwd_low < (df["close"] * 0.95)).astype(int)
+    high_20 = df["high"].rolling(window=20).max()
+    out["Target_Breakout"] = (fwd_high > high_20).astype(int)
+    fwd_vol = (fwd_high - fwd_low) / df["close"]
+    out["Target_High_Volatility"] = (fwd_vol > fwd_vol.quantile(0.75)).astype(int)
+    known = fwd_close.notna() & fwd_high.notna() & high_20.notna()
+    return out[list(TARGETS)][known]
+
+
+def test_targets_match_notebook():
+    df = _bars(300, seed=1)
+    got = compute_targets(df["close"], df["high"], df["low"])[0]
+    want = _notebook_targets(df)
+    np.testing.assert_array_equal(got[want.index], want.to_numpy())
+    # 最后 HORIZON 天和 20 日窗口不满的行未知
+    assert np.isnan(got[-HORIZON:]).all()
+    assert np.isnan(got[:19, TARGETS.index("Target_Breakout")]).all()
+
+
+def test_walk_forward_folds_are_ordered_and_embargoed():
+    days = np.repeat(np.arange("2020-01-01", "2020-12-31", dtype="datetime64[D]"), 3)
+    folds = walk_forward_splits(days, n_splits=4, gap=HORIZON)
+    assert len(folds) == 4
+    for fold in folds:
+        train_days, test_days = days[fold.train], days[fold.test]
+        assert fold.train.start == 0 and len(test_days)
+        # 训练集最后一天与测试集第一天之间至少隔 gap 个交易日
+        assert len(np.unique(days[(days > train_days[-1]) & (days < test_days[0])])) == HORIZON
+    assert [f.test.stop for f in folds][-1] == len(days)
+
+
+def test_dataset_is_built_once_and_reopened(tmp_path):
+    frames = {"600000": _bars(300, seed=1), "000001": _bars(200, seed=2, start="2020-03-02")}
+    calls = []
+
+    def fetch(symbol, start, end, adjust):
+        calls.append(symbol)
+        return frames[symbol]
+
+    builder = DatasetBuilder(tmp_path, fetch=fetch)
+    start, end = pd.Timestamp("2020-01-01").date(), pd.Timestamp("2021-06-30").date()
+    ds = builder.build(list(frames), start, end, features=NOTEBOOK_FEATURES)
+    assert sorted(calls) == ["000001", "600000"]
+    assert ds.x.shape == (len(ds), len(NOTEBOOK_FEATURES)) and ds.y.shape == (len(ds), len(TARGETS))
+    assert np.isfinite(ds.x).all()
+    assert (np.diff(ds.days.astype(np.int64)) >= 0).all()
+
+    again = builder.build(list(frames), start, end, features=NOTEBOOK_FEATURES)
+    assert len(calls) == 2
+    assert again.path == ds.path and len(again) == len(ds)
+
+
+def test_dataset_skips_symbols_that_fail_to_fetch(tmp_path):
+    frames = {"600000": _bars(300, seed=1), "000001": _bars(300, seed=2)}
+    down = {"000001"}
+
+    def fetch(symbol, start, end, adjust):
+        if symbol in down:
+            raise HTTPException(status_code=503, detail="upstream rate limit exceeded")
+        return frames[symbol]
+
+    builder = DatasetBuilder(tmp_path, fetch=fetch)
+    start, end = pd.Timestamp("2020-01-01").date(), pd.Timestamp("2021-06-30").date()
+    ds = builder.build(list(frames), start, end, features=NOTEBOOK_FEATURES)
+    assert len(ds) > 0 and set(np.unique(ds.symbol)) == {0}
+    assert list(ds.skipped) == ["000001"] and "rate limit" in ds.skipped["000001"]
+
+    # 有跳过的数据集不复用：上游恢复后重新构建
+    down = set()
+    again = builder.build(list(frames), start, end, features=NOTEBOOK_FEATURES)
+    assert again.path == ds.path and again.skipped == {}
+    assert set(np.unique(again.symbol)) == {0, 1}
+
+
+def test_suspension_days_do_not_drop_rows_of_the_suspended_symbol(tmp_path):
+    suspended = _bars(300, seed=1)
+    suspended = suspended.drop(index=[100, 200]).reset_index(drop=True)
+    frames = {"600000": suspended, "000001": _bars(300, seed=2)}
+    start, end = pd.Timestamp("2020-01-01").date(), pd.Timestamp("2021-06-30").date()
+
+    alone = DatasetBuilder(tmp_path / "a", fetch=lambda s, *_: frames[s]).build(["600000"], start, end, features=NOTEBOOK_FEATURES)
+    both = DatasetBuilder(tmp_path / "b", fetch=lambda s, *_: frames[s]).build(list(frames), start, end, features=NOTEBOOK_FEATURES)
+    mine = np.asarray(both.symbol) == 0
+    np.testing.assert_array_equal(np.asarray(both.days)[mine], np.asarray(alone.days))
+    np.testing.assert_allclose(np.asarray(both.x)[mine], np.asarray(alone.x), rtol=1e-6)
+    np.testing.assert_array_equal(np.asarray(both.y)[mine], np.asarray(alone.y))
+
+
+def test_train_models_writes_a_loadable_version(tmp_path):
+    pytest.importorskip("lightgbm")
+    from app.inference.registry import ModelRegistry
+    from app.training.train import train_models
+
+    frames = {f"60000{i}": _bars(400, seed=i) for i in range(4)}
+    builder = DatasetBuilder(tmp_path / "datasets", fetch=lambda s, *_: frames[s])
+    ds = builder.build(list(frames), pd.Timestamp("2020-01-01").date(), pd.Timestamp("2022-01-01").date(),
+                       features=NOTEBOOK_FEATURES)
+    manifest = train_models(ds, tmp_path / "models", n_splits=2, workers=2, threads_per_worker=1, num_boost_round=5)
+
+    registry = ModelRegistry(tmp_path / "models")
+    registry.load()
+    assert registry.version == manifest["version"]
+    assert sorted(registry.models) == sorted(TARGETS)